@@ -1,14 +1,23 @@
-from django.contrib import admin
+from decimal import Decimal
+
+from django.contrib import admin, messages
 from unfold.admin import ModelAdmin, TabularInline
 from django import forms
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.forms import ReadOnlyPasswordHashField
-from .models import Account, Courier, CourierTrackingHistory
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from .models import (
+    Account, Courier, CourierTrackingHistory, ScannerKey, TrackingSummary, WebhookEndpoint, WebhookEvent,
+)
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
+from django.http import JsonResponse
+from django.urls import path, reverse_lazy
+from unfold.widgets import UnfoldAdminTextInputWidget
+from .city_index import get_city_index
+from .eta import get_eta_table
+from .rates import get_rate_engine
 
 INLINE_INPUT_STYLE = (
     "width:360px; padding:10px; border:1px solid #e5e7eb; "
@@ -72,11 +81,19 @@ class AccountChangeForm(forms.ModelForm):
         model = Account
         fields = ("email", "first_name", "last_name", "phone_number", "password", "is_active", "is_staff", "is_superuser")
 
+class WebhookEndpointInline(TabularInline):
+    model = WebhookEndpoint
+    extra = 0
+    fields = ("url", "secret", "is_active", "consecutive_failures", "disabled_until")
+    readonly_fields = ("consecutive_failures", "disabled_until")
+
+
 @admin.register(Account)
 class AccountAdmin(ModelAdmin, BaseUserAdmin):
     add_form = AccountCreationForm
     form = AccountChangeForm
     model = Account
+    inlines = [WebhookEndpointInline]
 
     list_display = ("email", "first_name", "last_name", "phone_number", "is_active", "is_staff")
     list_filter = ("is_active", "is_staff", "is_superuser")
@@ -101,11 +118,25 @@ class AccountAdmin(ModelAdmin, BaseUserAdmin):
 # ----------------------
 # COURIER ADMIN
 # ----------------------
+# free-text city field -> the country field that narrows its suggestions
+CITY_COUNTRY_FIELDS = {
+    "current_location_city": "current_location_country",
+    "receiver_city": "receiver_country",
+    "sender_city": "sender_country",
+    "destination_city": "destination_country",
+}
+
+
+class CityAutocompleteWidget(UnfoldAdminTextInputWidget):
+    class Media:
+        js = ("assets/js/city-autocomplete.js",)
+
+
 @admin.register(Courier)
 class CourierAdmin(ModelAdmin):
     list_display = (
         "tracking_number", "status", "current_location_country", "current_location_city",
-        "estimated_delivery_date"
+        "estimated_delivery_date", "predicted_delivery"
     )
     list_filter = ("status", "receiver_country", "sender_country", "category")
     search_fields = (
@@ -120,7 +151,69 @@ class CourierAdmin(ModelAdmin):
         "estimated_delivery_date",
     )
     readonly_fields = ("tracking_number", "created_at", "updated_at")
-    actions = ['send_receipt_email']
+    list_select_related = ("tracking_summary",)  # predicted_delivery reads in_transit_at from it
+    actions = ['send_receipt_email', 'recompute_rates']
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        if db_field.name in CITY_COUNTRY_FIELDS:
+            kwargs["widget"] = CityAutocompleteWidget(attrs={
+                "autocomplete": "off",
+                "data-city-autocomplete": reverse_lazy("admin:accounts_courier_city_autocomplete"),
+                "data-city-field": db_field.name,
+                "data-country-field": CITY_COUNTRY_FIELDS[db_field.name],
+            })
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
+
+    def get_urls(self):
+        urls = [
+            path(
+                "city-autocomplete/",
+                self.admin_site.admin_view(self.city_autocomplete),
+                name="accounts_courier_city_autocomplete",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def city_autocomplete(self, request):
+        """Prefix-match city names from the in-memory cities_light index."""
+        cities = get_city_index().search(
+            request.GET.get("q", ""),
+            country=request.GET.get("country"),
+        )
+        return JsonResponse({"results": cities})
+
+    @admin.display(description="Predicted delivery")
+    def predicted_delivery(self, obj):
+        eta = get_eta_table().predict(getattr(obj, "tracking_summary", obj))
+        if eta is None:
+            return "-"
+        return f"{eta['earliest']:%d %b} – {eta['latest']:%d %b} ({eta['likely']:%d %b})"
+
+    @admin.action(description="Recompute rates from the rate card")
+    def recompute_rates(self, request, queryset):
+        """
+        Re-price the selection in one vectorized pass and write back only the
+        rate: category and updated_at are left alone, since re-pricing isn't a
+        status change (the archive cutoff reads updated_at). Shipments without
+        a weight keep their rate and are listed in the message.
+        """
+        couriers = list(queryset.only("id", *TrackingSummary.FIELDS))
+        weightless = [courier for courier in couriers if not courier.weight]
+        couriers = [courier for courier in couriers if courier.weight]
+        result = get_rate_engine().quote_many(couriers)
+        for courier, rate in zip(couriers, result["rate"]):
+            courier.rate = Decimal(f"{rate:.2f}")
+        Courier.objects.bulk_update(couriers, ["rate"], batch_size=1000)
+        TrackingSummary.refresh(couriers)
+        self.message_user(request, f"Recomputed rates for {len(couriers)} shipment(s).")
+        if weightless:
+            numbers = ", ".join(courier.tracking_number for courier in weightless[:20])
+            more = f" and {len(weightless) - 20} more" if len(weightless) > 20 else ""
+            self.message_user(
+                request,
+                f"Skipped {len(weightless)} shipment(s) without a weight: {numbers}{more}.",
+                messages.WARNING,
+            )
 
     def send_receipt_email(self, request, queryset):
         """
@@ -162,44 +255,37 @@ class CourierAdmin(ModelAdmin):
 class CourierTrackingHistoryAdmin(ModelAdmin):
     list_display = ("courier", "status", "location_country", "location_city", "timestamp")
     list_filter = ("status", "location_country")
-    search_fields = ("courier__tracking_number", "location_city__name", "description")
+    list_select_related = ("courier",)  # __str__ and the courier column read courier.tracking_number
+    search_fields = ("courier__tracking_number", "location_city", "description")
     ordering = ("-timestamp",)
 
+
 # ----------------------
-# SIGNALS TO AUTO-CREATE HISTORY
+# WEBHOOK ADMIN
 # ----------------------
-@receiver(post_save, sender=Courier)
-def create_or_update_tracking_history(sender, instance, created, **kwargs):
-    """
-    Automatically log courier creation and updates to history.
-    """
-    if created:
-        # New courier -> create initial history record
-        CourierTrackingHistory.objects.create(
-            courier=instance,
-            status=instance.status,
-            location_country=instance.current_location_country,
-            location_city=instance.current_location_city,
-            description="Courier created"
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(ModelAdmin):
+    list_display = ("id", "endpoint", "state", "attempts", "next_attempt_at", "delivered_at")
+    list_filter = ("state",)
+    list_select_related = ("endpoint",)
+    search_fields = ("endpoint__url", "payload__tracking_number")
+    readonly_fields = ("endpoint", "payload", "attempts", "last_error", "created_at", "delivered_at")
+    ordering = ("-id",)
+    actions = ["retry_now"]
+
+    @admin.action(description="Retry selected events now")
+    def retry_now(self, request, queryset):
+        count = queryset.exclude(state=WebhookEvent.DELIVERED).update(
+            state=WebhookEvent.PENDING, next_attempt_at=timezone.now()
         )
-    else:
-        # On update, create a new history log if key fields changed
-        last_history = CourierTrackingHistory.objects.filter(
-            courier=instance
-        ).order_by("-timestamp").first()
-
-        if (
-            not last_history
-            or last_history.status != instance.status
-            or last_history.location_country != instance.current_location_country
-            or last_history.location_city != instance.current_location_city
-            or last_history and instance.estimated_delivery_date
-            and last_history.timestamp.date() != instance.estimated_delivery_date
-        ):
-            CourierTrackingHistory.objects.create(
-                courier=instance,
-                status=instance.status,
-                location_country=instance.current_location_country,
-                location_city=instance.current_location_city,
-                description="Courier details updated"
-            )
+        self.message_user(request, f"{count} event(s) queued for immediate delivery.")
+
+
+# ----------------------
+# SCANNER KEYS
+# ----------------------
+@admin.register(ScannerKey)
+class ScannerKeyAdmin(ModelAdmin):
+    list_display = ("name", "is_active", "created_at", "last_used_at")
+    list_filter = ("is_active",)
+    readonly_fields = ("created_at", "last_used_at")
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        # connected here rather than in admin.py so profiles without the
+        # admin (see net_courier.settings_public) still record history
+        from . import signals  # noqa: F401
+        # installs the DB timer on connections opened from here on
+        from . import metrics  # noqa: F401
+        # N+1 detector hook; inert unless a request or query_budget() is recording
+        from . import query_inspector  # noqa: F401
+        # registers the system check for the route map's country outlines
+        from . import route_map  # noqa: F401
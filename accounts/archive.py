@@ -0,0 +1,185 @@
+"""
+Cold storage for finished shipments.
+
+``archive_shipments`` moves Delivered/Returned couriers (and their history)
+out of the hot tables into segments on the ``archive`` storage backend
+(ARCHIVE_STORAGE_BACKEND, e.g. S3 through django-storages):
+
+* ``<name>.jsonl.gz`` -- one gzip member per shipment, so the whole file
+  reads with ``zcat`` but any record can be decompressed on its own;
+* ``<name>.idx`` -- sorted ``tracking_number<TAB>offset<TAB>length`` lines.
+
+The index is uploaded last, so a segment only counts once it exists. The
+archived rows are deleted from the database only after both are stored, so
+the storage has to outlive the dyno: with no backend configured nothing is
+archived and ``find_archived`` finds nothing.
+
+``find_archived`` keeps every index in memory, checking the storage for new
+ones every ARCHIVE_INDEX_TTL seconds. Segments are immutable, so a lookup
+downloads its segment into ARCHIVE_CACHE_DIR once and then is a dict hit
+plus one local seek and read.
+"""
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import serializers
+from django.core.files import File
+from django.core.files.storage import storages
+from django.core.serializers.json import DjangoJSONEncoder
+
+FINISHED_STATUSES = ("Delivered", "Returned")
+
+
+def archive_storage():
+    """The durable storage segments live in, or ``None`` when ARCHIVE_STORAGE_BACKEND isn't set."""
+    if "archive" not in settings.STORAGES:
+        return None
+    return storages["archive"]
+
+
+class ArchivedShipment:
+    """An archived courier and its history as unsaved model instances."""
+
+    def __init__(self, courier, history):
+        self.courier = courier
+        self.history = history
+
+
+def encode(courier, history):
+    record = {
+        "courier": serializers.serialize("python", [courier])[0],
+        "history": serializers.serialize("python", history),
+    }
+    return gzip.compress(json.dumps(record, cls=DjangoJSONEncoder).encode("utf-8"))
+
+
+def decode(blob):
+    record = json.loads(gzip.decompress(blob))
+    courier = next(serializers.deserialize("python", [record["courier"]])).object
+    history = [item.object for item in serializers.deserialize("python", record["history"])]
+    for entry in history:
+        entry.courier = courier  # the row it points at is gone from the database
+    return ArchivedShipment(courier, history)
+
+
+def upload(storage, name, path):
+    with open(path, "rb") as fh:
+        saved = storage.save(name, File(fh, name=name))
+    if saved != name:  # the storage renamed it to avoid a clash: the index would point at the wrong file
+        storage.delete(saved)
+        raise FileExistsError(f"archive segment {name} already exists")
+
+
+def write_segment(name, shipments, storage=None):
+    """
+    Write ``[(courier, history), ...]`` as segment ``name`` to ``storage``
+    (the archive storage by default); returns the number of records. The
+    data file is kept in the local cache, since it was just written.
+    """
+    storage = storage or archive_storage()
+    os.makedirs(settings.ARCHIVE_CACHE_DIR, exist_ok=True)
+    data_name, index_name = f"{name}.jsonl.gz", f"{name}.idx"
+    index = []
+    with tempfile.TemporaryDirectory(dir=settings.ARCHIVE_CACHE_DIR) as workdir:
+        data_path = os.path.join(workdir, data_name)
+        with open(data_path, "wb") as fh:
+            for courier, history in shipments:
+                blob = encode(courier, history)
+                index.append((courier.tracking_number, fh.tell(), len(blob)))
+                fh.write(blob)
+        index_path = os.path.join(workdir, index_name)
+        with open(index_path, "w", encoding="utf-8") as fh:
+            for tracking_number, offset, length in sorted(index):
+                fh.write(f"{tracking_number}\t{offset}\t{length}\n")
+
+        upload(storage, data_name, data_path)
+        upload(storage, index_name, index_path)
+        os.replace(data_path, os.path.join(settings.ARCHIVE_CACHE_DIR, data_name))
+    return len(index)
+
+
+class ArchiveIndex:
+    def __init__(self, storage, cache_dir):
+        self.storage = storage
+        self.cache_dir = cache_dir
+        self.checked_at = None
+        self.segments = set()  # index files already read
+        self.entries = {}  # tracking number -> (segment data name, offset, length)
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        if self.checked_at is not None and time.monotonic() - self.checked_at < settings.ARCHIVE_INDEX_TTL:
+            return
+        with self.lock:
+            if self.checked_at is not None and time.monotonic() - self.checked_at < settings.ARCHIVE_INDEX_TTL:
+                return
+            _dirs, files = self.storage.listdir("")
+            # names are timestamped: in sorted order a re-archived number resolves to its newest copy
+            for filename in sorted(set(files) - self.segments):
+                if not filename.endswith(".idx"):
+                    continue
+                data_name = filename[:-len(".idx")] + ".jsonl.gz"
+                with self.storage.open(filename, "rb") as fh:
+                    lines = fh.read().decode("utf-8").split("\n")
+                for line in lines[:-1]:  # the last piece is empty, or a line still being written
+                    tracking_number, offset, length = line.split("\t")
+                    current = self.entries.get(tracking_number)
+                    if current is None or current[0] < data_name:
+                        self.entries[tracking_number] = (data_name, int(offset), int(length))
+                self.segments.add(filename)
+            self.checked_at = time.monotonic()
+
+    def local_copy(self, data_name):
+        """Path of ``data_name`` in the cache directory, downloading it first if needed."""
+        path = os.path.join(self.cache_dir, data_name)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.cache_dir, delete=False) as tmp, \
+                    self.storage.open(data_name, "rb") as src:
+                for chunk in iter(lambda: src.read(1 << 20), b""):
+                    tmp.write(chunk)
+            os.replace(tmp.name, path)
+        return path
+
+    def find(self, tracking_number):
+        self.refresh()
+        entry = self.entries.get(tracking_number)
+        if entry is None:
+            return None
+        data_name, offset, length = entry
+        with open(self.local_copy(data_name), "rb") as fh:
+            fh.seek(offset)
+            return decode(fh.read(length))
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_archive_index():
+    """The process-wide index, or ``None`` when no archive storage is configured."""
+    global _index
+    if _index is None:
+        storage = archive_storage()
+        if storage is None:
+            return None
+        with _lock:
+            if _index is None:
+                _index = ArchiveIndex(storage, settings.ARCHIVE_CACHE_DIR)
+    return _index
+
+
+def find_archived(tracking_number):
+    """The ``ArchivedShipment`` for ``tracking_number``, or ``None``."""
+    index = get_archive_index()
+    return index.find(tracking_number) if index is not None else None
+
+
+async def afind_archived(tracking_number):
+    return await sync_to_async(find_archived)(tracking_number)
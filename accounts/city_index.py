@@ -0,0 +1,73 @@
+"""
+In-memory prefix index over cities_light city names.
+
+Built once per process from a single query; afterwards prefix lookups are a
+pair of ``bisect`` calls on a sorted array per country and never touch the
+database.
+"""
+import threading
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+from cities_light.models import City
+
+from .query_inspector import unbudgeted
+
+ALL_COUNTRIES = ""
+
+
+def fold(text):
+    """Lowercase and strip accents so 'São' and 'sao' index the same."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).casefold().strip()
+
+
+class CityIndex:
+    """Sorted ``(folded name, display name)`` arrays partitioned by country code."""
+
+    def __init__(self, rows):
+        partitions = {}
+        for country_code, name in rows:
+            key = fold(name)
+            if not key:
+                continue
+            partitions.setdefault(country_code or ALL_COUNTRIES, {}).setdefault(key, name)
+            if country_code:
+                partitions.setdefault(ALL_COUNTRIES, {}).setdefault(key, name)
+
+        self.keys = {}
+        self.names = {}
+        for country_code, entries in partitions.items():
+            keys = sorted(entries)
+            self.keys[country_code] = keys
+            self.names[country_code] = [entries[key] for key in keys]
+
+    def __len__(self):
+        return len(self.keys.get(ALL_COUNTRIES, ()))
+
+    def search(self, prefix, country=None, limit=10):
+        """Return up to ``limit`` city names starting with ``prefix``, alphabetically."""
+        prefix = fold(prefix)
+        partition = (country or ALL_COUNTRIES).upper()
+        keys = self.keys.get(partition)
+        if not prefix or not keys:
+            return []
+        start = bisect_left(keys, prefix)
+        end = min(bisect_right(keys, prefix + "\uffff", lo=start), start + limit)
+        return self.names[partition][start:end]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_city_index():
+    """Build the process-wide index on first use."""
+    global _index
+    if _index is None:
+        with _lock:
+            if _index is None:
+                rows = City.objects.values_list("country__code2", "name").iterator(chunk_size=5000)
+                with unbudgeted():
+                    _index = CityIndex(rows)
+    return _index
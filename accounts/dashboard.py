@@ -0,0 +1,112 @@
+"""
+Unfold admin dashboard (UNFOLD["DASHBOARD_CALLBACK"]).
+
+Every widget reads ``DailyRollup`` (see ``accounts.rollups``), so the page
+costs a few small GROUP BYs over at most a month of rollup rows whatever
+the size of the courier and history tables. They are read from a replica
+when one is configured; a replication lag of a few seconds doesn't matter here.
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+from django_countries import countries
+
+from .db_router import read_from_replica
+from .models import DailyRollup
+
+CHART_DAYS = 14
+WINDOW_DAYS = 30
+EXCEPTION_STATUSES = ("Failed Delivery", "Returned")
+
+
+def percent(part, whole):
+    return round(100 * part / whole, 1) if whole else None
+
+
+def totals(rows):
+    return rows.aggregate(
+        events=Sum("events"), on_time=Sum("delivered_on_time"), late=Sum("delivered_late")
+    )
+
+
+def dashboard_callback(request, context):
+    with read_from_replica():
+        return build_dashboard(context)
+
+
+def build_dashboard(context):
+    today = timezone.localdate()
+    window = DailyRollup.objects.filter(date__gt=today - timedelta(days=WINDOW_DAYS), date__lte=today)
+
+    day = totals(window.filter(date=today))
+    month = totals(window)
+    exceptions = window.filter(status__in=EXCEPTION_STATUSES).aggregate(n=Sum("events"))["n"] or 0
+    delivered = (month["on_time"] or 0) + (month["late"] or 0)
+    kpis = [
+        {"title": "Tracking events today", "value": day["events"] or 0},
+        {"title": "Delivered today", "value": (day["on_time"] or 0) + (day["late"] or 0)},
+        {
+            "title": f"On-time deliveries ({WINDOW_DAYS} days)",
+            "value": "-" if not delivered else f"{percent(month['on_time'] or 0, delivered)}%",
+        },
+        {"title": f"Failed / returned ({WINDOW_DAYS} days)", "value": exceptions},
+    ]
+
+    chart_days = [today - timedelta(days=offset) for offset in range(CHART_DAYS - 1, -1, -1)]
+    per_day = {
+        row["date"]: row
+        for row in window.filter(date__gte=chart_days[0]).values("date").annotate(
+            events=Sum("events"), on_time=Sum("delivered_on_time"), late=Sum("delivered_late")
+        ).order_by()
+    }
+    daily_chart = {
+        "labels": [d.strftime("%b %d") for d in chart_days],
+        "datasets": [
+            {
+                "label": "Events",
+                "data": [per_day[d]["events"] if d in per_day else 0 for d in chart_days],
+                "backgroundColor": "var(--color-primary-300)",
+            },
+            {
+                "label": "Delivered",
+                "data": [per_day[d]["on_time"] + per_day[d]["late"] if d in per_day else 0 for d in chart_days],
+                "backgroundColor": "var(--color-primary-700)",
+            },
+        ],
+    }
+
+    by_status = window.values("status").annotate(events=Sum("events")).order_by("-events")
+    status_mix = [
+        {"title": row["status"], "events": row["events"], "share": percent(row["events"], month["events"])}
+        for row in by_status
+    ]
+
+    by_country = window.values("country").annotate(
+        events=Sum("events"), on_time=Sum("delivered_on_time"), late=Sum("delivered_late")
+    ).order_by("-events")[:10]
+    top_countries = {
+        "headers": ["Country", "Events", "Delivered", "On time"],
+        "rows": [
+            [
+                countries.name(row["country"]) or row["country"] or "Unknown",
+                row["events"],
+                row["on_time"] + row["late"],
+                "-" if not row["on_time"] + row["late"] else f"{percent(row['on_time'], row['on_time'] + row['late'])}%",
+            ]
+            for row in by_country
+        ],
+    }
+
+    context.update({
+        "cards": settings.UNFOLD.get("DASHBOARD", {}).get("cards", []),
+        "kpis": kpis,
+        "daily_chart": json.dumps(daily_chart),
+        "status_mix": status_mix,
+        "top_countries": top_countries,
+        "window_days": WINDOW_DAYS,
+        "chart_days": CHART_DAYS,
+    })
+    return context
@@ -0,0 +1,29 @@
+"""
+Connection-pool statistics for the metrics endpoint.
+
+Reads the psycopg_pool counters of this worker's pool (see DATABASES in
+settings) and adds the derived figures we alert on: connections in use,
+utilisation against ``max_size`` and the mean wait per checkout.
+"""
+from django.db import connections
+
+
+def pool_stats(alias="default"):
+    """Return a flat dict of pool metrics, or ``None`` when pooling is off."""
+    pool = getattr(connections[alias], "pool", None)
+    if pool is None:
+        return None
+
+    stats = pool.get_stats()
+    size = stats.get("pool_size", 0)
+    available = stats.get("pool_available", 0)
+    requests = stats.get("requests_num", 0)
+    in_use = size - available
+    return {
+        **stats,
+        "pool_min": pool.min_size,
+        "pool_max": pool.max_size,
+        "connections_in_use": in_use,
+        "utilisation": in_use / pool.max_size if pool.max_size else 0.0,
+        "avg_wait_ms": stats.get("requests_wait_ms", 0) / requests if requests else 0.0,
+    }
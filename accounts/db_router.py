@@ -0,0 +1,157 @@
+"""
+Read-replica routing.
+
+Replicas are configured with DB_REPLICA_HOSTS (see settings) and added as
+``replica_1``, ``replica_2``, ... Reads only go to them inside a replica
+scope: requests to REPLICA_READ_PATHS (``ReplicaRoutingMiddleware``) or an
+explicit ``with read_from_replica():`` block for exports and batch jobs.
+Everything else, and every write, uses ``default``.
+
+A replica that can't be connected to (refused, timed out, pool exhausted,
+...) is skipped for REPLICA_RETRY_SECONDS;
+with none left, reads fall back to ``default``. A session that writes is
+pinned to ``default`` for REPLICA_PIN_SECONDS so staff see their own edits
+despite replication lag.
+"""
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_SESSION_KEY = "_db_pinned_until"
+
+# replica alias -> time.monotonic() before which it isn't retried
+_down_until = {}
+
+
+class ReplicaScope:
+    __slots__ = ("use_replica", "wrote")
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+_scope = contextvars.ContextVar("replica_scope", default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith("replica_")]
+
+
+def mark_down(alias):
+    _down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+    logger.warning(
+        "Replica %s unavailable; reading from default for %ss", alias, settings.REPLICA_RETRY_SECONDS, exc_info=True
+    )
+
+
+def healthy_replica():
+    """A reachable replica alias, or ``None``."""
+    now = time.monotonic()
+    candidates = [alias for alias in replica_aliases() if _down_until.get(alias, 0) <= now]
+    random.shuffle(candidates)
+    for alias in candidates:
+        try:
+            connections[alias].ensure_connection()  # no-op once connected
+        except Exception:  # OperationalError, InterfaceError, pool timeouts, ...: all mean "not this one"
+            mark_down(alias)
+            continue
+        return alias
+    return None
+
+
+@contextmanager
+def read_from_replica():
+    """Send reads in this block to a replica (exports, reports, batch reads)."""
+    token = _scope.set(ReplicaScope(use_replica=True))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        scope = _scope.get()
+        if scope is None or not scope.use_replica or scope.wrote:
+            return DEFAULT_DB_ALIAS
+        return healthy_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Opens a replica scope for GET/HEAD requests to REPLICA_READ_PATHS, unless
+    the session is pinned to the primary; pins sessions whose POST (etc.) wrote.
+    Keep this after AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.read_paths = tuple(settings.REPLICA_READ_PATHS)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def open_scope(self, request):
+        session = getattr(request, "session", None)
+        pinned = session is not None and session.get(PIN_SESSION_KEY, 0) > time.time()
+        use_replica = (
+            not pinned
+            and request.method in ("GET", "HEAD")
+            and request.path_info.startswith(self.read_paths)
+        )
+        return ReplicaScope(use_replica)
+
+    def close_scope(self, request, scope):
+        # admin GETs route an atomic() block through db_for_write too; only
+        # pin on requests that can actually have written
+        session = getattr(request, "session", None)
+        if scope.wrote and session is not None and request.method not in ("GET", "HEAD", "OPTIONS"):
+            session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        scope = self.open_scope(request)
+        token = _scope.set(scope)
+        try:
+            response = self.get_response(request)
+        finally:
+            _scope.reset(token)
+        self.close_scope(request, scope)
+        return response
+
+    async def __acall__(self, request):
+        scope = self.open_scope(request)
+        token = _scope.set(scope)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _scope.reset(token)
+        self.close_scope(request, scope)
+        return response
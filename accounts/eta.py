@@ -0,0 +1,157 @@
+"""
+Predicted delivery windows from historical transit times.
+
+For every delivered shipment, ``build_eta_tables`` measures the hours from
+first entering each status to delivery and adds them to its lane's
+``LaneTransitTime`` histogram: once per (origin city, destination city) and
+once per (origin country, destination country). Histograms use fixed
+log-spaced buckets, so new deliveries are simply added to them; each run
+only reads Delivered history rows newer than the last one counted.
+
+``predict`` is a dict lookup in a process-wide table of the stored
+percentiles, rebuilt after ETA_TABLE_TTL seconds: the city lane if it has
+ETA_MIN_SAMPLES deliveries, else the country lane, else no prediction.
+Windows are measured from the shipment's first In Transit scan on the In
+Transit lane, or, before it has one, from ``created_at`` on the lane for
+its current status.
+"""
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from .city_index import fold
+from .query_inspector import unbudgeted
+
+# bucket i holds samples in [BUCKET_EDGES[i - 1], BUCKET_EDGES[i]) hours; the
+# first is everything under an hour, the last everything from 180 days up
+BUCKET_EDGES = np.geomspace(1.0, 24.0 * 180, 63)
+BUCKETS = len(BUCKET_EDGES) + 1
+
+FINAL_STATUSES = ("Delivered", "Returned")
+PERCENTILES = (0.1, 0.5, 0.9)
+
+
+def add_samples(histogram, hours):
+    """``histogram`` (a list, possibly empty) plus the ``hours`` samples, as a new list."""
+    counts = np.bincount(np.searchsorted(BUCKET_EDGES, hours, side="right"), minlength=BUCKETS)
+    if histogram:
+        counts = counts + np.asarray(histogram)
+    return counts.tolist()
+
+
+def percentiles(histogram, quantiles=PERCENTILES):
+    """Hours at each quantile, interpolated geometrically within a bucket."""
+    counts = np.asarray(histogram, dtype=float)
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1]
+    values = []
+    for quantile in quantiles:
+        target = quantile * total
+        bucket = int(np.searchsorted(cumulative, target, side="left"))
+        before = cumulative[bucket] - counts[bucket]
+        fraction = (target - before) / counts[bucket] if counts[bucket] else 0.0
+        upper = BUCKET_EDGES[min(bucket, len(BUCKET_EDGES) - 1)]
+        if bucket == 0:
+            values.append(float(upper * fraction))
+        else:
+            lower = BUCKET_EDGES[bucket - 1]
+            values.append(float(lower * (upper / lower) ** fraction) if bucket < len(BUCKET_EDGES) else float(lower))
+    return values
+
+
+def transit_samples(events):
+    """
+    ``[(status, hours to delivery), ...]`` from one courier's ``(status,
+    timestamp)`` events, oldest first; empty unless it was delivered.
+    """
+    delivered = next((timestamp for status, timestamp in events if status == "Delivered"), None)
+    if delivered is None:
+        return []
+    entered = {}
+    for status, timestamp in events:
+        if timestamp > delivered:
+            break
+        if status not in FINAL_STATUSES:
+            entered.setdefault(status, timestamp)
+    return [(status, (delivered - timestamp).total_seconds() / 3600) for status, timestamp in entered.items()]
+
+
+def lane_keys(courier, status):
+    """City-level and country-level keys for a Courier/TrackingSummary in ``status``."""
+    origin, destination = str(courier.sender_country or ""), str(courier.destination_country or "")
+    if not origin or not destination:
+        return []
+    return [
+        (origin, fold(courier.sender_city), destination, fold(courier.destination_city), status),
+        (origin, "", destination, "", status),
+    ]
+
+
+class EtaTable:
+    def __init__(self, rows):
+        """``rows`` yields ``(origin country, origin city, destination country, destination city, status, samples, p10, p50, p90)``."""
+        self.lanes = {tuple(row[:5]): tuple(row[5:]) for row in rows}
+        self.built_at = time.monotonic()
+
+    def predict(self, courier, now=None):
+        """
+        ``{"earliest", "likely", "latest"}`` dates (10th/50th/90th percentile)
+        and the ``samples``/``level`` behind them, or ``None``.
+        """
+        if courier.status in FINAL_STATUSES:
+            return None
+        in_transit_at = getattr(courier, "in_transit_at", None)
+        status = "In Transit" if in_transit_at is not None else courier.status
+        for key in lane_keys(courier, status):
+            lane = self.lanes.get(key)
+            if lane is not None and lane[0] >= settings.ETA_MIN_SAMPLES:
+                break
+        else:
+            return None
+        samples, p10, p50, p90 = lane
+        now = now or timezone.now()
+        # never predict a day that has already passed
+        since = in_transit_at or courier.created_at or now
+        window = [max(since + timedelta(hours=hours), now) for hours in (p10, p50, p90)]
+        return {
+            "earliest": timezone.localdate(window[0]),
+            "likely": timezone.localdate(window[1]),
+            "latest": timezone.localdate(window[2]),
+            "samples": samples,
+            "level": "city" if key[1] or key[3] else "country",
+        }
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def get_eta_table():
+    """The process-wide table, reloaded once it is ETA_TABLE_TTL seconds old."""
+    global _table
+    if _table is None or time.monotonic() - _table.built_at > settings.ETA_TABLE_TTL:
+        with _lock:
+            if _table is None or time.monotonic() - _table.built_at > settings.ETA_TABLE_TTL:
+                from .models import LaneTransitTime
+
+                with unbudgeted():
+                    _table = EtaTable(
+                        LaneTransitTime.objects.values_list(
+                            "origin_country", "origin_city", "destination_country", "destination_city", "status",
+                            "samples", "p10", "p50", "p90",
+                        ).iterator(chunk_size=10000)
+                    )
+    return _table
+
+
+async def apredict(courier):
+    """Async ``get_eta_table().predict``; only a reload leaves the event loop."""
+    table = _table
+    if table is None or time.monotonic() - table.built_at > settings.ETA_TABLE_TTL:
+        table = await sync_to_async(get_eta_table)()
+    return table.predict(courier)
@@ -0,0 +1,185 @@
+"""
+Offline geocoding from cities_light coordinates.
+
+All cities are loaded once per process into flat NumPy arrays. Names are
+looked up through a sorted array of 64-bit hashes of ``(country code, folded
+name)`` with a parallel array of rows, so resolving a location is a binary
+search and the index costs 12 bytes per name instead of a Python dict entry
+per alternate name. Distances are computed for whole batches of shipments at
+once. Nothing here makes network calls.
+"""
+import hashlib
+import threading
+from array import array
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from cities_light.models import City
+
+from .city_index import fold
+from .query_inspector import unbudgeted
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def great_circle_km(lat1, lon1, lat2, lon2):
+    """Haversine distance in km; accepts scalars or arrays of degrees, NaN propagates."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def name_key(country_code, name):
+    """64-bit hash of ``(country code, folded name)``; collisions are negligible at cities_light's size."""
+    digest = hashlib.blake2b(f"{country_code}\0{fold(name)}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class Geocoder:
+    """Array-backed ``(city, country) -> (lat, lon)`` lookup."""
+
+    def __init__(self, rows):
+        """``rows`` yields ``(country code, name, alternate names, lat, lon, population)``."""
+        keys = array("Q")
+        key_rows = array("l")
+        population = array("q")
+        lats = array("d")
+        lons = array("d")
+        largest = {}  # country code -> row of its most populous city
+
+        for country_code, name, alternate_names, lat, lon, pop in rows:
+            if lat is None or lon is None:
+                continue
+            row = len(lats)
+            lats.append(float(lat))
+            lons.append(float(lon))
+            population.append(pop or 0)
+
+            names = {fold(n) for n in [name, *(alternate_names or "").split(";")]}
+            names.discard("")
+            for candidate in names:
+                keys.append(name_key(country_code, candidate))
+                key_rows.append(row)
+            if country_code not in largest or population[largest[country_code]] < population[row]:
+                largest[country_code] = row
+
+        keys = np.frombuffer(keys, dtype=np.uint64)
+        key_rows = np.frombuffer(key_rows, dtype=np.int64).astype(np.int32)
+        population = np.frombuffer(population, dtype=np.int64)
+        # sort by key, biggest city first, then keep the first row per key:
+        # on name clashes within a country the bigger city wins
+        order = np.lexsort((-population[key_rows], keys))
+        keys, key_rows = keys[order], key_rows[order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+
+        self.keys = keys[first]
+        self.key_rows = key_rows[first]
+        self.country_fallback = largest
+        self.latitudes = np.array(lats, dtype=np.float64)
+        self.longitudes = np.array(lons, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.latitudes)
+
+    def rows(self, pairs, fallback_to_country=True):
+        """Row per ``(city, country)`` pair as an int array, -1 where unknown."""
+        pairs = list(pairs)
+        countries = [str(country or "").upper() for _, country in pairs]
+        wanted = np.array(
+            [name_key(country, city) for (city, _), country in zip(pairs, countries)], dtype=np.uint64,
+        )
+        rows = np.full(len(wanted), -1, dtype=np.int64)
+        if len(self.keys):
+            found = np.minimum(np.searchsorted(self.keys, wanted), len(self.keys) - 1)
+            hit = self.keys[found] == wanted
+            rows[hit] = self.key_rows[found[hit]]
+        if fallback_to_country:
+            for i in np.flatnonzero(rows < 0):
+                rows[i] = self.country_fallback.get(countries[i], -1)
+        return rows
+
+    def row(self, city, country, fallback_to_country=True):
+        row = int(self.rows([(city, country)], fallback_to_country)[0])
+        return None if row < 0 else row
+
+    def locate(self, city, country, fallback_to_country=True):
+        """Return ``(lat, lon)`` or ``None``; unknown cities fall back to the country's largest city."""
+        row = self.row(city, country, fallback_to_country)
+        if row is None:
+            return None
+        return float(self.latitudes[row]), float(self.longitudes[row])
+
+    def locate_many(self, pairs, fallback_to_country=True):
+        """Resolve ``(city, country)`` pairs into ``(lats, lons)`` arrays, NaN where unknown."""
+        rows = self.rows(pairs, fallback_to_country)
+        known = rows >= 0
+        lats = np.full(len(rows), np.nan)
+        lons = np.full(len(rows), np.nan)
+        lats[known] = self.latitudes[rows[known]]
+        lons[known] = self.longitudes[rows[known]]
+        return lats, lons
+
+    def shipment_distances(self, couriers, fallback_to_country=True):
+        """
+        Distances in km for a batch of couriers (model instances or ``values()`` dicts).
+
+        Returns arrays ``origin_to_current``, ``current_to_destination`` and
+        ``origin_to_destination``, aligned with ``couriers``.
+        """
+        def get(courier, field):
+            return courier[field] if isinstance(courier, dict) else getattr(courier, field)
+
+        def locate(city_field, country_field):
+            return self.locate_many(
+                [(get(c, city_field), get(c, country_field)) for c in couriers], fallback_to_country
+            )
+
+        origin = locate("sender_city", "sender_country")
+        current = locate("current_location_city", "current_location_country")
+        destination = locate("destination_city", "destination_country")
+        return {
+            "origin_to_current": great_circle_km(*origin, *current),
+            "current_to_destination": great_circle_km(*current, *destination),
+            "origin_to_destination": great_circle_km(*origin, *destination),
+        }
+
+    def route(self, courier):
+        """
+        Distances for a single courier as floats, ``None`` when either end of a
+        leg isn't a known city: a country stand-in would show made-up numbers
+        (two unknown cities in one country come out 0 km apart).
+        """
+        distances = self.shipment_distances([courier], fallback_to_country=False)
+        return {
+            leg: None if np.isnan(km[0]) else round(float(km[0]), 1)
+            for leg, km in distances.items()
+        }
+
+
+_geocoder = None
+_lock = threading.Lock()
+
+
+def get_geocoder():
+    """Build the process-wide geocoder on first use."""
+    global _geocoder
+    if _geocoder is None:
+        with _lock:
+            if _geocoder is None:
+                rows = City.objects.values_list(
+                    "country__code2", "name", "alternate_names", "latitude", "longitude", "population",
+                ).iterator(chunk_size=5000)
+                with unbudgeted():
+                    _geocoder = Geocoder(rows)
+    return _geocoder
+
+
+async def aget_geocoder():
+    """Async variant of ``get_geocoder``; only the first call leaves the event loop."""
+    if _geocoder is None:
+        await sync_to_async(get_geocoder)()
+    return _geocoder
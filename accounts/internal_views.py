@@ -0,0 +1,14 @@
+"""
+Staff-only operational endpoints. Only routed by the full URLconf
+(net_courier.urls); the public profile never imports this module.
+"""
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from .db_pool import pool_stats
+
+
+@staff_member_required
+def db_pool_metrics(request):
+    """Per-worker connection pool stats (wait time, utilisation) as JSON."""
+    return JsonResponse({"default": pool_stats("default")})
@@ -0,0 +1,203 @@
+import json
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.test import Client
+
+from accounts.models import Account, Courier
+
+SCENARIOS = ["tracking", "replay", "changelist", "save", "receipt"]
+
+# `"GET /tracking/?tracking_number=CTR-1TAP2T HTTP/1.1"` in gunicorn/nginx access logs
+ACCESS_LOG_RE = re.compile(r'"(GET|HEAD) (\S+) HTTP/[\d.]+"')
+CHANGELISTS = [
+    "/admin/accounts/courier/",
+    "/admin/accounts/couriertrackinghistory/",
+]
+STATUS_CYCLE = ["In Transit", "Out for Delivery"]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def read_request_log(path):
+    """Request paths from an access log or NDJSON lines with a ``path`` key."""
+    paths = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                if record.get("method", "GET").upper() in ("GET", "HEAD") and record.get("path"):
+                    paths.append(record["path"])
+                continue
+            match = ACCESS_LOG_RE.search(line)
+            if match:
+                paths.append(match.group(2))
+    return paths
+
+
+class Command(BaseCommand):
+    help = (
+        "In-process benchmark of the tracking view, admin changelists, the Courier save "
+        "signal and receipt rendering; optionally replays a recorded request log."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenarios", nargs="*", help=f"Any of {', '.join(SCENARIOS)} (default: all).")
+        parser.add_argument("--log", help="Access log or NDJSON request log to replay.")
+        parser.add_argument("--iterations", type=int, default=500)
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument("--user", help="Email of the staff user for admin requests (default: first superuser).")
+        parser.add_argument("--json", dest="json_path", help="Write results to this file.")
+        parser.add_argument("--compare", help="Results file from an earlier run to diff against.")
+
+    def handle(self, *args, **options):
+        scenarios = options["scenarios"] or [s for s in SCENARIOS if s != "replay" or options["log"]]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+        if "replay" in scenarios and not options["log"]:
+            raise CommandError("The replay scenario needs --log.")
+
+        self.iterations = options["iterations"]
+        self.warmup = options["warmup"]
+        self.client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "localhost")
+        self.sample = list(
+            Courier.objects.order_by("?").values_list("id", "tracking_number")[:self.iterations]
+        )
+        if not self.sample and set(scenarios) & {"tracking", "save", "receipt"}:
+            raise CommandError("No couriers in the database; run generate_couriers first.")
+
+        results = {}
+        for scenario in scenarios:
+            operations = getattr(self, f"scenario_{scenario}")(options)
+            results[scenario] = self.measure(scenario, operations)
+
+        self.report(results)
+        if options["json_path"]:
+            with open(options["json_path"], "w", encoding="utf-8") as fh:
+                json.dump(results, fh, indent=2)
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as fh:
+                self.compare(json.load(fh), results)
+
+    # ----------------------
+    # SCENARIOS
+    # ----------------------
+    # Each returns a list of zero-argument callables, one per timed operation.
+
+    def get(self, path):
+        def operation():
+            response = self.client.get(path)
+            if response.status_code >= 400:
+                raise CommandError(f"GET {path} returned {response.status_code}")
+        return operation
+
+    def scenario_tracking(self, options):
+        return [
+            self.get(f"/tracking/?tracking_number={number}")
+            for _id, number in self.cycle(self.sample)
+        ]
+
+    def scenario_replay(self, options):
+        paths = read_request_log(options["log"])
+        if not paths:
+            raise CommandError(f"No GET requests found in {options['log']}.")
+        if any(path.startswith("/admin/") for path in paths):
+            self.login(options)
+        return [self.get(path) for path in paths]
+
+    def scenario_changelist(self, options):
+        self.login(options)
+        return [self.get(path) for path in self.cycle(CHANGELISTS)]
+
+    def scenario_save(self, options):
+        def save(courier_id, status):
+            def operation():
+                # roll back so repeated runs start from the same data
+                with transaction.atomic():
+                    courier = Courier.objects.get(pk=courier_id)
+                    courier.status = status
+                    courier.save()
+                    transaction.set_rollback(True)
+            return operation
+        return [
+            save(courier_id, STATUS_CYCLE[i % 2])
+            for i, (courier_id, _number) in enumerate(self.cycle(self.sample))
+        ]
+
+    def scenario_receipt(self, options):
+        def render(courier_id):
+            def operation():
+                courier = Courier.objects.get(pk=courier_id)
+                render_to_string("courier_receipt.html", {"courier": courier})
+            return operation
+        return [render(courier_id) for courier_id, _number in self.cycle(self.sample)]
+
+    def cycle(self, items):
+        return [items[i % len(items)] for i in range(self.iterations)]
+
+    def login(self, options):
+        users = Account.objects.filter(is_staff=True)
+        user = users.get(email=options["user"]) if options["user"] else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No superuser found; pass --user with a staff email.")
+        self.client.force_login(user)
+
+    # ----------------------
+    # MEASURING
+    # ----------------------
+    def measure(self, scenario, operations):
+        for operation in operations[:self.warmup]:
+            operation()
+        latencies = []
+        started = time.perf_counter()
+        for operation in operations:
+            op_started = time.perf_counter()
+            operation()
+            latencies.append((time.perf_counter() - op_started) * 1000)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        self.stdout.write(f"  {scenario}: {len(latencies)} operations in {elapsed:.2f}s")
+        return {
+            "count": len(latencies),
+            "ops_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p90_ms": percentile(latencies, 90),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": latencies[-1] if latencies else float("nan"),
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"\n{'scenario':<12} {'ops':>6} {'ops/s':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for scenario, stats in results.items():
+            self.stdout.write(
+                f"{scenario:<12} {stats['count']:>6} {stats['ops_per_sec']:>9.1f} {stats['p50_ms']:>8.2f} "
+                f"{stats['p90_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['max_ms']:>8.2f}"
+            )
+
+    def compare(self, baseline, results):
+        self.stdout.write(f"\n{'scenario':<12} {'ops/s':>16} {'p99 ms':>18}")
+        for scenario, stats in results.items():
+            before = baseline.get(scenario)
+            if not before:
+                continue
+            ops_change = (stats["ops_per_sec"] / before["ops_per_sec"] - 1) * 100 if before["ops_per_sec"] else 0
+            p99_change = (stats["p99_ms"] / before["p99_ms"] - 1) * 100 if before["p99_ms"] else 0
+            self.stdout.write(
+                f"{scenario:<12} {stats['ops_per_sec']:>9.1f} ({ops_change:+5.1f}%) "
+                f"{stats['p99_ms']:>9.2f} ({p99_change:+5.1f}%)"
+            )
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVER_COMMANDS = {
+    "wsgi": ["net_courier.wsgi"],
+    "asgi": ["net_courier.asgi:application", "-k", "uvicorn_worker.UvicornWorker"],
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn in WSGI (sync) and ASGI (uvicorn worker) mode and compare "
+        "requests/sec and latency percentiles while slow clients hold connections open."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modes", nargs="+", choices=sorted(SERVER_COMMANDS), default=["wsgi", "asgi"])
+        parser.add_argument("--path", default="/", help="Path to request, e.g. / or /tracking/?tracking_number=CTR-1TAP2T")
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--concurrency", type=int, default=32, help="Concurrent well-behaved clients.")
+        parser.add_argument("--slow-clients", type=int, default=8, help="Clients that trickle their headers.")
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds to measure per mode.")
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        results = []
+        for mode in options["modes"]:
+            server = self.start_server(mode, options)
+            try:
+                results.append((mode, asyncio.run(self.run_load(options))))
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        self.stdout.write(
+            f"\n{'mode':<6} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}"
+        )
+        for mode, stats in results:
+            self.stdout.write(
+                f"{mode:<6} {stats['requests']:>9} {stats['errors']:>7} {stats['rps']:>9.1f} "
+                f"{stats['p50']:>9.1f} {stats['p99']:>9.1f}"
+            )
+
+    # ----------------------
+    # SERVER
+    # ----------------------
+    def start_server(self, mode, options):
+        command = [
+            sys.executable, "-m", "gunicorn", *SERVER_COMMANDS[mode],
+            "--workers", str(options["workers"]),
+            "--bind", f"127.0.0.1:{options['port']}",
+        ]
+        self.stdout.write(f"Starting {mode}: {' '.join(command[2:])}")
+        server = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=os.environ.copy(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"{mode} server exited with code {server.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", options["port"]), timeout=0.5).close()
+                time.sleep(1)  # let every worker finish booting
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.kill()
+        raise CommandError(f"{mode} server did not start within 30s")
+
+    # ----------------------
+    # LOAD
+    # ----------------------
+    def host(self):
+        return settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "localhost"
+
+    async def slow_client(self, port, deadline):
+        """Open a connection and dribble headers so the request never completes."""
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            return
+        try:
+            writer.write(f"GET / HTTP/1.1\r\nHost: {self.host()}\r\n".encode())
+            while time.monotonic() < deadline:
+                writer.write(b"X-Slow: 1\r\n")
+                await writer.drain()
+                await asyncio.sleep(1)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def fast_client(self, client, url, deadline, latencies, errors):
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, headers={"Host": self.host()})
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+                    continue
+            except httpx.HTTPError as exc:
+                errors.append(type(exc).__name__)
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    async def run_load(self, options):
+        port = options["port"]
+        url = f"http://127.0.0.1:{port}{options['path']}"
+        deadline = time.monotonic() + options["duration"]
+        latencies = []
+        errors = []
+
+        limits = httpx.Limits(max_connections=options["concurrency"])
+        async with httpx.AsyncClient(limits=limits, timeout=options["duration"]) as client:
+            started = time.monotonic()
+            await asyncio.gather(
+                *(self.slow_client(port, deadline) for _ in range(options["slow_clients"])),
+                *(
+                    self.fast_client(client, url, deadline, latencies, errors)
+                    for _ in range(options["concurrency"])
+                ),
+            )
+            elapsed = time.monotonic() - started
+
+        latencies.sort()
+        return {
+            "requests": len(latencies),
+            "errors": len(errors),
+            "rps": len(latencies) / elapsed,
+            "p50": percentile(latencies, 50),
+            "p99": percentile(latencies, 99),
+        }
@@ -0,0 +1,105 @@
+import json
+import os
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.route_map import OUTLINES_PATH
+
+
+def simplify(points, tolerance):
+    """Douglas-Peucker on an ``(n, 2)`` array of lon/lat; keeps both ends."""
+    if len(points) < 3:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        segment = end - start
+        inner = points[first + 1:last] - start
+        length = np.hypot(*segment)
+        if length == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.extend([(first, split), (split, last)])
+    return points[keep]
+
+
+def ring_area(points):
+    x, y = points[:, 0], points[:, 1]
+    return abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1))) / 2
+
+
+def country_code(properties):
+    # Natural Earth uses -99 in ISO_A2 for a few countries (France, Norway, ...)
+    for field in ("ISO_A2", "ISO_A2_EH", "iso_a2"):
+        code = properties.get(field)
+        if code and code != "-99":
+            return code.upper()
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the simplified country outlines the tracking route map draws "
+        "(accounts/data/country_outlines.json) from a Natural Earth admin-0 countries GeoJSON, "
+        "e.g. ne_110m_admin_0_countries.geojson."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("geojson", help="Path to the Natural Earth countries GeoJSON.")
+        parser.add_argument("--tolerance", type=float, default=0.15, help="Simplification tolerance in degrees.")
+        parser.add_argument("--min-area", type=float, default=0.5, help="Drop rings smaller than this (square degrees).")
+        parser.add_argument("--output", default=OUTLINES_PATH)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["geojson"], encoding="utf-8") as fh:
+                features = json.load(fh)["features"]
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f"Can't read {options['geojson']}: {exc}")
+
+        countries = {}
+        points_in = points_out = 0
+        for feature in features:
+            code = country_code(feature.get("properties") or {})
+            geometry = feature.get("geometry") or {}
+            if code is None or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+                continue
+            polygons = geometry["coordinates"] if geometry["type"] == "MultiPolygon" else [geometry["coordinates"]]
+            for polygon in polygons:
+                exterior = np.asarray(polygon[0], dtype=float)[:, :2]  # holes are too small to matter here
+                if ring_area(exterior) < options["min_area"]:
+                    continue
+                ring = simplify(exterior, options["tolerance"])
+                if len(ring) < 4:
+                    continue
+                points_in += len(exterior)
+                points_out += len(ring)
+                countries.setdefault(code, []).append([round(float(v), 2) for v in ring.ravel()])
+
+        os.makedirs(os.path.dirname(options["output"]), exist_ok=True)
+        with open(options["output"] + ".tmp", "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "source": os.path.basename(options["geojson"]),
+                    "tolerance": options["tolerance"],
+                    "countries": dict(sorted(countries.items())),
+                },
+                fh,
+                separators=(",", ":"),
+            )
+        os.replace(options["output"] + ".tmp", options["output"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(countries)} countries ({points_out} of {points_in} points) to {options['output']} "
+            f"({os.path.getsize(options['output']) / 1024:.0f} KB)"
+        ))
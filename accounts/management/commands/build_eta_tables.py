@@ -0,0 +1,101 @@
+import time
+from collections import defaultdict
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.eta import add_samples, lane_keys, percentiles, transit_samples
+from accounts.models import Courier, CourierTrackingHistory, LaneTransitTime
+
+LANE_FIELDS = ("origin_country", "origin_city", "destination_country", "destination_city", "status")
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold deliveries recorded since the last run into the per-lane transit-time "
+        "percentile tables behind predicted delivery windows. Run it on a schedule (e.g. hourly)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5_000, help="Delivered events read per batch.")
+        parser.add_argument("--rebuild", action="store_true", help="Drop the tables and recount all history.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options["rebuild"]:
+            LaneTransitTime.objects.all().delete()
+        lanes = {
+            tuple(getattr(lane, field) for field in LANE_FIELDS): lane
+            for lane in LaneTransitTime.objects.all()
+        }
+        watermark = LaneTransitTime.objects.aggregate(m=Max("through_history_id"))["m"] or 0
+
+        deliveries = 0
+        while True:
+            batch = list(
+                CourierTrackingHistory.objects.filter(status="Delivered", id__gt=watermark)
+                .order_by("id").values_list("id", "courier_id")[:options["batch_size"]]
+            )
+            if not batch:
+                break
+            watermark = batch[-1][0]
+            counted = self.fold_batch(batch, lanes, watermark)
+            deliveries += counted
+            self.stdout.write(f"  through history #{watermark}: {counted} deliveries")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Counted {deliveries} deliveries into {len(lanes)} lanes in {time.perf_counter() - started:.1f}s"
+        ))
+
+    def fold_batch(self, batch, lanes, watermark):
+        courier_ids = {courier_id for _, courier_id in batch}
+        couriers = Courier.objects.filter(id__in=courier_ids).only(
+            "id", "sender_country", "sender_city", "destination_country", "destination_city"
+        ).in_bulk()
+        timelines = {
+            courier_id: list(rows)
+            for courier_id, rows in groupby(
+                CourierTrackingHistory.objects.filter(courier_id__in=courier_ids)
+                .order_by("courier_id", "timestamp", "id")
+                .values_list("courier_id", "id", "status", "timestamp"),
+                key=lambda row: row[0],
+            )
+        }
+
+        samples = defaultdict(list)
+        counted = 0
+        for history_id, courier_id in batch:
+            events = timelines.get(courier_id, [])
+            first_delivery = next((row[1] for row in events if row[2] == "Delivered"), None)
+            if history_id != first_delivery or courier_id not in couriers:
+                continue  # a repeat Delivered event; the first one is (or was) counted
+            counted += 1
+            for status, hours in transit_samples([(row[2], row[3]) for row in events]):
+                for key in lane_keys(couriers[courier_id], status):
+                    samples[key].append(hours)
+
+        now = timezone.now()
+        changed = []
+        for key, hours in samples.items():
+            lane = lanes.get(key)
+            if lane is None:
+                lane = lanes[key] = LaneTransitTime(**dict(zip(LANE_FIELDS, key)))
+            lane.histogram = add_samples(lane.histogram, hours)
+            lane.samples = sum(lane.histogram)
+            lane.p10, lane.p50, lane.p90 = percentiles(lane.histogram)
+            lane.through_history_id = watermark
+            lane.updated_at = now
+            changed.append(lane)
+        # counts and watermark land together; a batch of repeat deliveries only is simply re-read next run
+        with transaction.atomic():
+            LaneTransitTime.objects.bulk_create(
+                changed,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=LANE_FIELDS,
+                update_fields=("histogram", "samples", "p10", "p50", "p90", "through_history_id", "updated_at"),
+            )
+        return counted
@@ -0,0 +1,314 @@
+import os
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+
+ASSETS_DIR = os.path.join(settings.BASE_DIR, "static", "assets")
+CSS_DIR = os.path.join(ASSETS_DIR, "css")
+FONTS_DIR = os.path.join(ASSETS_DIR, "fonts")
+SUBSET_DIR = os.path.join(FONTS_DIR, "subset")
+
+# Our own scripts that toggle icon classes at runtime (the vendored *.min.js
+# bundles never reference icons by name).
+SCRIPT_FILES = ["main.js", "validnavs.js"]
+
+# Font Awesome style class -> (font file, @font-face family, weight)
+FA_STYLES = {
+    "fa": ("fa-solid-900", "Font Awesome 5 Pro", 900),
+    "fas": ("fa-solid-900", "Font Awesome 5 Pro", 900),
+    "far": ("fa-regular-400", "Font Awesome 5 Pro", 400),
+    "fal": ("fa-light-300", "Font Awesome 5 Pro", 300),
+    "fab": ("fa-brands-400", "Font Awesome 5 Brands", 400),
+    "fad": ("fa-duotone-900", "Font Awesome 5 Duotone", 900),
+}
+# Files style.css reaches through `font-family: "Font Awesome 5 Pro"`.
+FA_PRO_FILES = ["fa-light-300", "fa-regular-400", "fa-solid-900"]
+
+TRANZI_FONT = "tranzi-icon"
+TRANZI_FAMILY = "tranziFont"
+
+CLASS_ATTR_RE = re.compile(r"""class\s*=\s*(["'])(.*?)\1""", re.S)
+SCRIPT_CLASS_RE = re.compile(r"""["'\s.](fa-[a-z0-9-]+|icon-[a-z0-9-]+)\b""")
+CONTENT_RE = re.compile(r"""content\s*:\s*["']\\([0-9a-fA-F]+)["']""")
+
+
+def split_rules(css):
+    """Split a stylesheet into top-level ``(prelude, body)`` pairs."""
+    rules = []
+    depth = 0
+    start = 0
+    prelude = ""
+    for i, ch in enumerate(css):
+        if ch == "{":
+            if depth == 0:
+                prelude = css[start:i].strip()
+                start = i + 1
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                rules.append((prelude, css[start:i]))
+                start = i + 1
+    return rules
+
+
+def strip_comments(css):
+    return re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+
+
+def parse_glyphs(css, prefix):
+    """Map icon names to codepoints from ``.<prefix>NAME:before{content:"\\xxxx"}`` rules."""
+    glyph_re = re.compile(r"^\.(%s[a-z0-9-]+):before$" % re.escape(prefix))
+    glyphs = {}
+    for prelude, body in split_rules(strip_comments(css)):
+        match = CONTENT_RE.search(body)
+        if not match:
+            continue
+        for selector in prelude.split(","):
+            name = glyph_re.match(selector.strip())
+            if name:
+                glyphs[name.group(1)] = int(match.group(1), 16)
+    return glyphs
+
+
+class Command(BaseCommand):
+    help = (
+        "Scan templates for Font Awesome / tranzi icon classes and build subset "
+        "woff2 fonts plus trimmed CSS for just those glyphs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only verify the committed subset CSS and fonts cover every icon in use; write nothing.",
+        )
+
+    def handle(self, *args, **options):
+        with open(os.path.join(CSS_DIR, "font-awesome.min.css"), encoding="utf-8") as fh:
+            fa_css = fh.read()
+        with open(os.path.join(CSS_DIR, "tranzi-icons.css"), encoding="utf-8") as fh:
+            tranzi_css = fh.read()
+
+        fa_glyphs = parse_glyphs(fa_css, "fa-")
+        fa_classes = set(re.findall(r"\.(fa-[a-z0-9-]+)", fa_css))
+        tranzi_glyphs = parse_glyphs(tranzi_css, "icon-")
+
+        fa_usage, tranzi_usage, unknown = self.collect_usage(fa_glyphs, fa_classes, tranzi_glyphs)
+        if unknown:
+            raise CommandError(
+                "Templates use icons that are not defined in the icon CSS:\n  "
+                + "\n  ".join(sorted(unknown))
+            )
+
+        codepoints = self.needed_codepoints(fa_usage, tranzi_usage, fa_glyphs, tranzi_glyphs)
+        if options["check"]:
+            self.check_subset(fa_usage, tranzi_usage, codepoints)
+            return
+
+        os.makedirs(SUBSET_DIR, exist_ok=True)
+        missing = []
+        for font_file, points in sorted(codepoints.items()):
+            missing += self.build_font(font_file, points)
+        if missing:
+            raise CommandError(
+                "Icons missing from their font file:\n  " + "\n  ".join(missing)
+            )
+
+        used_fa_names = set().union(*fa_usage.values())
+        self.write_css(
+            "font-awesome.subset.css",
+            self.trim_fa_css(fa_css, used_fa_names, fa_usage.get("fad", set()), codepoints),
+        )
+        self.write_css(
+            "tranzi-icons.subset.css",
+            self.trim_tranzi_css(tranzi_css, tranzi_usage),
+        )
+
+    # ----------------------
+    # SCANNING
+    # ----------------------
+    def collect_usage(self, fa_glyphs, fa_classes, tranzi_glyphs):
+        """Return ``({style: {fa-name}}, {icon-name}, unknown)`` for every template and script."""
+        with open(os.path.join(CSS_DIR, "style.css"), encoding="utf-8") as fh:
+            # style.css defines a few non-font `icon-*` helper classes
+            site_classes = set(re.findall(r"\.(icon-[a-z0-9-]+)", fh.read()))
+        fa_usage = defaultdict(set)
+        tranzi_usage = set()
+        unknown = set()
+
+        for template_dir in settings.TEMPLATES[0]["DIRS"]:
+            for filename in sorted(os.listdir(template_dir)):
+                if not filename.endswith(".html"):
+                    continue
+                path = os.path.join(template_dir, filename)
+                with open(path, encoding="utf-8") as fh:
+                    source = fh.read()
+                for match in CLASS_ATTR_RE.finditer(source):
+                    tokens = match.group(2).split()
+                    line = source.count("\n", 0, match.start()) + 1
+                    where = f"{filename}:{line}"
+                    styles = [t for t in tokens if t in FA_STYLES] or ["fa"]
+                    for token in tokens:
+                        if token.startswith("fa-"):
+                            if token in fa_glyphs:
+                                for style in styles:
+                                    fa_usage[style].add(token)
+                            elif token not in fa_classes:
+                                unknown.add(f"{token} ({where})")
+                        elif token.startswith("icon-"):
+                            if token in tranzi_glyphs:
+                                tranzi_usage.add(token)
+                            elif token not in site_classes:
+                                unknown.add(f"{token} ({where})")
+
+        for filename in SCRIPT_FILES:
+            path = os.path.join(ASSETS_DIR, "js", filename)
+            with open(path, encoding="utf-8") as fh:
+                source = fh.read()
+            for token in SCRIPT_CLASS_RE.findall(source):
+                if token in fa_glyphs:
+                    fa_usage["fa"].add(token)
+                elif token in tranzi_glyphs:
+                    tranzi_usage.add(token)
+        return fa_usage, tranzi_usage, unknown
+
+    def needed_codepoints(self, fa_usage, tranzi_usage, fa_glyphs, tranzi_glyphs):
+        """``{font file: {codepoint}}`` for every icon in use."""
+        codepoints = defaultdict(set)
+        for style, names in fa_usage.items():
+            font_file = FA_STYLES[style][0]
+            for name in names:
+                codepoints[font_file].add(fa_glyphs[name])
+                if style == "fad":
+                    # duotone secondary layer lives at codepoint + 0x100000
+                    codepoints[font_file].add(fa_glyphs[name] + 0x100000)
+        for codepoint in self.stylesheet_codepoints():
+            for font_file in FA_PRO_FILES:
+                codepoints[font_file].add(codepoint)
+        for name in tranzi_usage:
+            codepoints[TRANZI_FONT].add(tranzi_glyphs[name])
+        return codepoints
+
+    def stylesheet_codepoints(self):
+        """Codepoints that style.css renders through the Font Awesome Pro family."""
+        with open(os.path.join(CSS_DIR, "style.css"), encoding="utf-8") as fh:
+            css = strip_comments(fh.read())
+        points = set()
+        for _prelude, body in split_rules(css):
+            if "Font Awesome" in body:
+                points.update(int(code, 16) for code in CONTENT_RE.findall(body))
+        return points
+
+    # ----------------------
+    # BUILDING
+    # ----------------------
+    def build_font(self, font_file, points):
+        source = os.path.join(FONTS_DIR, f"{font_file}.woff2")
+        cmap = TTFont(source).getBestCmap()
+        missing = [f"U+{p:04X} in {font_file}" for p in sorted(points) if p not in cmap]
+        present = [p for p in points if p in cmap]
+
+        opts = subset.Options()
+        opts.flavor = "woff2"
+        opts.layout_features = []
+        opts.name_IDs = []
+        opts.notdef_outline = True
+        opts.ignore_missing_unicodes = True
+        opts.drop_tables += ["FFTM"]
+        font = subset.load_font(source, opts)
+        subsetter = subset.Subsetter(opts)
+        subsetter.populate(unicodes=present)
+        subsetter.subset(font)
+        target = os.path.join(SUBSET_DIR, f"{font_file}.woff2")
+        subset.save_font(font, target, opts)
+
+        before = os.path.getsize(source)
+        after = os.path.getsize(target)
+        self.stdout.write(
+            f"{font_file}: {len(present)} glyphs, {before / 1024:.1f} KB -> {after / 1024:.1f} KB"
+        )
+        return missing
+
+    def font_face(self, family, weight, font_file):
+        return (
+            f'@font-face{{font-family:"{family}";font-style:normal;font-weight:{weight};'
+            f"font-display:block;src:url(../fonts/subset/{font_file}.woff2) format(\"woff2\")}}"
+        )
+
+    def trim_fa_css(self, css, used_names, duotone_names, codepoints):
+        out = []
+        for prelude, body in split_rules(strip_comments(css)):
+            if prelude == "@font-face":
+                continue
+            selectors = [s.strip() for s in prelude.split(",")]
+            glyph_selectors = [s for s in selectors if re.match(r"^\.fa-[a-z0-9-]+:before$", s)]
+            duotone_selectors = [s for s in selectors if re.match(r"^\.fad\.fa-[a-z0-9-]+:after$", s)]
+            if glyph_selectors and len(glyph_selectors) == len(selectors):
+                selectors = [s for s in selectors if s[1:-len(":before")] in used_names]
+            elif duotone_selectors and len(duotone_selectors) == len(selectors):
+                selectors = [s for s in selectors if s[5:-len(":after")] in duotone_names]
+            if selectors:
+                out.append(f"{','.join(selectors)}{{{body}}}")
+
+        faces = []
+        for font_file, family, weight in sorted(set(FA_STYLES.values())):
+            if font_file in codepoints:
+                faces.append(self.font_face(family, weight, font_file))
+        return "".join(faces + out)
+
+    def trim_tranzi_css(self, css, used_names):
+        out = [self.font_face(TRANZI_FAMILY, "normal", TRANZI_FONT)]
+        for prelude, body in split_rules(strip_comments(css)):
+            if prelude == "@font-face":
+                continue
+            name = re.match(r"^\.(icon-[a-z0-9-]+):before$", prelude)
+            if name and name.group(1) not in used_names:
+                continue
+            out.append(f"{prelude}{{{' '.join(body.split())}}}")
+        return "\n".join(out)
+
+    def write_css(self, filename, css):
+        with open(os.path.join(CSS_DIR, filename), "w", encoding="utf-8") as fh:
+            fh.write(css + "\n")
+        self.stdout.write(f"{filename}: {len(css) / 1024:.1f} KB")
+
+    # ----------------------
+    # CHECKING
+    # ----------------------
+    def check_subset(self, fa_usage, tranzi_usage, codepoints):
+        missing = []
+        for filename, names in (
+            ("font-awesome.subset.css", set().union(*fa_usage.values())),
+            ("tranzi-icons.subset.css", tranzi_usage),
+        ):
+            path = os.path.join(CSS_DIR, filename)
+            if not os.path.exists(path):
+                raise CommandError(f"{filename} has not been built; run build_icon_subset.")
+            with open(path, encoding="utf-8") as fh:
+                prefix = "fa-" if filename.startswith("font-awesome") else "icon-"
+                built = set(parse_glyphs(fh.read(), prefix))
+            missing += [f"{name} ({filename})" for name in sorted(names - built)]
+        # the CSS naming a glyph doesn't help if the subset font lost it
+        for font_file, points in sorted(codepoints.items()):
+            path = os.path.join(SUBSET_DIR, f"{font_file}.woff2")
+            if not os.path.exists(path):
+                missing.append(f"{font_file}.woff2 (not built)")
+                continue
+            available = TTFont(os.path.join(FONTS_DIR, f"{font_file}.woff2")).getBestCmap()
+            built = TTFont(path).getBestCmap() or {}
+            missing += [
+                f"U+{point:04X} ({font_file}.woff2)"
+                for point in sorted(points) if point in available and point not in built
+            ]
+        if missing:
+            raise CommandError(
+                "Icons used in templates are missing from the subset; run build_icon_subset:\n  "
+                + "\n  ".join(missing)
+            )
+        self.stdout.write(self.style.SUCCESS("Icon subset covers every icon in use."))
@@ -0,0 +1,37 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.webhooks import deliver_due, make_client
+
+
+class Command(BaseCommand):
+    help = "Deliver queued partner webhook events in signed batches, retrying with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain what is due now and exit.")
+        parser.add_argument("--interval", type=float, default=2.0, help="Seconds to sleep when nothing is due.")
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        # one client for the life of the worker so partner connections stay alive
+        with make_client() as client:
+            while self.running:
+                close_old_connections()
+                delivered, failed = deliver_due(client)
+                if delivered or failed:
+                    self.stdout.write(f"delivered {delivered}, failed {failed}")
+                if options["once"]:
+                    if not delivered and not failed:
+                        break
+                    continue
+                if not delivered and not failed:
+                    time.sleep(options["interval"])
+
+    def stop(self, *args):
+        self.running = False
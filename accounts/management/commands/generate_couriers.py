@@ -0,0 +1,259 @@
+import random
+import string
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from accounts.models import Courier, CourierTrackingHistory, TrackingSummary
+from accounts.rollups import rebuild
+from accounts.tracking_lookup import canonical
+
+# A handful of real lanes so distances, filters and rollups look plausible.
+CITIES = {
+    "NG": ["Lagos", "Abuja", "Port Harcourt", "Kano", "Ibadan"],
+    "GB": ["London", "Manchester", "Birmingham", "Glasgow"],
+    "US": ["New York", "Houston", "Chicago", "Los Angeles", "Miami"],
+    "FR": ["Paris", "Lyon", "Marseille"],
+    "DE": ["Berlin", "Hamburg", "Frankfurt", "Munich"],
+    "AE": ["Dubai", "Abu Dhabi"],
+    "CN": ["Shanghai", "Shenzhen", "Guangzhou"],
+    "GH": ["Accra", "Kumasi"],
+    "ZA": ["Johannesburg", "Cape Town", "Durban"],
+    "CA": ["Toronto", "Vancouver", "Montreal"],
+}
+COUNTRIES = list(CITIES)
+FIRST_NAMES = ["Ada", "John", "Mary", "Chinedu", "Fatima", "James", "Aisha", "Peter", "Grace", "Ahmed", "Sofia", "Liam"]
+LAST_NAMES = ["Okafor", "Smith", "Johnson", "Bello", "Brown", "Mensah", "Müller", "Dubois", "Chen", "Adeyemi"]
+ITEMS = ["Documents", "Electronics", "Clothing", "Auto parts", "Medical supplies", "Books", "Cosmetics", "Machinery"]
+COLOURS = ["Brown", "White", "Black", "Blue", "Red"]
+
+# status path a shipment walks through, and how far synthetic ones get
+LIFECYCLE = ["Order Placed", "In Transit", "In Transit", "Out for Delivery", "Delivered"]
+FINAL_STATUS_WEIGHTS = {
+    "Pending": 3, "Order Placed": 5, "In Transit": 25, "Out for Delivery": 7,
+    "Delivered": 50, "Returned": 5, "Failed Delivery": 5,
+}
+
+TRACKING_ALPHABET = string.ascii_uppercase + string.digits
+TRACKING_SPACE = len(TRACKING_ALPHABET) ** 6
+TRACKING_MULTIPLIER = 1_000_003  # prime, coprime with 36 -> bijective over the space
+
+
+def synthetic_tracking_number(n):
+    """Deterministic, collision-free CTR-XXXXXX for sequence number ``n``."""
+    value = (n * TRACKING_MULTIPLIER) % TRACKING_SPACE
+    chars = []
+    for _ in range(6):
+        value, digit = divmod(value, len(TRACKING_ALPHABET))
+        chars.append(TRACKING_ALPHABET[digit])
+    return "CTR-" + "".join(chars)
+
+
+def summary_row(courier, history=()):
+    """The ``TrackingSummary`` row dict for a generated courier row dict and its history, oldest first."""
+    return {
+        "courier_id": courier["id"],
+        "tracking_key": canonical(courier["tracking_number"]),
+        "in_transit_at": next((event["timestamp"] for event in history if event["status"] == "In Transit"), None),
+        **{field: courier[field] for field in TrackingSummary.FIELDS},
+    }
+
+
+def copy_records(model, rows):
+    """
+    ``(columns, records)`` for a COPY into ``model``'s table: every concrete
+    column, with the field default where a row dict leaves one out (e.g.
+    ``CourierTrackingHistory.idempotency_key``, which only scans set).
+    """
+    fields = model._meta.concrete_fields
+    records = (
+        [row[field.attname] if field.attname in row else field.get_default() for field in fields]
+        for row in rows
+    )
+    return [field.column for field in fields], records
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate realistic synthetic Courier and CourierTrackingHistory rows. "
+        "Uses COPY on PostgreSQL (bulk_create elsewhere); the post_save signals are bypassed, "
+        "so tracking summaries are written alongside and the dashboard rollups rebuilt afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--couriers", type=int, default=100_000)
+        parser.add_argument("--days", type=int, default=365, help="Spread created_at over this many days.")
+        parser.add_argument("--batch-size", type=int, default=50_000)
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        self.now = timezone.now()
+        self.days = options["days"]
+        use_copy = connection.vendor == "postgresql"
+
+        existing = set(Courier.objects.values_list("tracking_number", flat=True))
+        courier_id = Courier.objects.aggregate(m=Max("id"))["m"] or 0
+        history_id = CourierTrackingHistory.objects.aggregate(m=Max("id"))["m"] or 0
+        sequence = courier_id
+
+        started = time.perf_counter()
+        made_couriers = made_history = 0
+        remaining = options["couriers"]
+        while remaining > 0:
+            size = min(remaining, options["batch_size"])
+            couriers, history, summaries = [], [], []
+            for _ in range(size):
+                sequence += 1
+                tracking_number = synthetic_tracking_number(sequence)
+                while tracking_number in existing:
+                    sequence += 1
+                    tracking_number = synthetic_tracking_number(sequence)
+                courier_id += 1
+                courier = self.make_courier(rng, courier_id, tracking_number)
+                couriers.append(courier)
+                events = self.make_history(rng, courier)
+                for event in events:
+                    history_id += 1
+                    event["id"] = history_id
+                history.extend(events)
+                summaries.append(summary_row(courier, events))
+
+            with transaction.atomic():
+                if use_copy:
+                    self.copy_rows(Courier, couriers)
+                    self.copy_rows(CourierTrackingHistory, history)
+                    self.copy_rows(TrackingSummary, summaries)
+                else:
+                    Courier.objects.bulk_create([Courier(**row) for row in couriers])
+                    CourierTrackingHistory.objects.bulk_create(
+                        [CourierTrackingHistory(**row) for row in history]
+                    )
+                    TrackingSummary.objects.bulk_create([TrackingSummary(**row) for row in summaries])
+            made_couriers += len(couriers)
+            made_history += len(history)
+            remaining -= size
+            self.stdout.write(f"  {made_couriers} couriers, {made_history} history rows")
+
+        if use_copy:
+            self.reset_sequences()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {made_couriers} couriers and {made_history} history rows in {elapsed:.1f}s "
+            f"({made_couriers / elapsed:,.0f} couriers/s)"
+        ))
+        # generated history can run a few weeks past today
+        today = timezone.localdate(self.now)
+        rollups = rebuild(today - timedelta(days=self.days + 1), today + timedelta(days=30))
+        self.stdout.write(f"Rebuilt {rollups} dashboard rollups.")
+
+    # ----------------------
+    # ROWS
+    # ----------------------
+    def make_courier(self, rng, courier_id, tracking_number):
+        sender_country = rng.choice(COUNTRIES)
+        destination_country = sender_country if rng.random() < 0.3 else rng.choice(COUNTRIES)
+        destination_city = rng.choice(CITIES[destination_country])
+        status = rng.choices(list(FINAL_STATUS_WEIGHTS), weights=FINAL_STATUS_WEIGHTS.values())[0]
+        if status == "Delivered":
+            current_country, current_city = destination_country, destination_city
+        else:
+            current_country = rng.choice((sender_country, destination_country))
+            current_city = rng.choice(CITIES[current_country])
+
+        created_at = self.now - timedelta(seconds=rng.randrange(self.days * 86400))
+        date_sent = created_at.date()
+        sender = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        receiver = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        return {
+            "id": courier_id,
+            "user_id": None,
+            "trailer_number": str(rng.randrange(100000, 999999)),
+            "seal_number": str(rng.randrange(1000, 9999)),
+            "scac": "N/A",
+            "tracking_number": tracking_number,
+            "status": status,
+            "current_location_country": current_country,
+            "current_location_city": current_city,
+            "receiver_name": receiver,
+            "receiver_contact_number": f"+{rng.randrange(10**10, 10**11)}",
+            "receiver_email": f"{receiver.split()[0].lower()}{courier_id}@example.com",
+            "receiver_address": f"{rng.randrange(1, 200)} {rng.choice(LAST_NAMES)} Street",
+            "receiver_country": destination_country,
+            "receiver_city": destination_city,
+            "sender_name": sender,
+            "sender_contact_number": f"+{rng.randrange(10**10, 10**11)}",
+            "sender_email": f"{sender.split()[0].lower()}{courier_id}@example.com",
+            "sender_address": f"{rng.randrange(1, 200)} {rng.choice(LAST_NAMES)} Road",
+            "sender_country": sender_country,
+            "sender_city": rng.choice(CITIES[sender_country]),
+            "item_description": rng.choice(ITEMS),
+            "number_of_items": rng.randrange(1, 10),
+            "parcel_colour": rng.choice(COLOURS),
+            "weight": Decimal(rng.randrange(10, 50000)) / 100,
+            "rate": Decimal(rng.randrange(1000, 500000)) / 100,
+            "category": "Domestic" if sender_country == destination_country else "International",
+            "destination_country": destination_country,
+            "destination_city": destination_city,
+            "date_sent": date_sent,
+            "estimated_delivery_date": date_sent + timedelta(days=rng.randrange(2, 15)),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+    def make_history(self, rng, courier):
+        """Walk the lifecycle up to the courier's final status, oldest first."""
+        final = courier["status"]
+        if final in LIFECYCLE:
+            path = LIFECYCLE[:LIFECYCLE.index(final) + 1]
+        elif final == "Pending":
+            path = ["Pending"]
+        else:
+            path = LIFECYCLE[:rng.randrange(2, 4)] + [final]
+
+        timestamp = courier["created_at"]
+        events = []
+        for i, status in enumerate(path):
+            last = i == len(path) - 1
+            if last:
+                country, city = courier["current_location_country"], courier["current_location_city"]
+            else:
+                country = courier["sender_country"] if i < 2 else courier["destination_country"]
+                city = rng.choice(CITIES[country])
+            events.append({
+                "courier_id": courier["id"],
+                "status": status,
+                "location_country": country,
+                "location_city": city,
+                "description": "Courier created" if i == 0 else "Courier details updated",
+                "timestamp": timestamp,
+            })
+            timestamp += timedelta(hours=rng.randrange(4, 72))
+        return events
+
+    # ----------------------
+    # POSTGRES COPY
+    # ----------------------
+    def copy_rows(self, model, rows):
+        columns, records = copy_records(model, rows)
+        columns = ", ".join(connection.ops.quote_name(column) for column in columns)
+        table = connection.ops.quote_name(model._meta.db_table)
+        with connection.cursor() as cursor:
+            with cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                for record in records:
+                    copy.write_row(record)
+
+    def reset_sequences(self):
+        with connection.cursor() as cursor:
+            for model in (Courier, CourierTrackingHistory):
+                table = model._meta.db_table
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {connection.ops.quote_name(table)}))",
+                    [table],
+                )
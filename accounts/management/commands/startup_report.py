@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under `python -X importtime`: boots Django the
+# way a gunicorn worker does and reports wall time and resident memory.
+BOOT_SCRIPT = """
+import json, os, sys, time
+started = time.perf_counter()
+os.environ["DJANGO_SETTINGS_MODULE"] = sys.argv[1]
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+rss_kb = 0
+with open("/proc/self/status") as fh:
+    for line in fh:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+print(json.dumps({"seconds": elapsed, "rss_kb": rss_kb, "modules": len(sys.modules)}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure import time and RSS of a fresh worker for each settings profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "profiles", nargs="*",
+            default=["net_courier.settings", "net_courier.settings_public"],
+            help="Settings modules to compare.",
+        )
+        parser.add_argument("--top", type=int, default=10, help="Slowest top-level packages to list.")
+
+    def handle(self, *args, **options):
+        for profile in options["profiles"]:
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT, profile],
+                cwd=settings.BASE_DIR, env=os.environ.copy(),
+                capture_output=True, text=True,
+            )
+            if result.returncode:
+                raise CommandError(f"{profile} failed to boot:\n{result.stderr[-2000:]}")
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+
+            self.stdout.write(self.style.MIGRATE_HEADING(profile))
+            self.stdout.write(
+                f"  startup {stats['seconds'] * 1000:.0f} ms, RSS {stats['rss_kb'] / 1024:.1f} MB, "
+                f"{stats['modules']} modules"
+            )
+            for package, micros in self.slowest_packages(result.stderr, options["top"]):
+                self.stdout.write(f"  {micros / 1000:8.1f} ms  {package}")
+
+    def slowest_packages(self, importtime_log, top):
+        """Sum `-X importtime` self times per top-level package."""
+        totals = defaultdict(int)
+        for line in importtime_log.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, _cumulative, module = line[len("import time:"):].split("|")
+            totals[module.strip().split(".")[0]] += int(self_us)
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
@@ -0,0 +1,53 @@
+import json
+import random
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from accounts.webhooks import SIGNATURE_HEADER, verify
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local webhook receiver that checks signatures and prints batches, "
+        "for developing against deliver_webhooks without a partner."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8089)
+        parser.add_argument("--secret", required=True, help="The endpoint's secret, to verify signatures.")
+        parser.add_argument("--fail-rate", type=float, default=0.0, help="Answer this fraction of requests with 503.")
+
+    def handle(self, *args, **options):
+        command = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like a real partner
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if not verify(options["secret"], body, self.headers.get(SIGNATURE_HEADER, "")):
+                    status = 401
+                elif random.random() < options["fail_rate"]:
+                    status = 503
+                else:
+                    status = 200
+                    events = json.loads(body)["events"]
+                    command.stdout.write(
+                        f"{len(events)} events: " + ", ".join(f"{e['tracking_number']} {e['status']}" for e in events[:5])
+                    )
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", options["port"]), Handler)
+        self.stdout.write(f"Listening on http://127.0.0.1:{options['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
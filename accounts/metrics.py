@@ -0,0 +1,255 @@
+"""
+Per-request performance instrumentation.
+
+``MetricsMiddleware`` records, per view, a latency histogram plus DB query
+count/time (an execute wrapper installed on every connection), template render time and
+page-cache hits. The numbers are kept per worker process and exposed in
+Prometheus text format by ``metrics_view``; every response also carries a
+``Server-Timing`` header with the same breakdown for that request.
+"""
+import contextvars
+import hmac
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates, Template as DjangoTemplate
+
+from .db_pool import pool_stats
+
+# seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Counters for the request in flight."""
+
+    __slots__ = ("started", "db_queries", "db_seconds", "template_seconds", "template_depth", "page_cache")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.page_cache = None  # "hit" / "miss" when PageCacheMiddleware handled the path
+
+
+def current_request_metrics():
+    return _current.get()
+
+
+class Registry:
+    """Process-wide aggregates, keyed by view name."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.buckets = defaultdict(lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+        self.duration_sum = defaultdict(float)
+        self.requests = defaultdict(int)
+        self.db_queries = defaultdict(int)
+        self.db_seconds = defaultdict(float)
+        self.template_seconds = defaultdict(float)
+        self.page_cache = defaultdict(int)
+
+    def observe(self, view, duration, metrics):
+        with self.lock:
+            buckets = self.buckets[view]
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    buckets[i] += 1
+                    break
+            else:
+                buckets[-1] += 1
+            self.duration_sum[view] += duration
+            self.requests[view] += 1
+            self.db_queries[view] += metrics.db_queries
+            self.db_seconds[view] += metrics.db_seconds
+            self.template_seconds[view] += metrics.template_seconds
+            if metrics.page_cache:
+                self.page_cache[metrics.page_cache] += 1
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            family("netexpress_request_duration_seconds", "histogram", "Request latency per view.")
+            for view, buckets in sorted(self.buckets.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+                    cumulative += count
+                    lines.append(f'netexpress_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                lines.append(f'netexpress_request_duration_seconds_sum{{view="{view}"}} {self.duration_sum[view]:.6f}')
+                lines.append(f'netexpress_request_duration_seconds_count{{view="{view}"}} {self.requests[view]}')
+
+            for name, kind, help_text, values in (
+                ("netexpress_db_queries_total", "counter", "SQL queries executed per view.", self.db_queries),
+                ("netexpress_db_query_seconds_total", "counter", "Time spent in SQL per view.", self.db_seconds),
+                ("netexpress_template_render_seconds_total", "counter", "Template render time per view.",
+                 self.template_seconds),
+            ):
+                family(name, kind, help_text)
+                for view, value in sorted(values.items()):
+                    lines.append(f'{name}{{view="{view}"}} {round(value, 6)}')
+
+            family("netexpress_page_cache_requests_total", "counter", "Full-page cache lookups by result.")
+            for result, count in sorted(self.page_cache.items()):
+                lines.append(f'netexpress_page_cache_requests_total{{result="{result}"}} {count}')
+
+        stats = pool_stats("default")
+        if stats:
+            family("netexpress_db_pool", "gauge", "psycopg_pool statistics for this worker.")
+            for key, value in sorted(stats.items()):
+                lines.append(f'netexpress_db_pool{{stat="{key}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# ----------------------
+# DB + TEMPLATE HOOKS
+# ----------------------
+def db_timer(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_db_timer(sender, connection, **kwargs):
+    # Installed on the connection itself rather than with a per-request
+    # ``execute_wrapper()`` block: under ASGI the ORM runs on a sync_to_async
+    # thread with its own connection, but the request's context (and so
+    # ``_current``) is carried over.
+    if db_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_timer)
+
+
+class TimedTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        # admin tags render nested templates through the backend; only time the outermost
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if metrics.template_depth == 0:
+                metrics.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report render time to ``MetricsMiddleware``."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+# ----------------------
+# MIDDLEWARE
+# ----------------------
+class MetricsMiddleware:
+    """
+    Keep this first in MIDDLEWARE so page-cache hits and every other layer
+    are inside the measured span.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            view = match.view_name or match._func_path
+        elif metrics.page_cache:
+            view = "page_cache"
+        else:
+            view = "unresolved"
+        registry.observe(view, duration, metrics)
+
+        timings = [
+            f'db;dur={metrics.db_seconds * 1000:.1f};desc="{metrics.db_queries} queries"',
+            f"tpl;dur={metrics.template_seconds * 1000:.1f}",
+        ]
+        if metrics.page_cache:
+            timings.append(f'cache;desc="{metrics.page_cache}"')
+        timings.append(f"total;dur={duration * 1000:.1f}")
+        response["Server-Timing"] = ", ".join(timings)
+        return response
+
+
+# ----------------------
+# ENDPOINT
+# ----------------------
+def has_scrape_token(request):
+    """``Authorization: Bearer <METRICS_TOKEN>``, from METRICS_ALLOWED_IPS when that is set."""
+    header = request.headers.get("Authorization", "")
+    if not settings.METRICS_TOKEN or not header.startswith("Bearer "):
+        return False
+    if settings.METRICS_ALLOWED_IPS and request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        return False
+    return hmac.compare_digest(header[len("Bearer "):].strip(), settings.METRICS_TOKEN)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; staff or the METRICS_TOKEN bearer only. Numbers are per worker."""
+    user = getattr(request, "user", None)
+    is_staff = user is not None and user.is_authenticated and user.is_staff
+    if not is_staff and not has_scrape_token(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:03
+
+import django.db.models.deletion
+import django_countries.fields
+from django.db import migrations, models
+
+SUMMARY_FIELDS = (
+    "tracking_number", "status", "current_location_country", "current_location_city",
+    "sender_country", "sender_city", "receiver_country", "receiver_city",
+    "destination_country", "destination_city",
+    "number_of_items", "parcel_colour", "weight", "rate", "category",
+    "trailer_number", "seal_number", "scac",
+    "date_sent", "estimated_delivery_date",
+)
+
+
+def backfill_summaries(apps, schema_editor):
+    Courier = apps.get_model("accounts", "Courier")
+    TrackingSummary = apps.get_model("accounts", "TrackingSummary")
+    db = schema_editor.connection.alias
+    batch = []
+    for row in Courier.objects.using(db).values("id", *SUMMARY_FIELDS).iterator(chunk_size=5000):
+        batch.append(TrackingSummary(courier_id=row.pop("id"), **row))
+        if len(batch) == 5000:
+            TrackingSummary.objects.using(db).bulk_create(batch)
+            batch = []
+    TrackingSummary.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_courier_scac_courier_seal_number_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingSummary',
+            fields=[
+                ('courier', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tracking_summary', serialize=False, to='accounts.courier')),
+                ('tracking_number', models.CharField(max_length=20, unique=True)),
+                ('status', models.CharField(max_length=50)),
+                ('current_location_country', django_countries.fields.CountryField(blank=True, max_length=2, null=True)),
+                ('current_location_city', models.CharField(blank=True, max_length=100, null=True)),
+                ('sender_country', django_countries.fields.CountryField(blank=True, max_length=2, null=True)),
+                ('sender_city', models.CharField(blank=True, max_length=100, null=True)),
+                ('receiver_country', django_countries.fields.CountryField(blank=True, max_length=2, null=True)),
+                ('receiver_city', models.CharField(blank=True, max_length=100, null=True)),
+                ('destination_country', django_countries.fields.CountryField(blank=True, max_length=2, null=True)),
+                ('destination_city', models.CharField(blank=True, max_length=100, null=True)),
+                ('number_of_items', models.PositiveIntegerField(default=1)),
+                ('parcel_colour', models.CharField(max_length=50)),
+                ('weight', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('rate', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('category', models.CharField(max_length=50)),
+                ('trailer_number', models.CharField(max_length=50)),
+                ('seal_number', models.CharField(max_length=50)),
+                ('scac', models.CharField(blank=True, max_length=50, null=True)),
+                ('date_sent', models.DateField()),
+                ('estimated_delivery_date', models.DateField()),
+            ],
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+import re
+
+from django.db import migrations, models
+
+# accounts.tracking_lookup.canonical as of this migration, frozen so later
+# changes to the lookup don't change what this backfill writes
+PREFIX = "CTR"
+BODY_LENGTH = 6
+AMBIGUOUS = str.maketrans({"O": "0", "I": "1", "L": "1"})
+SEPARATORS = re.compile(r"[^0-9A-Z]")
+
+
+def canonical(raw):
+    text = SEPARATORS.sub("", raw.upper())
+    if text.startswith(PREFIX):
+        body = text[len(PREFIX):]
+    elif len(text) == BODY_LENGTH:
+        body = text
+    else:
+        return text.translate(AMBIGUOUS)
+    return PREFIX + body.translate(AMBIGUOUS)
+
+
+def backfill_keys(apps, schema_editor):
+    TrackingSummary = apps.get_model("accounts", "TrackingSummary")
+    db = schema_editor.connection.alias
+    batch = []
+    for summary in TrackingSummary.objects.using(db).only("courier_id", "tracking_number").iterator(chunk_size=5000):
+        summary.tracking_key = canonical(summary.tracking_number)
+        batch.append(summary)
+        if len(batch) == 5000:
+            TrackingSummary.objects.using(db).bulk_update(batch, ["tracking_key"])
+            batch = []
+    TrackingSummary.objects.using(db).bulk_update(batch, ["tracking_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_scan_ingestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trackingsummary',
+            name='tracking_key',
+            field=models.CharField(default='', editable=False, max_length=20),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='trackingsummary',
+            index=models.Index(fields=['tracking_key'], include=('tracking_number',), name='tracking_summary_key_covering'),
+        ),
+    ]
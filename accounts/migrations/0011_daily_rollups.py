@@ -0,0 +1,29 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_tracking_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(max_length=50)),
+                ('category', models.CharField(max_length=50)),
+                ('country', models.CharField(blank=True, max_length=2)),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('delivered_on_time', models.PositiveIntegerField(default=0)),
+                ('delivered_late', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'status', 'category', 'country'), name='daily_rollup_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='courier',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='courier_user_created'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+
+
+def backfill_anchors(apps, schema_editor):
+    Courier = apps.get_model("accounts", "Courier")
+    CourierTrackingHistory = apps.get_model("accounts", "CourierTrackingHistory")
+    TrackingSummary = apps.get_model("accounts", "TrackingSummary")
+    db = schema_editor.connection.alias
+    first_in_transit = (
+        CourierTrackingHistory.objects.using(db)
+        .filter(courier_id=OuterRef("courier_id"), status="In Transit")
+        .values("courier_id").annotate(first=Min("timestamp")).values("first")
+    )
+    TrackingSummary.objects.using(db).update(
+        created_at=Subquery(Courier.objects.using(db).filter(pk=OuterRef("courier_id")).values("created_at")[:1]),
+        in_transit_at=Subquery(first_in_transit[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_courier_user_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trackingsummary',
+            name='created_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trackingsummary',
+            name='in_transit_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_anchors, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='LaneTransitTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin_country', models.CharField(max_length=2)),
+                ('origin_city', models.CharField(blank=True, max_length=100)),
+                ('destination_country', models.CharField(max_length=2)),
+                ('destination_city', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(max_length=50)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('p10', models.FloatField(default=0)),
+                ('p50', models.FloatField(default=0)),
+                ('p90', models.FloatField(default=0)),
+                ('through_history_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('origin_country', 'origin_city', 'destination_country', 'destination_city', 'status'), name='lane_transit_key')],
+            },
+        ),
+    ]
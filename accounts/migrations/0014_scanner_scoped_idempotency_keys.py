@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0013_eta_tables'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='couriertrackinghistory',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, max_length=96, null=True, unique=True),
+        ),
+    ]
@@ -1,12 +1,14 @@
 import random
+import secrets
 import string
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from smart_selects.db_fields import ChainedForeignKey
 from django_countries.fields import CountryField
 from django.conf import settings
 from django.utils import timezone
 
+from .tracking_lookup import canonical
+
 
 
 class AccountManager(BaseUserManager):
@@ -169,6 +171,12 @@ class Courier(models.Model):
                     break
         super().save(*args, **kwargs)
 
+    class Meta:
+        indexes = [
+            # customer portal: a user's shipments newest first, keyset-paginated
+            models.Index(fields=["user", "created_at", "id"], name="courier_user_created"),
+        ]
+
     def __str__(self):
         return f"{self.tracking_number} - {self.status}"
 
@@ -198,9 +206,244 @@ class CourierTrackingHistory(models.Model):
         help_text="Optional details (e.g. 'Departed Paris Airport' or 'Arrived at Lagos facility')",
     )
     timestamp = models.DateTimeField(default=timezone.now)
+    # set by scan ingestion so resent events are dropped: "<scanner pk>:<event_id>" or a content hash
+    idempotency_key = models.CharField(max_length=96, unique=True, blank=True, null=True, editable=False)
 
     class Meta:
         ordering = ["-timestamp"]
 
     def __str__(self):
-        return f"{self.courier.tracking_number} - {self.status} ({self.timestamp.strftime('%Y-%m-%d %H:%M')})"
\ No newline at end of file
+        return f"{self.courier.tracking_number} - {self.status} ({self.timestamp.strftime('%Y-%m-%d %H:%M')})"
+
+class TrackingSummary(models.Model):
+    """
+    What the public tracking page shows for a Courier, in its own narrow
+    table: no names, addresses, contact details or contents, since anyone
+    with a tracking number can see it. Kept current by the Courier post_save
+    signal; bulk loaders call ``refresh`` themselves.
+    """
+
+    FIELDS = (
+        "tracking_number", "status", "current_location_country", "current_location_city",
+        "sender_country", "sender_city", "receiver_country", "receiver_city",
+        "destination_country", "destination_city",
+        "number_of_items", "parcel_colour", "weight", "rate", "category",
+        "trailer_number", "seal_number", "scac",
+        "date_sent", "estimated_delivery_date", "created_at",
+    )
+
+    courier = models.OneToOneField(
+        Courier,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="tracking_summary",
+    )
+    tracking_number = models.CharField(max_length=20, unique=True)
+    # canonical() of tracking_number: what forgiving lookups match on
+    tracking_key = models.CharField(max_length=20, editable=False)
+    status = models.CharField(max_length=50)
+    current_location_country = CountryField(blank=True, null=True)
+    current_location_city = models.CharField(max_length=100, blank=True, null=True)
+
+    sender_country = CountryField(blank=True, null=True)
+    sender_city = models.CharField(max_length=100, blank=True, null=True)
+    receiver_country = CountryField(blank=True, null=True)
+    receiver_city = models.CharField(max_length=100, blank=True, null=True)
+    destination_country = CountryField(blank=True, null=True)
+    destination_city = models.CharField(max_length=100, blank=True, null=True)
+
+    number_of_items = models.PositiveIntegerField(default=1)
+    parcel_colour = models.CharField(max_length=50)
+    weight = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    rate = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    category = models.CharField(max_length=50)
+    trailer_number = models.CharField(max_length=50)
+    seal_number = models.CharField(max_length=50)
+    scac = models.CharField(max_length=50, blank=True, null=True)
+
+    date_sent = models.DateField()
+    estimated_delivery_date = models.DateField()
+    # ETA windows are measured from the first In Transit history row, or created_at before it
+    created_at = models.DateTimeField(blank=True, null=True)
+    in_transit_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # lookups filter on tracking_key; tracking_number is carried in the index (INCLUDE,
+            # Postgres only) for the exact-match tie-break and key-only reads
+            models.Index(fields=["tracking_key"], include=["tracking_number"], name="tracking_summary_key_covering"),
+        ]
+
+    def __str__(self):
+        return f"{self.tracking_number} - {self.status}"
+
+    @classmethod
+    def refresh(cls, couriers, batch_size=2000):
+        """
+        Upsert summaries for Courier instances or ``values()`` dicts that
+        include ``id``; ``in_transit_at`` is read from their history.
+        """
+        rows = []
+        for courier in couriers:
+            if isinstance(courier, dict):
+                rows.append(cls(courier_id=courier["id"], **{field: courier[field] for field in cls.FIELDS}))
+            else:
+                rows.append(cls(courier_id=courier.pk, **{field: getattr(courier, field) for field in cls.FIELDS}))
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            in_transit = dict(
+                CourierTrackingHistory.objects
+                .filter(courier_id__in=[row.courier_id for row in batch], status="In Transit")
+                .values("courier_id").annotate(first=models.Min("timestamp"))
+                .values_list("courier_id", "first").order_by()
+            )
+            for row in batch:
+                row.tracking_key = canonical(row.tracking_number)
+                row.in_transit_at = in_transit.get(row.courier_id)
+        cls.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["courier"],
+            update_fields=(*cls.FIELDS, "tracking_key", "in_transit_at"),
+        )
+
+
+def generate_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """A partner URL that receives tracking events for the account's couriers."""
+
+    account = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="webhooks",
+    )
+    url = models.URLField(max_length=500)
+    secret = models.CharField(
+        max_length=64,
+        default=generate_secret,
+        help_text="Shared secret for the X-Netexpress-Signature HMAC",
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    # circuit breaker, maintained by the delivery worker
+    consecutive_failures = models.PositiveIntegerField(default=0)
+    disabled_until = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.url
+
+
+class WebhookEvent(models.Model):
+    """Outbox row: one tracking event waiting for (or done with) delivery to one endpoint."""
+
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+    endpoint = models.ForeignKey(WebhookEndpoint, on_delete=models.CASCADE, related_name="events")
+    payload = models.JSONField()
+    state = models.CharField(
+        max_length=10,
+        choices=[(PENDING, "Pending"), (DELIVERED, "Delivered"), (FAILED, "Failed")],
+        default=PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(state="pending"),
+                name="webhook_event_due",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} #{self.pk} ({self.state})"
+
+
+class ScannerKey(models.Model):
+    """API key for a depot scanner or driver app posting to /api/scans/."""
+
+    name = models.CharField(max_length=100)
+    key = models.CharField(max_length=64, unique=True, default=generate_secret)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+
+class DailyRollup(models.Model):
+    """
+    Tracking events counted per local day x status x courier category x
+    event country, for the admin dashboard. Incremented by ``accounts.rollups``
+    as history rows are written; ``backfill_rollups`` rebuilds a date range.
+    """
+
+    date = models.DateField()
+    status = models.CharField(max_length=50)
+    category = models.CharField(max_length=50)
+    country = models.CharField(max_length=2, blank=True)  # "" when the event had no country
+    events = models.PositiveIntegerField(default=0)
+    # Delivered events on or before / after the courier's estimated_delivery_date
+    delivered_on_time = models.PositiveIntegerField(default=0)
+    delivered_late = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["date", "status", "category", "country"], name="daily_rollup_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.status} {self.category} {self.country or '-'}: {self.events}"
+
+
+class LaneTransitTime(models.Model):
+    """
+    Hours from a courier entering ``status`` until it was delivered, per lane
+    (origin -> destination), as a log-bucketed histogram plus the percentiles
+    the ETA lookup reads (see ``accounts.eta``). City rows carry folded city
+    names; the country-level fallback rows leave both cities blank.
+    Maintained by ``manage.py build_eta_tables``.
+    """
+
+    origin_country = models.CharField(max_length=2)
+    origin_city = models.CharField(max_length=100, blank=True)
+    destination_country = models.CharField(max_length=2)
+    destination_city = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=50)
+
+    samples = models.PositiveIntegerField(default=0)
+    histogram = models.JSONField(default=list)  # counts per accounts.eta.BUCKET_EDGES bucket
+    p10 = models.FloatField(default=0)
+    p50 = models.FloatField(default=0)
+    p90 = models.FloatField(default=0)
+    # newest Delivered history row counted in, so the next run only reads what came after
+    through_history_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["origin_country", "origin_city", "destination_country", "destination_city", "status"],
+                name="lane_transit_key",
+            ),
+        ]
+
+    def __str__(self):
+        origin = f"{self.origin_city}, {self.origin_country}" if self.origin_city else self.origin_country
+        destination = (
+            f"{self.destination_city}, {self.destination_country}" if self.destination_city else self.destination_country
+        )
+        return f"{origin} -> {destination} from {self.status}: p50 {self.p50:.0f}h ({self.samples})"
@@ -0,0 +1,207 @@
+"""
+Full-page cache for the static marketing pages.
+
+Those pages only change on deploy, so each rendered response is stored once
+(identity, gzip and brotli bodies) under a key derived from the deploy ID and
+served by ``PageCacheMiddleware`` before the session/auth/CSRF layers run.
+"""
+import gzip
+import hashlib
+import os
+
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+
+from .metrics import current_request_metrics
+
+# url name -> template its view renders
+CACHED_PAGES = {
+    "home": "index.html",
+    "about_us": "about-us-2.html",
+    "services": "services-2.html",
+    "contact": "contact-us.html",
+}
+
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# process-local copy so hits don't even touch the cache backend
+_pages = {}
+_paths = None
+_deploy_id = None
+
+
+def deploy_id():
+    """Build ID the cache is keyed on; falls back to a hash of the cached templates."""
+    global _deploy_id
+    if _deploy_id is None:
+        _deploy_id = getattr(settings, "DEPLOY_ID", "")
+        if not _deploy_id:
+            digest = hashlib.sha1()
+            for template in CACHED_PAGES.values():
+                path = os.path.join(settings.BASE_DIR, "templates", template)
+                with open(path, "rb") as fh:
+                    digest.update(fh.read())
+            _deploy_id = digest.hexdigest()[:12]
+    return _deploy_id
+
+
+def cached_paths():
+    """Map request paths to url names for the cached pages."""
+    global _paths
+    if _paths is None:
+        _paths = {reverse(name): name for name in CACHED_PAGES}
+    return _paths
+
+
+def cache_key(path):
+    return f"pagecache:{deploy_id()}:{path}"
+
+
+def build_entry(response):
+    """Turn a rendered 200 response into a cacheable entry with compressed variants."""
+    body = response.content
+    return {
+        "content_type": response["Content-Type"],
+        "etag": '"%s"' % hashlib.md5(body).hexdigest(),
+        "bodies": {
+            "identity": body,
+            "gzip": gzip.compress(body, compresslevel=9),
+            "br": brotli.compress(body, quality=11),
+        },
+    }
+
+
+def store(path, response):
+    entry = build_entry(response)
+    _pages[path] = entry
+    cache.set(cache_key(path), entry, PAGE_CACHE_TIMEOUT)
+    return entry
+
+
+async def astore(path, response):
+    entry = build_entry(response)
+    _pages[path] = entry
+    await cache.aset(cache_key(path), entry, PAGE_CACHE_TIMEOUT)
+    return entry
+
+
+def lookup(path):
+    entry = _pages.get(path)
+    if entry is None:
+        entry = cache.get(cache_key(path))
+        if entry is not None:
+            _pages[path] = entry
+    return entry
+
+
+async def alookup(path):
+    entry = _pages.get(path)
+    if entry is None:
+        entry = await cache.aget(cache_key(path))
+        if entry is not None:
+            _pages[path] = entry
+    return entry
+
+
+def choose_encoding(accept_encoding):
+    accepted = {token.split(";")[0].strip() for token in accept_encoding.split(",")}
+    if "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def build_response(request, entry):
+    if request.headers.get("If-None-Match") == entry["etag"]:
+        response = HttpResponse(status=304)
+    else:
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        response = HttpResponse(entry["bodies"][encoding], content_type=entry["content_type"])
+        if encoding != "identity":
+            response["Content-Encoding"] = encoding
+    response["ETag"] = entry["etag"]
+    response["Cache-Control"] = "public, max-age=300"
+    # XFrameOptionsMiddleware sits below us and never sees cache hits
+    response["X-Frame-Options"] = getattr(settings, "X_FRAME_OPTIONS", "DENY")
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def warm_page_cache():
+    """Render every cached page up front, e.g. from a gunicorn ``post_worker_init`` hook."""
+    host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else "localhost"
+    for path, name in cached_paths().items():
+        if lookup(path) is not None:
+            continue
+        request = HttpRequest()
+        request.method = "GET"
+        request.path = request.path_info = path
+        request.META = {"SERVER_NAME": host, "SERVER_PORT": "443", "HTTP_HOST": host}
+        store(path, render(request, CACHED_PAGES[name]))
+
+
+class PageCacheMiddleware:
+    """
+    Serve the cached marketing pages ahead of the session/auth middleware.
+    Keep this directly after SecurityMiddleware in MIDDLEWARE. Works under
+    both WSGI and ASGI; the async path uses the async cache API.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def is_cacheable_request(self, request):
+        return (
+            request.method in ("GET", "HEAD")
+            and not request.GET
+            and request.path_info in cached_paths()
+        )
+
+    def is_cacheable_response(self, response):
+        # only cache clean, anonymous-safe responses
+        return response.status_code == 200 and not response.cookies and not response.streaming
+
+    def record(self, entry):
+        metrics = current_request_metrics()
+        if metrics is not None:
+            metrics.page_cache = "miss" if entry is None else "hit"
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.is_cacheable_request(request):
+            return self.get_response(request)
+
+        entry = lookup(request.path_info)
+        self.record(entry)
+        if entry is None:
+            response = self.get_response(request)
+            if not self.is_cacheable_response(response):
+                return response
+            entry = store(request.path_info, response)
+        return build_response(request, entry)
+
+    async def __acall__(self, request):
+        if not self.is_cacheable_request(request):
+            return await self.get_response(request)
+
+        entry = await alookup(request.path_info)
+        self.record(entry)
+        if entry is None:
+            response = await self.get_response(request)
+            if not self.is_cacheable_response(response):
+                return response
+            entry = await astore(request.path_info, response)
+        return build_response(request, entry)
@@ -0,0 +1,126 @@
+"""
+"My shipments" portal for signed-in customers.
+
+The list is keyset-paginated on ``(created_at, id)``, newest first, walking
+the ``courier_user_created`` index: every page is the same cheap range scan,
+however deep into a 100k-shipment account it is. Cursors are opaque
+``created_at|id`` tokens.
+
+Per-status counts for the filter tabs are cached per account and dropped by
+the Courier save/delete signals (and by scan ingestion's bulk updates);
+PORTAL_COUNTS_TIMEOUT bounds staleness from anything else, e.g. a courier
+moved to another account.
+"""
+import base64
+import binascii
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.shortcuts import render
+from django.utils.dateparse import parse_datetime
+
+from .models import Courier
+from .query_inspector import declare_query_budget
+
+STATUSES = [value for value, _label in Courier._meta.get_field("status").choices]
+
+LIST_FIELDS = (
+    "id", "tracking_number", "status", "receiver_name", "destination_country", "destination_city",
+    "current_location_country", "current_location_city", "estimated_delivery_date", "created_at",
+)
+
+
+def counts_key(user_id):
+    return f"portal:status-counts:{user_id}"
+
+
+def status_counts(user_id):
+    """``{status: n}`` for the account's couriers (zero for absent statuses), plus ``"all"``."""
+    counts = cache.get(counts_key(user_id))
+    if counts is None:
+        counts = dict.fromkeys(STATUSES, 0)
+        counts.update(
+            Courier.objects.filter(user_id=user_id).values_list("status").annotate(n=Count("id")).order_by()
+        )
+        counts["all"] = sum(counts.values())
+        cache.set(counts_key(user_id), counts, settings.PORTAL_COUNTS_TIMEOUT)
+    return counts
+
+
+def invalidate_status_counts(user_ids):
+    keys = [counts_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        cache.delete_many(keys)
+
+
+def encode_cursor(courier):
+    raw = f"{courier.created_at.isoformat()}|{courier.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """``(created_at, id)`` from a cursor token, or ``None`` if it doesn't parse."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        created_at, courier_id = raw.rsplit("|", 1)
+        created_at = parse_datetime(created_at)
+        return (created_at, int(courier_id)) if created_at is not None else None
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def shipments_page(user_id, status=None, after=None, before=None, size=25):
+    """
+    One page, newest first, plus the cursors of its neighbours:
+    ``(couriers, newer_cursor, older_cursor)``. ``after`` pages towards older
+    shipments, ``before`` back towards newer ones.
+    """
+    couriers = Courier.objects.filter(user_id=user_id).only(*LIST_FIELDS)
+    if status:
+        couriers = couriers.filter(status=status)
+
+    if before is not None:
+        created_at, courier_id = before
+        rows = list(
+            couriers.filter(Q(created_at__gt=created_at) | Q(id__gt=courier_id), created_at__gte=created_at)
+            .order_by("created_at", "id")[:size + 1]
+        )
+        has_newer, has_older = len(rows) > size, True
+        rows = rows[:size][::-1]
+    else:
+        if after is not None:
+            created_at, courier_id = after
+            # the plain bound lets the index seek straight to the cursor
+            couriers = couriers.filter(Q(created_at__lt=created_at) | Q(id__lt=courier_id), created_at__lte=created_at)
+        rows = list(couriers.order_by("-created_at", "-id")[:size + 1])
+        has_newer, has_older = after is not None, len(rows) > size
+        rows = rows[:size]
+
+    newer = encode_cursor(rows[0]) if rows and has_newer else None
+    older = encode_cursor(rows[-1]) if rows and has_older else None
+    return rows, newer, older
+
+
+@declare_query_budget(3)  # session user, the page, per-status counts on a cache miss
+@login_required
+def my_shipments(request):
+    status = request.GET.get("status")
+    if status not in STATUSES:
+        status = None
+    after = decode_cursor(request.GET.get("after", ""))
+    before = None if after else decode_cursor(request.GET.get("before", ""))
+
+    couriers, newer, older = shipments_page(
+        request.user.id, status, after, before, size=settings.PORTAL_PAGE_SIZE
+    )
+    counts = status_counts(request.user.id)
+    return render(request, "my_shipments.html", {
+        "couriers": couriers,
+        "status": status,
+        "tabs": [(value, counts[value]) for value in STATUSES if counts[value]],
+        "total": counts["all"],
+        "newer": newer,
+        "older": older,
+    })
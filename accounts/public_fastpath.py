@@ -0,0 +1,75 @@
+"""
+Session-free path for anonymous visitors on the public site.
+
+``AnonymousFastPathMiddleware`` marks GET/HEAD requests that carry none of
+our session, CSRF or messages cookies and aren't under
+``STATEFUL_PATH_PREFIXES`` (admin, chaining, internal). The session, auth
+and messages middleware below are drop-in subclasses of Django's that skip
+marked requests entirely: no session load, ``request.user`` is a plain
+``AnonymousUser``, nothing adds ``Vary: Cookie`` or sets a cookie. Marked
+responses that didn't choose their own caching get
+``Cache-Control: public`` so a CDN can hold them.
+
+Staff keep full sessions (cached_db by default, see SESSION_ENGINE in
+settings) on the admin paths.
+"""
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware as DjangoAuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.middleware import MessageMiddleware as DjangoMessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware as DjangoSessionMiddleware
+from django.utils.cache import patch_cache_control
+from django.utils.deprecation import MiddlewareMixin
+
+MESSAGES_COOKIE_NAME = "messages"  # CookieStorage.cookie_name
+
+
+def is_fast_path(request):
+    return getattr(request, "anonymous_fast_path", False)
+
+
+class AnonymousFastPathMiddleware(MiddlewareMixin):
+    """Keep this ahead of SessionMiddleware in MIDDLEWARE."""
+
+    def process_request(self, request):
+        stateful_cookies = (settings.SESSION_COOKIE_NAME, settings.CSRF_COOKIE_NAME, MESSAGES_COOKIE_NAME)
+        request.anonymous_fast_path = (
+            request.method in ("GET", "HEAD")
+            and not any(name in request.COOKIES for name in stateful_cookies)
+            and not request.path_info.startswith(tuple(settings.STATEFUL_PATH_PREFIXES))
+        )
+
+    def process_response(self, request, response):
+        if is_fast_path(request) and response.status_code == 200 and not response.has_header("Cache-Control"):
+            patch_cache_control(response, public=True, max_age=settings.PUBLIC_CACHE_MAX_AGE)
+        return response
+
+
+class SessionMiddleware(DjangoSessionMiddleware):
+    def process_request(self, request):
+        if not is_fast_path(request):
+            super().process_request(request)
+
+    def process_response(self, request, response):
+        if not hasattr(request, "session"):
+            return response
+        return super().process_response(request, response)
+
+
+async def _anonymous_user():
+    return AnonymousUser()
+
+
+class AuthenticationMiddleware(DjangoAuthenticationMiddleware):
+    def process_request(self, request):
+        if not is_fast_path(request):
+            return super().process_request(request)
+        request.user = AnonymousUser()
+        request.auser = _anonymous_user
+
+
+class MessageMiddleware(DjangoMessageMiddleware):
+    def process_request(self, request):
+        # without request._messages, get_messages() is empty and process_response is a no-op
+        if not is_fast_path(request):
+            super().process_request(request)
@@ -0,0 +1,202 @@
+"""
+N+1 and query-budget detection.
+
+Every SELECT run inside an inspected request (or ``query_budget`` block) is
+fingerprinted -- literals and parameter lists collapsed -- and the stack
+that issued it is kept. The same fingerprint repeating
+``N_PLUS_ONE_THRESHOLD`` times is reported as an N+1 pattern, with the
+project frames that triggered it.
+
+In tests::
+
+    with query_budget(3):
+        self.client.get("/tracking/?tracking_number=CTR-1TAP2T")
+
+raises ``QueryBudgetExceeded`` when the block runs more than 3 queries or
+contains an N+1 pattern. Views can declare their own budget with
+``@declare_query_budget(n)``; ``QueryInspectorMiddleware`` (wired in when
+DEBUG or QUERY_INSPECTOR is on, and under tests) checks it on every request,
+logging the report, or raising it when QUERY_INSPECTOR_RAISE is set.
+
+Budgets describe a warm worker: the one-off loads of process-wide tables
+(geocoder, ETA lanes, ...) run inside ``unbudgeted()`` and aren't counted.
+"""
+import contextvars
+import logging
+import re
+import traceback
+from collections import defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger("accounts.queries")
+
+N_PLUS_ONE_THRESHOLD = 5
+
+_recorder = contextvars.ContextVar("query_recorder", default=None)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\((?:\s*(?:%s|\?|\d+)\s*,)+\s*(?:%s|\?|\d+)\s*\)")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """Collapse literals and IN-lists so queries differing only by values match."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _PLACEHOLDER_LIST_RE.sub("(...)", sql)
+    return " ".join(sql.split())
+
+
+def project_stack():
+    """Frames from our own code (not Django or site-packages), innermost last."""
+    base = str(settings.BASE_DIR)
+    frames = traceback.extract_stack()[:-3]
+    return [
+        f"{frame.filename[len(base) + 1:]}:{frame.lineno} in {frame.name}"
+        for frame in frames
+        if frame.filename.startswith(base) and "site-packages" not in frame.filename
+        and not frame.filename.endswith("query_inspector.py")
+    ]
+
+
+class QueryRecorder:
+    def __init__(self, threshold=N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold
+        self.count = 0
+        self.shapes = defaultdict(int)
+        self.samples = {}
+
+    def record(self, sql):
+        self.count += 1
+        if sql.lstrip()[:6].upper() != "SELECT":
+            return  # bulk writes legitimately repeat one shape per batch
+        shape = fingerprint(sql)
+        self.shapes[shape] += 1
+        if shape not in self.samples:
+            self.samples[shape] = (sql, project_stack())
+
+    def n_plus_one(self):
+        """``[(count, sql sample, stack)]`` for shapes repeated at least ``threshold`` times."""
+        return sorted(
+            ((count, *self.samples[shape]) for shape, count in self.shapes.items() if count >= self.threshold),
+            key=lambda finding: finding[0],
+            reverse=True,
+        )
+
+    def report(self, label, budget=None):
+        """Human-readable problems, or ``""`` when within budget and free of N+1s."""
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{label}: {self.count} queries, budget is {budget}")
+        for count, sql, stack in self.n_plus_one():
+            problems.append(
+                f"{label}: possible N+1, same query ran {count}x:\n    {sql[:300]}\n"
+                + "".join(f"      at {frame}\n" for frame in stack[-6:])
+            )
+        return "\n".join(problems)
+
+
+def inspector_wrapper(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.record(sql)
+    return execute(sql, params, many, context)
+
+
+def install(connection):
+    if inspector_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(inspector_wrapper)
+
+
+@receiver(connection_created)
+def install_on_connect(sender, connection, **kwargs):
+    install(connection)
+
+
+@contextmanager
+def query_budget(max_queries=None, threshold=N_PLUS_ONE_THRESHOLD, label="block"):
+    """Fail with ``QueryBudgetExceeded`` on too many queries or an N+1 pattern inside the block."""
+    for connection in connections.all():
+        install(connection)
+    recorder = QueryRecorder(threshold)
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+    problems = recorder.report(label, max_queries)
+    if problems:
+        raise QueryBudgetExceeded(problems)
+
+
+@contextmanager
+def unbudgeted():
+    """Don't record the queries inside, e.g. a process-wide table loaded once and reused by later requests."""
+    token = _recorder.set(None)
+    try:
+        yield
+    finally:
+        _recorder.reset(token)
+
+
+def declare_query_budget(max_queries):
+    """Attach a query budget to a view for ``QueryInspectorMiddleware`` to enforce."""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+class QueryInspectorMiddleware:
+    """Fingerprint each request's SQL; log (or raise on) N+1 patterns and blown budgets."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.raise_errors = getattr(settings, "QUERY_INSPECTOR_RAISE", False)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        self.check(request, recorder)
+        return response
+
+    def check(self, request, recorder):
+        match = getattr(request, "resolver_match", None)
+        budget = getattr(match.func, "query_budget", None) if match else None
+        problems = recorder.report(f"{request.method} {request.path}", budget)
+        if not problems:
+            return
+        if self.raise_errors:
+            raise QueryBudgetExceeded(problems)
+        logger.warning(problems)
@@ -0,0 +1,203 @@
+"""
+Shipment pricing.
+
+A quote is ``(base for the zone and weight break + per-kg beyond the last
+break + per-km for the great-circle distance) * (1 + fuel surcharge)``.
+Zones come from the two countries: domestic, same continent (cities_light
+``Country.continent``), or intercontinental. Everything is computed on
+NumPy arrays, so ``RateEngine.quote_many`` prices thousands of shipments
+in one pass; the per-country zone matrix is built once per process.
+
+The default card below can be replaced wholesale with a ``RATE_CARD``
+setting of the same shape.
+"""
+import json
+import threading
+from decimal import Decimal
+
+import numpy as np
+from cities_light.models import Country
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from .geocoder import get_geocoder, great_circle_km
+
+DOMESTIC, CONTINENTAL, INTERCONTINENTAL = 0, 1, 2
+ZONE_NAMES = ("domestic", "continental", "intercontinental")
+
+DEFAULT_RATE_CARD = {
+    "currency": "USD",
+    # upper bound (kg) of each weight break
+    "weight_breaks": [0.5, 1, 2, 5, 10, 20, 30, 50],
+    # price per zone (rows, in ZONE_NAMES order) for each weight break (columns)
+    "base": [
+        [8, 10, 14, 22, 35, 60, 85, 130],
+        [18, 24, 32, 55, 90, 160, 230, 360],
+        [35, 45, 62, 110, 185, 330, 480, 760],
+    ],
+    # per kg above the last break, per zone
+    "per_kg_over": [2.5, 6.5, 14.0],
+    # per km of origin -> destination distance, per zone
+    "per_km": [0.02, 0.01, 0.004],
+    "fuel_surcharge": 0.12,
+}
+
+
+def shipment_value(shipment, field):
+    return shipment.get(field) if isinstance(shipment, dict) else getattr(shipment, field)
+
+
+class RateEngine:
+    def __init__(self, card, continents, geocoder):
+        """``continents`` maps ISO country code -> continent code."""
+        self.card = card
+        self.breaks = np.asarray(card["weight_breaks"], dtype=float)
+        self.base = np.asarray(card["base"], dtype=float)
+        self.per_kg_over = np.asarray(card["per_kg_over"], dtype=float)
+        self.per_km = np.asarray(card["per_km"], dtype=float)
+        self.fuel = float(card["fuel_surcharge"])
+        self.geocoder = geocoder
+
+        # country code -> matrix index; the extra last index is "unknown country"
+        self.country_index = {code: i for i, code in enumerate(sorted(continents))}
+        codes = np.array([continents[code] or "" for code in sorted(continents)] + ["?"])
+        same_continent = (codes[:, None] == codes[None, :]) & (codes[:, None] != "") & (codes[:, None] != "?")
+        self.zones = np.where(same_continent, CONTINENTAL, INTERCONTINENTAL).astype(np.int8)
+        np.fill_diagonal(self.zones, DOMESTIC)
+        self.zones[-1, -1] = INTERCONTINENTAL  # two unknown countries aren't "domestic"
+
+    def country_rows(self, codes):
+        unknown = len(self.country_index)
+        return np.array([self.country_index.get(str(code or "").upper(), unknown) for code in codes], dtype=np.int64)
+
+    def quote_many(self, shipments):
+        """
+        Price model instances or dicts with sender_country/city,
+        destination_country/city and weight. Returns arrays ``rate``,
+        ``zone`` and ``distance_km`` (NaN when unresolvable), aligned with
+        ``shipments``. A shipment without a weight can't be priced: its rate
+        is NaN.
+        """
+        origin_codes = [shipment_value(s, "sender_country") for s in shipments]
+        destination_codes = [shipment_value(s, "destination_country") for s in shipments]
+        zones = self.zones[self.country_rows(origin_codes), self.country_rows(destination_codes)].astype(np.int64)
+        # the same code on both sides is domestic even if cities_light doesn't know it
+        same = np.array([bool(a) and str(a).upper() == str(b or "").upper()
+                         for a, b in zip(origin_codes, destination_codes)], dtype=bool)
+        zones[same] = DOMESTIC
+
+        weights = np.array([
+            np.nan if (weight := shipment_value(s, "weight")) in (None, "") else float(weight)
+            for s in shipments
+        ])
+        break_index = np.minimum(np.searchsorted(self.breaks, weights, side="left"), len(self.breaks) - 1)
+        over = np.maximum(weights - self.breaks[-1], 0.0)
+
+        origin = self.geocoder.locate_many(
+            [(shipment_value(s, "sender_city"), code) for s, code in zip(shipments, origin_codes)]
+        )
+        destination = self.geocoder.locate_many(
+            [(shipment_value(s, "destination_city"), code) for s, code in zip(shipments, destination_codes)]
+        )
+        distance = great_circle_km(*origin, *destination)
+        billable_km = np.nan_to_num(distance, nan=0.0)
+
+        rate = (
+            self.base[zones, break_index]
+            + over * self.per_kg_over[zones]
+            + billable_km * self.per_km[zones]
+        ) * (1 + self.fuel)
+        return {"rate": np.round(rate, 2), "zone": zones, "distance_km": distance}
+
+    def quote(self, shipment):
+        """One shipment as a JSON-ready dict."""
+        result = self.quote_many([shipment])
+        distance = result["distance_km"][0]
+        zone = int(result["zone"][0])
+        return {
+            "rate": str(Decimal(str(result["rate"][0])).quantize(Decimal("0.01"))),
+            "currency": self.card["currency"],
+            "zone": ZONE_NAMES[zone],
+            "category": "Domestic" if zone == DOMESTIC else "International",
+            "distance_km": None if np.isnan(distance) else round(float(distance), 1),
+        }
+
+
+_engine = None
+_lock = threading.Lock()
+
+
+def get_rate_engine():
+    """Build the process-wide engine (zone matrix, geocoder) on first use."""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                continents = dict(Country.objects.values_list("code2", "continent"))
+                card = getattr(settings, "RATE_CARD", None) or DEFAULT_RATE_CARD
+                _engine = RateEngine(card, continents, get_geocoder())
+    return _engine
+
+
+# ----------------------
+# ENDPOINT
+# ----------------------
+QUOTE_FIELDS = {
+    "from_country": "sender_country",
+    "from_city": "sender_city",
+    "to_country": "destination_country",
+    "to_city": "destination_city",
+    "weight": "weight",
+}
+
+
+def parse_quote_request(data):
+    shipment = {field: data.get(param) for param, field in QUOTE_FIELDS.items()}
+    if not shipment["sender_country"] or not shipment["destination_country"]:
+        raise ValueError("from_country and to_country are required")
+    try:
+        shipment["weight"] = float(shipment["weight"])
+    except (TypeError, ValueError):
+        raise ValueError("weight (kg) must be a number")
+    if not 0 < shipment["weight"] <= 10_000:
+        raise ValueError("weight must be between 0 and 10000 kg")
+    return shipment
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def quote_view(request):
+    """
+    ``GET ?from_country=NG&from_city=Lagos&to_country=GB&to_city=London&weight=2.5``
+    for one quote, or POST ``{"shipments": [{...same keys...}, ...]}`` for up to
+    QUOTE_MAX_SHIPMENTS at once.
+    """
+    engine = get_rate_engine()
+    if request.method == "GET":
+        try:
+            shipment = parse_quote_request(request.GET)
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        return JsonResponse(engine.quote(shipment))
+
+    try:
+        items = json.loads(request.body)["shipments"]
+        if len(items) > settings.QUOTE_MAX_SHIPMENTS:
+            raise ValueError(f"at most {settings.QUOTE_MAX_SHIPMENTS} shipments per request")
+        shipments = [parse_quote_request(item) for item in items]
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    result = engine.quote_many(shipments)
+    return JsonResponse({
+        "currency": engine.card["currency"],
+        "quotes": [
+            {
+                "rate": f"{rate:.2f}",
+                "zone": ZONE_NAMES[zone],
+                "distance_km": None if np.isnan(km) else round(float(km), 1),
+            }
+            for rate, zone, km in zip(result["rate"], result["zone"], result["distance_km"])
+        ],
+    })
@@ -0,0 +1,139 @@
+"""
+Daily rollups behind the admin dashboard.
+
+Every CourierTrackingHistory write adds to one ``DailyRollup`` row keyed by
+(local date, status, courier category, event country): the post_save signal
+for single saves, scan ingestion for its bulk inserts. The dashboard then
+sums a few hundred rollup rows instead of grouping the history table.
+
+A shipment is counted as delivered (on time or late) once, on its first
+Delivered row: a repeated Delivered scan only adds to ``events``.
+
+``rebuild`` recomputes a date range from history (``manage.py
+backfill_rollups``), reading it from a replica when there is one. Archived shipments no longer have history rows, so keep
+rebuilt ranges newer than the archive cutoff.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .db_router import read_from_replica
+from .models import CourierTrackingHistory, DailyRollup
+
+MEASURES = ("events", "delivered_on_time", "delivered_late")
+
+
+def rollup_key(history):
+    """``(date, status, category, country)`` for a history row with its courier loaded."""
+    return (
+        timezone.localdate(history.timestamp),
+        history.status,
+        history.courier.category,
+        str(history.location_country or ""),
+    )
+
+
+def first_deliveries(histories):
+    """
+    The saved rows among ``histories`` that are their shipment's first
+    Delivered row, i.e. the shipment had none before this batch.
+    """
+    delivered = [history for history in histories if history.status == "Delivered"]
+    if not delivered:
+        return set()
+    delivered_before = set(
+        CourierTrackingHistory.objects
+        .filter(courier_id__in={history.courier_id for history in delivered}, status="Delivered")
+        .exclude(pk__in=[history.pk for history in histories])
+        .values_list("courier_id", flat=True)
+    )
+    first = {}
+    for history in sorted(delivered, key=lambda history: (history.timestamp, history.pk)):
+        if history.courier_id not in delivered_before:
+            first.setdefault(history.courier_id, history.pk)
+    return set(first.values())
+
+
+def record(histories):
+    """Count new (saved) history rows into their rollups; one UPDATE per distinct key."""
+    firsts = first_deliveries(histories)
+    deltas = {}
+    for history in histories:
+        key = rollup_key(history)
+        delta = deltas.setdefault(key, Counter())
+        delta["events"] += 1
+        if history.pk in firsts:
+            on_time = key[0] <= history.courier.estimated_delivery_date
+            delta["delivered_on_time" if on_time else "delivered_late"] += 1
+    for key, delta in deltas.items():
+        add(key, delta)
+    return len(deltas)
+
+
+def add(key, delta):
+    date, status, category, country = key
+    rows = DailyRollup.objects.filter(date=date, status=status, category=category, country=country)
+    increments = {measure: F(measure) + delta[measure] for measure in MEASURES if delta[measure]}
+    if rows.update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DailyRollup.objects.create(
+                date=date, status=status, category=category, country=country,
+                **{measure: delta[measure] for measure in MEASURES},
+            )
+    except IntegrityError:
+        rows.update(**increments)  # another writer created the row first
+
+
+def rebuild(start, end, days_per_query=31):
+    """Recompute rollups for local dates ``start``..``end`` (inclusive) from history."""
+    written = 0
+    day = start
+    while day <= end:
+        last = min(day + timedelta(days=days_per_query - 1), end)
+        since = timezone.make_aware(datetime.combine(day, time.min))
+        until = timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min))
+        earlier_delivery = CourierTrackingHistory.objects.filter(
+            Q(timestamp__lt=OuterRef("timestamp")) | Q(timestamp=OuterRef("timestamp"), pk__lt=OuterRef("pk")),
+            courier=OuterRef("courier"),
+            status="Delivered",
+        )
+        delivered = Q(status="Delivered") & ~Q(Exists(earlier_delivery))
+        on_time = Q(timestamp__date__lte=F("courier__estimated_delivery_date"))
+        groups = (
+            CourierTrackingHistory.objects
+            .filter(timestamp__gte=since, timestamp__lt=until)
+            .annotate(day=TruncDate("timestamp"))
+            .values("day", "status", "courier__category", "location_country")
+            .annotate(
+                events=Count("id"),
+                delivered_on_time=Count("id", filter=delivered & on_time),
+                delivered_late=Count("id", filter=delivered & ~on_time),
+            )
+            .order_by()
+        )
+        totals = {}
+        with read_from_replica():
+            groups = list(groups)
+        for group in groups:
+            # NULL and "" countries are the same rollup
+            key = (group["day"], group["status"], group["courier__category"], group["location_country"] or "")
+            totals.setdefault(key, Counter()).update({measure: group[measure] for measure in MEASURES})
+        rows = [
+            DailyRollup(
+                date=date, status=status, category=category, country=country,
+                **{measure: total[measure] for measure in MEASURES},
+            )
+            for (date, status, category, country), total in totals.items()
+        ]
+        with transaction.atomic():
+            DailyRollup.objects.filter(date__range=(day, last)).delete()
+            DailyRollup.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+        day = last + timedelta(days=1)
+    return written
@@ -0,0 +1,300 @@
+"""
+Route maps for the tracking page, drawn on the server as small SVGs.
+
+Origin, current location and destination are placed from cities_light
+coordinates (``accounts.geocoder``) over simplified country outlines read
+from ``accounts/data/country_outlines.json`` (written by ``manage.py
+build_country_outlines`` from Natural Earth). Until that file exists the
+tracking page keeps the Google Maps embed, ``manage.py check --deploy``
+warns and rendering raises ImproperlyConfigured rather than drawing the
+route over an empty sea. Legs follow great circles on an equirectangular
+projection fitted to the route.
+
+Rendered maps are kept in a per-process LRU keyed by the
+``(origin, current, destination)`` tuple, ROUTE_MAP_CACHE_SIZE entries; the
+view adds an ETag and a long ``Cache-Control`` so browsers and the CDN
+rarely ask again.
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+import numpy as np
+from django.conf import settings
+from django.core import checks
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.html import escape
+
+from .geocoder import get_geocoder
+
+OUTLINES_PATH = os.path.join(os.path.dirname(__file__), "data", "country_outlines.json")
+
+WIDTH, HEIGHT = 800, 400
+PADDING = 0.18          # of the route's span, on every side
+MIN_SPAN = 24.0         # degrees of longitude shown even for a short domestic route
+ARC_POINTS = 48         # per leg
+
+LEGS = ("from", "at", "to")
+MARKER_COLOURS = {"from": "#6c757d", "at": "#28a745", "to": "#dc3545"}
+
+
+# ----------------------
+# OUTLINES
+# ----------------------
+_outlines = None
+_outlines_lock = threading.Lock()
+
+
+MISSING_OUTLINES = (
+    f"{OUTLINES_PATH} is missing, so route maps can't be drawn and the tracking page "
+    "falls back to the Google Maps embed. Generate it with "
+    "`manage.py build_country_outlines ne_110m_admin_0_countries.geojson` and commit it."
+)
+
+
+def has_outlines():
+    return _outlines is not None or os.path.exists(OUTLINES_PATH)
+
+
+@checks.register(deploy=True)
+def check_outlines(app_configs, **kwargs):
+    if has_outlines():
+        return []
+    return [checks.Warning(MISSING_OUTLINES, id="accounts.W001")]
+
+
+def get_outlines():
+    """``[(lons, lats, (min lon, min lat, max lon, max lat)), ...]`` for every ring."""
+    global _outlines
+    if _outlines is None:
+        with _outlines_lock:
+            if _outlines is None:
+                if not os.path.exists(OUTLINES_PATH):
+                    raise ImproperlyConfigured(MISSING_OUTLINES)
+                rings = []
+                with open(OUTLINES_PATH, encoding="utf-8") as fh:
+                    # {"NG": [[lon, lat, lon, lat, ...], ...], ...}
+                    for flat_rings in json.load(fh)["countries"].values():
+                        for flat in flat_rings:
+                            lons = np.array(flat[0::2], dtype=float)
+                            lats = np.array(flat[1::2], dtype=float)
+                            rings.append((lons, lats, (lons.min(), lats.min(), lons.max(), lats.max())))
+                _outlines = rings
+    return _outlines
+
+
+# ----------------------
+# GEOMETRY
+# ----------------------
+def great_circle(start, end, steps=ARC_POINTS):
+    """``(lats, lons)`` along the great circle from ``start`` to ``end`` (``(lat, lon)`` degrees)."""
+    lat1, lon1, lat2, lon2 = np.radians([start[0], start[1], end[0], end[1]])
+    a = np.array([np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1)])
+    b = np.array([np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2)])
+    omega = np.arccos(np.clip(a @ b, -1.0, 1.0))
+    t = np.linspace(0.0, 1.0, steps)[:, None]
+    if omega < 1e-9:
+        points = np.repeat(a[None, :], steps, axis=0)
+    else:
+        points = (np.sin((1 - t) * omega) * a + np.sin(t * omega) * b) / np.sin(omega)
+    lats = np.degrees(np.arcsin(np.clip(points[:, 2], -1.0, 1.0)))
+    lons = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+    return lats, lons
+
+
+def unwrap(lons, reference):
+    """Shift longitudes by whole turns so the path is continuous and starts near ``reference``."""
+    lons = np.degrees(np.unwrap(np.radians(lons)))
+    return lons + 360.0 * round((reference - lons[0]) / 360.0)
+
+
+class Projection:
+    """Equirectangular, scaled by cos(mid latitude) and fitted around the route's points."""
+
+    def __init__(self, lats, lons):
+        self.kx = max(math.cos(math.radians(float(np.mean(lats)))), 0.2)
+        xs, ys = np.asarray(lons) * self.kx, np.asarray(lats)
+        span_x = max(xs.max() - xs.min(), MIN_SPAN * self.kx)
+        span_y = max(ys.max() - ys.min(), span_x * HEIGHT / WIDTH)
+        span_x = max(span_x, span_y * WIDTH / HEIGHT)  # keep the canvas aspect
+        span_x, span_y = span_x * (1 + 2 * PADDING), span_y * (1 + 2 * PADDING)
+        self.x0 = (xs.max() + xs.min()) / 2 - span_x / 2
+        self.y1 = (ys.max() + ys.min()) / 2 + span_y / 2
+        self.scale = WIDTH / span_x
+        # visible window in degrees, for culling outlines
+        self.bounds = (
+            self.x0 / self.kx, self.y1 - span_y,
+            (self.x0 + span_x) / self.kx, self.y1,
+        )
+
+    def __call__(self, lats, lons):
+        x = (np.asarray(lons) * self.kx - self.x0) * self.scale
+        y = (self.y1 - np.asarray(lats)) * self.scale
+        return x, y
+
+
+def path_data(x, y, closed=False):
+    """SVG path commands, dropping points less than half a pixel from the last one kept."""
+    keep = [0]
+    for i in range(1, len(x)):
+        if abs(x[i] - x[keep[-1]]) + abs(y[i] - y[keep[-1]]) >= 0.5:
+            keep.append(i)
+    coords = " ".join(f"{x[i]:.1f},{y[i]:.1f}" for i in keep)
+    return f"M{coords}{'Z' if closed else ''}"
+
+
+# ----------------------
+# RENDERING
+# ----------------------
+def render_svg(points):
+    """
+    ``points`` maps "from"/"at"/"to" to ``(lat, lon, label)`` (missing legs
+    are left out). Returns the SVG document as a string.
+    """
+    legs = [leg for leg in LEGS if leg in points]
+
+    # arcs chained on one continuous longitude range, so a route over the antimeridian stays in one piece
+    placed = {legs[0]: tuple(points[legs[0]][:2])}
+    arcs = []
+    for start, end in zip(legs, legs[1:]):
+        lats, lons = great_circle(points[start][:2], points[end][:2])
+        lons = unwrap(lons, placed[start][1])
+        placed[end] = (lats[-1], lons[-1])
+        arcs.append((start, end, lats, lons))
+
+    project = Projection(
+        np.concatenate([lats for _, _, lats, _ in arcs] + [[lat for lat, _ in placed.values()]]),
+        np.concatenate([lons for _, _, _, lons in arcs] + [[lon for _, lon in placed.values()]]),
+    )
+    min_lon, min_lat, max_lon, max_lat = project.bounds
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" '
+        f'width="{WIDTH}" height="{HEIGHT}" role="img" aria-label="Shipment route map">',
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="#e8f1f8"/>',
+    ]
+
+    # graticule every 10 or 30 degrees
+    step = 10 if max_lon - min_lon < 90 else 30
+    grid = []
+    for lon in range(int(math.floor(min_lon / step)) * step, int(max_lon) + step, step):
+        x, y = project([min_lat, max_lat], [lon, lon])
+        grid.append(path_data(x, y))
+    for lat in range(max(int(math.floor(min_lat / step)) * step, -90), min(int(max_lat), 90) + step, step):
+        x, y = project([lat, lat], [min_lon, max_lon])
+        grid.append(path_data(x, y))
+    parts.append(f'<path d="{"".join(grid)}" fill="none" stroke="#ffffff" stroke-width="0.8" opacity="0.7"/>')
+
+    # land: rings overlapping the window, repeated across the antimeridian when the window crosses it
+    land = []
+    for lons, lats, (r_min_lon, r_min_lat, r_max_lon, r_max_lat) in get_outlines():
+        if r_max_lat < min_lat or r_min_lat > max_lat:
+            continue
+        for shift in (-360.0, 0.0, 360.0):
+            if r_max_lon + shift < min_lon or r_min_lon + shift > max_lon:
+                continue
+            x, y = project(lats, lons + shift)
+            land.append(path_data(x, y, closed=True))
+    if land:
+        parts.append(f'<path d="{"".join(land)}" fill="#f7f5ef" stroke="#c9c3b3" stroke-width="0.6"/>')
+
+    for start, end, lats, lons in arcs:
+        x, y = project(lats, lons)
+        travelled = start == "from" and end == "at"
+        dash = "" if travelled else ' stroke-dasharray="8 6"'
+        colour = MARKER_COLOURS["at"] if travelled else "#495057"
+        parts.append(f'<path d="{path_data(x, y)}" fill="none" stroke="{colour}" stroke-width="3"{dash}/>')
+
+    for leg in legs:
+        lat, lon = placed[leg]
+        x, y = project([lat], [lon])
+        x, y = float(x[0]), float(y[0])
+        radius = 8 if leg == "at" else 6
+        parts.append(
+            f'<circle cx="{x:.1f}" cy="{y:.1f}" r="{radius}" fill="{MARKER_COLOURS[leg]}" '
+            f'stroke="#ffffff" stroke-width="2"/>'
+        )
+        label = escape(points[leg][2])
+        anchor = "end" if x > WIDTH * 0.8 else "start"
+        dx = -12 if anchor == "end" else 12
+        parts.append(
+            f'<text x="{x + dx:.1f}" y="{y + 4:.1f}" text-anchor="{anchor}" font-family="Arial, sans-serif" '
+            f'font-size="14" font-weight="bold" fill="#212529" stroke="#ffffff" stroke-width="3" '
+            f'paint-order="stroke">{label}</text>'
+        )
+
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+# ----------------------
+# CACHE
+# ----------------------
+def route_key(locations):
+    """Cache key from ``{leg: (city, country)}``: case and stray spaces don't make a new entry."""
+    return tuple(
+        (leg, str(locations[leg][1] or "").upper(), " ".join(str(locations[leg][0] or "").split()).title())
+        for leg in LEGS if leg in locations
+    )
+
+
+def render_route(key):
+    geocoder = get_geocoder()
+    points = {}
+    for leg, country, city in key:
+        location = geocoder.locate(city, country)
+        if location is not None:
+            points[leg] = (*location, city or country)
+    if not points:
+        return None
+    svg = render_svg(points).encode("utf-8")
+    return svg, '"%s"' % hashlib.md5(svg).hexdigest()
+
+
+NOT_CACHED = object()
+
+_rendered = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def cached_route_map(locations):
+    """The cached ``get_route_map`` result for ``locations``, or ``NOT_CACHED``; never renders."""
+    key = route_key(locations)
+    with _cache_lock:
+        if key not in _rendered:
+            return NOT_CACHED
+        _rendered.move_to_end(key)
+        return _rendered[key]
+
+
+def get_route_map(locations):
+    """``(svg bytes, etag)`` for ``{leg: (city, country)}``, or ``None`` when nothing resolves."""
+    rendered = cached_route_map(locations)
+    if rendered is NOT_CACHED:
+        key = route_key(locations)
+        rendered = render_route(key)
+        with _cache_lock:
+            _rendered[key] = rendered
+            while len(_rendered) > settings.ROUTE_MAP_CACHE_SIZE:
+                _rendered.popitem(last=False)
+    return rendered
+
+
+def map_query(courier, geocoder):
+    """Query string for the map of ``courier`` (a Courier or TrackingSummary), or ``""``."""
+    legs = {
+        "from": (courier.sender_city, courier.sender_country),
+        "at": (courier.current_location_city, courier.current_location_country),
+        "to": (courier.destination_city, courier.destination_country),
+    }
+    params = {}
+    for leg, (city, country) in legs.items():
+        if country and geocoder.row(city, country) is not None:
+            params[f"{leg}_country"] = str(country)
+            if city:
+                params[f"{leg}_city"] = city
+    return urlencode(params)
@@ -0,0 +1,283 @@
+"""
+Bulk scan-event ingestion for depot scanners and driver apps.
+
+``POST /api/scans/`` with ``Authorization: Bearer <ScannerKey.key>`` and an
+NDJSON body, one scan per line::
+
+    {"event_id": "dock4-000123", "tracking_number": "CTR-1TAP2T", "status": "In Transit",
+     "country": "NG", "city": "Lagos", "description": "Arrived at hub", "timestamp": "2025-10-01T08:15:00Z"}
+
+``event_id`` is the idempotency key, scoped to the scanner key that sent it
+(two scanners may both number their events from 1); without one, the key is
+a hash of the scan's content, so resending a batch is harmless either way: only rows this
+batch actually inserted reach webhooks, rollups and courier state. Tracking
+numbers are matched on their canonical ``tracking_key``, as on the tracking
+page, so ``ctr 1tap2t`` finds ``CTR-1TAP2T``. Blank lines are skipped and
+don't count as lines; a line longer than SCAN_INGEST_MAX_LINE_BYTES is
+rejected without being read into memory.
+
+A batch costs a fixed handful of queries however large it is: resolve
+couriers, lock them and drop known keys, ``bulk_create`` the history rows
+and read back the ones that went in, one ``bulk_update`` with each courier's
+newest state, then the tracking-summary upsert, webhook outbox rows,
+dashboard rollups and portal count invalidation that the per-save signals
+would otherwise have done.
+"""
+import hashlib
+import json
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django_countries import countries
+
+from . import portal, rollups, webhooks
+from .models import Courier, CourierTrackingHistory, ScannerKey, TrackingSummary
+from .tracking_lookup import canonical, normalize
+
+STATUSES = {value for value, _label in CourierTrackingHistory._meta.get_field("status").choices}
+MAX_EVENT_ID_LENGTH = 64
+
+
+class ScanError(ValueError):
+    pass
+
+
+def parse_scan(line, now, scanner_id):
+    if len(line.encode()) > settings.SCAN_INGEST_MAX_LINE_BYTES:
+        raise ScanError(f"line longer than {settings.SCAN_INGEST_MAX_LINE_BYTES} bytes")
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ScanError(f"invalid JSON: {exc.msg}")
+    if not isinstance(record, dict):
+        raise ScanError("expected a JSON object")
+
+    raw_number = str(record.get("tracking_number") or "").strip()
+    if not raw_number:
+        raise ScanError("tracking_number is required")
+    status = record.get("status")
+    if status not in STATUSES:
+        raise ScanError(f"unknown status {status!r}")
+    country = (record.get("country") or "").upper() or None
+    if country and country not in countries:
+        raise ScanError(f"unknown country {country!r}")
+
+    timestamp = now
+    if record.get("timestamp"):
+        timestamp = parse_datetime(str(record["timestamp"]))
+        if timestamp is None:
+            raise ScanError(f"bad timestamp {record['timestamp']!r}")
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp, dt_timezone.utc)
+
+    scan = {
+        "tracking_number": normalize(raw_number),
+        "tracking_key": canonical(raw_number),
+        "status": status,
+        "country": country,
+        "city": (record.get("city") or "").strip() or None,
+        "description": str(record.get("description") or "Scanned"),
+        "timestamp": timestamp,
+    }
+    event_id = str(record.get("event_id") or "")
+    if len(event_id) > MAX_EVENT_ID_LENGTH:
+        raise ScanError(f"event_id longer than {MAX_EVENT_ID_LENGTH} characters")
+    if event_id:
+        scan["key"] = f"{scanner_id}:{event_id}"
+    else:
+        content = "|".join(str(scan[field]) for field in ("tracking_key", "status", "country", "city", "timestamp"))
+        scan["key"] = "sha1:" + hashlib.sha1(content.encode()).hexdigest()
+    return scan
+
+
+def ingest(lines, scanner, now=None):
+    """
+    Validate and apply an iterable of NDJSON lines sent by ``scanner`` (a
+    ScannerKey); returns the summary the view sends back.
+    """
+    now = now or timezone.now()
+    scans, rejected = {}, []
+    parsed = 0
+    number = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        number += 1
+        if number > settings.SCAN_INGEST_MAX_EVENTS:
+            rejected.append({"line": number, "error": f"batch limited to {settings.SCAN_INGEST_MAX_EVENTS} lines"})
+            break
+        try:
+            scan = parse_scan(line, now, scanner.pk)
+        except ScanError as exc:
+            rejected.append({"line": number, "error": str(exc)})
+            continue
+        scan["line"] = number
+        parsed += 1
+        scans.setdefault(scan["key"], scan)  # first copy of a key within the batch wins
+
+    couriers = resolve_couriers(scans.values())
+    for key, scan in list(scans.items()):
+        if scan["tracking_number"] not in couriers:
+            rejected.append({"line": scan["line"], "error": f"unknown tracking number {scan['tracking_number']}"})
+            del scans[key]
+
+    with transaction.atomic():
+        # Batches touching the same couriers take turns, so keys another batch is
+        # writing right now are already visible (and skipped) below.
+        list(
+            Courier.objects.filter(id__in=[courier.id for courier in couriers.values()])
+            .order_by("id").select_for_update().values_list("id", flat=True)
+        )
+        seen = set(
+            CourierTrackingHistory.objects.filter(idempotency_key__in=list(scans))
+            .values_list("idempotency_key", flat=True)
+        )
+        new_scans = [scan for key, scan in scans.items() if key not in seen]
+        CourierTrackingHistory.objects.bulk_create(
+            [
+                CourierTrackingHistory(
+                    courier=couriers[scan["tracking_number"]],
+                    status=scan["status"],
+                    location_country=scan["country"],
+                    location_city=scan["city"],
+                    description=scan["description"],
+                    timestamp=scan["timestamp"],
+                    idempotency_key=scan["key"],
+                )
+                for scan in new_scans
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,  # backstop; ignore_conflicts leaves no pks to tell what went in
+        )
+        # fan out only the rows that were really inserted
+        by_id = {courier.id: courier for courier in couriers.values()}
+        history = list(
+            CourierTrackingHistory.objects.filter(
+                idempotency_key__in=[scan["key"] for scan in new_scans], courier_id__in=list(by_id)
+            ).order_by("id")
+        )
+        for entry in history:
+            entry.courier = by_id[entry.courier_id]
+        inserted = {entry.idempotency_key for entry in history}
+        new_scans = [scan for scan in new_scans if scan["key"] in inserted]
+
+        updated = apply_latest_state(couriers, new_scans, now)
+        webhooks.enqueue_many(history)
+        rollups.record(history)
+
+    unknown = sum(1 for scan in rejected if scan["error"].startswith("unknown tracking number"))
+    return {
+        "received": parsed,
+        "accepted": len(new_scans),
+        "duplicates": parsed - unknown - len(new_scans),
+        "couriers_updated": updated,
+        "rejected": rejected,
+    }
+
+
+def resolve_couriers(scans):
+    """
+    ``{tracking number: Courier}`` for the scans, matched on ``tracking_key``;
+    each scan's ``tracking_number`` is set to the stored number it matched.
+    Like the tracking page, an exact number wins when two share a key.
+    """
+    candidates = {}
+    for courier in Courier.objects.filter(
+        tracking_summary__tracking_key__in={scan["tracking_key"] for scan in scans}
+    ).only("id", "user_id", *TrackingSummary.FIELDS):
+        candidates.setdefault(canonical(courier.tracking_number), []).append(courier)
+
+    couriers = {}
+    for scan in scans:
+        matches = candidates.get(scan["tracking_key"], [])
+        courier = next((c for c in matches if c.tracking_number == scan["tracking_number"]), None)
+        if courier is None and len(matches) == 1:
+            courier = matches[0]
+        if courier is not None:
+            scan["tracking_number"] = courier.tracking_number
+            couriers[courier.tracking_number] = courier
+    return couriers
+
+
+def apply_latest_state(couriers, scans, now):
+    """Move each courier to its newest scan, unless its history already has something later."""
+    newest = {}
+    for scan in scans:
+        current = newest.get(scan["tracking_number"])
+        if current is None or scan["timestamp"] >= current["timestamp"]:
+            newest[scan["tracking_number"]] = scan
+    if not newest:
+        return 0
+
+    ids = [couriers[number].id for number in newest]
+    latest_existing = dict(
+        CourierTrackingHistory.objects.filter(courier_id__in=ids)
+        .exclude(idempotency_key__in=[scan["key"] for scan in newest.values()])
+        .values("courier_id").annotate(last=Max("timestamp")).values_list("courier_id", "last")
+    )
+
+    changed = []
+    for number, scan in newest.items():
+        courier = couriers[number]
+        last = latest_existing.get(courier.id)
+        if last is not None and last > scan["timestamp"]:
+            continue  # a late-arriving old scan: history only
+        courier.status = scan["status"]
+        courier.current_location_country = scan["country"]
+        courier.current_location_city = scan["city"]
+        courier.updated_at = now
+        changed.append(courier)
+
+    Courier.objects.bulk_update(
+        changed,
+        ["status", "current_location_country", "current_location_city", "updated_at"],
+        batch_size=1000,
+    )
+    TrackingSummary.refresh(changed)
+    portal.invalidate_status_counts(courier.user_id for courier in changed)
+    return len(changed)
+
+
+def authenticate(request):
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None
+    scanner = ScannerKey.objects.filter(key=header[len("Bearer "):].strip(), is_active=True).first()
+    if scanner is not None:
+        ScannerKey.objects.filter(pk=scanner.pk).update(last_used_at=timezone.now())
+    return scanner
+
+
+def read_lines(stream, limit):
+    """
+    Decoded lines of ``stream``, each read with a ``limit + 1`` byte cap. An
+    overlong line yields only its first ``limit + 1`` bytes (for parse_scan
+    to reject) and the rest of it is skipped in bounded chunks.
+    """
+    while True:
+        line = stream.readline(limit + 1)
+        if not line:
+            return
+        rest = line
+        while len(rest) > limit and not rest.endswith(b"\n"):
+            rest = stream.readline(limit + 1)
+        yield line.decode("utf-8", "replace")
+
+
+@csrf_exempt
+@require_POST
+def ingest_view(request):
+    scanner = authenticate(request)
+    if scanner is None:
+        return JsonResponse({"error": "invalid or missing scanner key"}, status=401)
+    # read the stream line by line rather than request.body: no DATA_UPLOAD_MAX_MEMORY_SIZE
+    # cap, and neither the batch nor any one line is ever held whole
+    return JsonResponse(ingest(read_lines(request, settings.SCAN_INGEST_MAX_LINE_BYTES), scanner))
@@ -0,0 +1,71 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import portal, rollups, webhooks
+from .models import Courier, CourierTrackingHistory, TrackingSummary
+
+
+# ----------------------
+# SIGNALS TO AUTO-CREATE HISTORY
+# ----------------------
+@receiver(post_save, sender=Courier)
+def create_or_update_tracking_history(sender, instance, created, **kwargs):
+    """
+    Automatically log courier creation and updates to history.
+    """
+    if created:
+        # New courier -> create initial history record
+        CourierTrackingHistory.objects.create(
+            courier=instance,
+            status=instance.status,
+            location_country=instance.current_location_country,
+            location_city=instance.current_location_city,
+            description="Courier created"
+        )
+    else:
+        # On update, create a new history log if key fields changed
+        last_history = CourierTrackingHistory.objects.filter(
+            courier=instance
+        ).order_by("-timestamp").first()
+
+        if (
+            not last_history
+            or last_history.status != instance.status
+            or last_history.location_country != instance.current_location_country
+            or last_history.location_city != instance.current_location_city
+            or last_history and instance.estimated_delivery_date
+            and last_history.timestamp.date() != instance.estimated_delivery_date
+        ):
+            CourierTrackingHistory.objects.create(
+                courier=instance,
+                status=instance.status,
+                location_country=instance.current_location_country,
+                location_city=instance.current_location_city,
+                description="Courier details updated"
+            )
+
+
+@receiver(post_save, sender=Courier)
+def refresh_tracking_summary(sender, instance, **kwargs):
+    """Keep the public tracking projection in step with the courier."""
+    TrackingSummary.refresh([instance])
+
+
+@receiver(post_save, sender=Courier)
+@receiver(post_delete, sender=Courier)
+def invalidate_portal_counts(sender, instance, **kwargs):
+    """The owner's cached per-status counts in the shipments portal."""
+    portal.invalidate_status_counts([instance.user_id])
+
+
+@receiver(post_save, sender=CourierTrackingHistory)
+def queue_webhook_events(sender, instance, created, **kwargs):
+    """Outbox rows only; deliver_webhooks does the HTTP."""
+    if created:
+        webhooks.enqueue(instance)
+
+
+@receiver(post_save, sender=CourierTrackingHistory)
+def count_into_rollups(sender, instance, created, **kwargs):
+    """Dashboard counters; scan ingestion calls rollups.record for its bulk inserts."""
+    if created:
+        rollups.record([instance])
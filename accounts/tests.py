@@ -1,3 +1,976 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import random
+import shutil
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import brotli
+import httpx
+import numpy as np
+from cities_light.models import City, Country
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import InterfaceError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+from fontTools import subset as font_subset
+from fontTools.ttLib import TTFont
+
+from . import archive, city_index, db_router, page_cache, portal, rollups, route_map, webhooks
+from .admin import CourierAdmin
+from .eta import EtaTable, add_samples, get_eta_table, percentiles, transit_samples
+from .geocoder import Geocoder, get_geocoder
+from .management.commands import build_icon_subset, generate_couriers
+from .metrics import metrics_view, registry
+from .models import (
+    Account, Courier, CourierTrackingHistory, DailyRollup, ScannerKey, TrackingSummary, WebhookEndpoint,
+    WebhookEvent,
+)
+from .scan_ingest import ingest
+from .query_inspector import QueryBudgetExceeded, QueryInspectorMiddleware, declare_query_budget, query_budget
+from .tracking_lookup import canonical, normalize, one_edit_away
+
+
+def make_courier(**fields):
+    """A Courier with every required field filled in; ``fields`` override."""
+    defaults = {
+        "status": "In Transit",
+        "receiver_name": "Ada Obi",
+        "receiver_contact_number": "08000000000",
+        "receiver_email": "ada@example.com",
+        "receiver_address": "1 Marina Road",
+        "sender_name": "Net Express",
+        "sender_contact_number": "08500000000",
+        "sender_email": "ops@example.com",
+        "sender_address": "7366 Manatee St",
+        "sender_country": "US",
+        "sender_city": "Miami",
+        "destination_country": "GB",
+        "destination_city": "London",
+        "item_description": "Documents",
+        "parcel_colour": "Brown",
+        "date_sent": date(2026, 10, 1),
+        "estimated_delivery_date": date(2026, 10, 8),
+    }
+    defaults.update(fields)
+    return Courier.objects.create(**defaults)
+
+
+# ----------------------
+# ICON SUBSET
+# ----------------------
+class IconSubsetTests(SimpleTestCase):
+    def test_committed_subset_covers_every_icon(self):
+        out = StringIO()
+        call_command("build_icon_subset", check=True, stdout=out)
+        self.assertIn("covers every icon", out.getvalue())
+
+    def test_a_glyph_missing_from_the_font_is_caught(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir)
+        for filename in os.listdir(build_icon_subset.SUBSET_DIR):
+            shutil.copy(os.path.join(build_icon_subset.SUBSET_DIR, filename), workdir)
+        # rebuild one font without its first glyph; the CSS still names it
+        path = os.path.join(workdir, "fa-solid-900.woff2")
+        codepoints = sorted(TTFont(path).getBestCmap())
+        options = font_subset.Options()
+        options.flavor = "woff2"
+        font = font_subset.load_font(path, options)
+        subsetter = font_subset.Subsetter(options)
+        subsetter.populate(unicodes=codepoints[1:])
+        subsetter.subset(font)
+        font_subset.save_font(font, path, options)
+
+        with mock.patch.object(build_icon_subset, "SUBSET_DIR", workdir):
+            with self.assertRaisesMessage(CommandError, f"U+{codepoints[0]:04X} (fa-solid-900.woff2)"):
+                call_command("build_icon_subset", check=True, stdout=StringIO())
+
+
+# ----------------------
+# PAGE CACHE
+# ----------------------
+@mock.patch.dict(page_cache._pages, clear=True)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.path = reverse("home")
+
+    def test_encoding_variants(self):
+        identity = self.client.get(self.path)
+        self.assertEqual(identity.status_code, 200)
+        self.assertNotIn("Content-Encoding", identity)
+        self.assertIn("Accept-Encoding", identity["Vary"])
+        self.assertEqual(identity["Cache-Control"], "public, max-age=300")
+
+        gzipped = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(gzipped.content), identity.content)
+
+        # brotli wins when both are accepted
+        br = self.client.get(self.path, HTTP_ACCEPT_ENCODING="gzip, br;q=0.9")
+        self.assertEqual(br["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(br.content), identity.content)
+
+    def test_etag_not_modified(self):
+        first = self.client.get(self.path)
+        etag = first["ETag"]
+        with self.assertNumQueries(0):
+            second = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+        self.assertEqual(second["ETag"], etag)
+
+        stale = self.client.get(self.path, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.content, first.content)
+
+    def test_shared_entry_fills_process_copy(self):
+        self.client.get(self.path)
+        page_cache._pages.clear()
+        with mock.patch.object(page_cache, "store") as store:
+            response = self.client.get(self.path)
+        store.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.path, page_cache._pages)
+
+    def test_query_string_bypasses_cache(self):
+        self.client.get(self.path + "?utm_source=mail")
+        self.assertNotIn(self.path, page_cache._pages)
+
+
+# ----------------------
+# CITY AUTOCOMPLETE
+# ----------------------
+@mock.patch.object(city_index, "_index", None)
+class CityAutocompleteTests(TestCase):
+    def setUp(self):
+        gb = Country.objects.create(name="United Kingdom", code2="GB")
+        br = Country.objects.create(name="Brazil", code2="BR")
+        for country, name in ((gb, "London"), (gb, "Londonderry"), (gb, "Leeds"), (br, "São Paulo"), (br, "Londrina")):
+            City.objects.create(country=country, name=name)
+        self.url = reverse("admin:accounts_courier_city_autocomplete")
+        self.client.force_login(Account.objects.create_superuser("admin@example.com", "pw"))
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"]
+
+    def test_prefix_match(self):
+        self.assertEqual(self.search(q="lond"), ["London", "Londonderry", "Londrina"])
+        self.assertEqual(self.search(q="lond", country="gb"), ["London", "Londonderry"])
+        self.assertEqual(self.search(q="sao"), ["São Paulo"])  # accents folded
+        self.assertEqual(self.search(q=""), [])
+
+    def test_index_built_once(self):
+        self.search(q="le")
+        with self.assertNumQueries(1):  # the staff user; cities come from memory
+            self.assertEqual(self.search(q="le"), ["Leeds"])
+
+    def test_requires_staff(self):
+        self.client.logout()
+        response = self.client.get(self.url, {"q": "lond"})
+        self.assertEqual(response.status_code, 302)
+
+
+# ----------------------
+# GEOCODER
+# ----------------------
+class GeocoderTests(SimpleTestCase):
+    def setUp(self):
+        self.geocoder = Geocoder([
+            ("GB", "London", "Londres;Londra", 51.51, -0.13, 8_900_000),
+            ("GB", "Leeds", "", 53.80, -1.55, 790_000),
+            ("GB", "Londres", "", 50.0, -3.0, 120),  # clashes with London's alternate name
+            ("CA", "London", "", 42.98, -81.25, 420_000),
+            ("US", "Nowhere", "", None, None, 0),
+        ])
+
+    def test_lookup(self):
+        self.assertEqual(len(self.geocoder), 4)
+        self.assertEqual(self.geocoder.locate("london", "gb"), (51.51, -0.13))
+        self.assertEqual(self.geocoder.locate("LONDRES", "GB"), (51.51, -0.13))  # bigger city wins
+        self.assertEqual(self.geocoder.locate("London", "CA"), (42.98, -81.25))
+        self.assertEqual(self.geocoder.locate("Bath", "GB"), (51.51, -0.13))  # country's largest city
+        self.assertIsNone(self.geocoder.locate("Bath", "GB", fallback_to_country=False))
+        self.assertIsNone(self.geocoder.locate("Nowhere", "US"))
+
+    def test_locate_many(self):
+        lats, lons = self.geocoder.locate_many([("Leeds", "GB"), ("Paris", "FR")])
+        self.assertEqual(lats[0], 53.80)
+        self.assertTrue(np.isnan(lats[1]) and np.isnan(lons[1]))
+
+
+# ----------------------
+# QUERY BUDGETS
+# ----------------------
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        # process-wide tables; their one-off loads aren't part of any budget
+        get_geocoder()
+        get_eta_table()
+        self.user = Account.objects.create_user("owner@example.com", "pw")
+        self.courier = make_courier(user=self.user)
+
+    def test_tracking_hit(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("tracking"), {"tracking_number": self.courier.tracking_number})
+        self.assertContains(response, self.courier.tracking_number)
+        self.assertNotContains(response, self.courier.receiver_name)  # public page: no names
+
+    def test_tracking_miss(self):
+        with self.assertNumQueries(2):  # summary lookup + did-you-mean
+            response = self.client.get(reverse("tracking"), {"tracking_number": "CTR-ZZZZZZ"})
+        self.assertContains(response, "No Package Available")
+
+    def test_portal_pages(self):
+        for _ in range(30):
+            make_courier(user=self.user)
+        self.client.force_login(self.user)
+        with self.assertNumQueries(3):  # user, page, status counts
+            first = self.client.get(reverse("my_shipments"))
+        with self.assertNumQueries(2):  # counts now cached
+            self.client.get(reverse("my_shipments"), {"after": first.context["older"]})
+
+    def test_query_budget_catches_n_plus_one(self):
+        for _ in range(5):
+            make_courier(user=self.user)
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(20):
+                [courier.user.email for courier in Courier.objects.all()]
+
+    def test_declared_budget_is_enforced(self):
+        @declare_query_budget(0)
+        def view(request):
+            Courier.objects.count()
+            return HttpResponse()
+
+        request = RequestFactory().get("/")
+        request.resolver_match = type("Match", (), {"func": view})()
+        middleware = QueryInspectorMiddleware(view)
+        middleware.raise_errors = True
+        with self.assertRaises(QueryBudgetExceeded):
+            middleware(request)
+
+
+# ----------------------
+# CONNECTION POOL
+# ----------------------
+class PoolStatsTests(TestCase):
+    def setUp(self):
+        self.url = reverse("db_pool_metrics")
+        self.pool = mock.Mock(min_size=2, max_size=10)
+        self.pool.get_stats.return_value = {
+            "pool_size": 4, "pool_available": 1, "requests_num": 8, "requests_wait_ms": 40,
+        }
+
+    def test_staff_only(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(Account.objects.create_user("owner@example.com", "pw"))
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_stats(self):
+        self.client.force_login(Account.objects.create_superuser("admin@example.com", "pw"))
+        with mock.patch.object(connections["default"], "pool", self.pool, create=True):
+            stats = self.client.get(self.url).json()["default"]
+        self.assertEqual(stats["connections_in_use"], 3)
+        self.assertEqual(stats["utilisation"], 0.3)
+        self.assertEqual(stats["avg_wait_ms"], 5.0)
+        self.assertEqual((stats["pool_min"], stats["pool_max"]), (2, 10))
+
+    def test_pooling_off(self):
+        self.client.force_login(Account.objects.create_superuser("admin@example.com", "pw"))
+        self.assertEqual(self.client.get(self.url).json(), {"default": None})
+
+
+# ----------------------
+# REPLICAS
+# ----------------------
+class ReplicaFallbackTests(TestCase):
+    def tearDown(self):
+        db_router._down_until.clear()
+
+    @mock.patch("accounts.db_router.replica_aliases", return_value=["replica_1"])
+    def test_unusable_replica_falls_back_to_default(self, aliases):
+        broken = mock.Mock()
+        broken.ensure_connection.side_effect = InterfaceError("connection already closed")
+        with mock.patch.dict("accounts.db_router.__dict__", {"connections": {"replica_1": broken}}), \
+                self.assertLogs("accounts.db_router", "WARNING"):
+            with db_router.read_from_replica():
+                self.assertEqual(db_router.ReplicaRouter().db_for_read(Courier), "default")
+            # marked down: not even tried again until REPLICA_RETRY_SECONDS pass
+            self.assertIsNone(db_router.healthy_replica())
+        broken.ensure_connection.assert_called_once()
+
+
+# ----------------------
+# RATES
+# ----------------------
+class RecomputeRatesTests(TestCase):
+    def test_only_the_rate_is_written(self):
+        courier = make_courier(category="Express", weight=12)
+        before = Courier.objects.values_list("updated_at", flat=True).get(pk=courier.pk)
+        admin = CourierAdmin(Courier, site)
+        with mock.patch.object(admin, "message_user"):
+            admin.recompute_rates(RequestFactory().post("/"), Courier.objects.filter(pk=courier.pk))
+
+        courier.refresh_from_db()
+        self.assertGreater(courier.rate, 0)
+        self.assertEqual(courier.category, "Express")
+        self.assertEqual(courier.updated_at, before)
+        self.assertEqual(TrackingSummary.objects.get(pk=courier.pk).rate, courier.rate)
+
+    def test_weightless_shipments_are_skipped(self):
+        priced = make_courier(weight=3)
+        weightless = make_courier(weight=None, rate=Decimal("45.00"))
+        admin = CourierAdmin(Courier, site)
+        with mock.patch.object(admin, "message_user") as message_user:
+            admin.recompute_rates(RequestFactory().post("/"), Courier.objects.filter(pk__in=[priced.pk, weightless.pk]))
+
+        weightless.refresh_from_db()
+        self.assertEqual(weightless.rate, Decimal("45.00"))
+        done, skipped = [c.args[1] for c in message_user.call_args_list]
+        self.assertEqual(done, "Recomputed rates for 1 shipment(s).")
+        self.assertEqual(skipped, f"Skipped 1 shipment(s) without a weight: {weightless.tracking_number}.")
+
+
+class QuoteViewTests(TestCase):
+    def setUp(self):
+        self.url = reverse("quote")
+        self.shipment = {"from_country": "NG", "from_city": "Lagos", "to_country": "GB", "to_city": "London"}
+
+    def post(self, body, **settings_overrides):
+        with override_settings(**settings_overrides):
+            return self.client.post(self.url, body, content_type="application/json")
+
+    def test_single_quote(self):
+        response = self.client.get(self.url, {**self.shipment, "weight": "2.5"})
+        self.assertEqual(response.status_code, 200)
+        quote = response.json()
+        self.assertEqual(quote["category"], "International")
+        self.assertGreater(Decimal(quote["rate"]), 0)
+
+    def test_batch_matches_single_quotes(self):
+        weights = ["1", "2.5", "40"]
+        response = self.post({"shipments": [{**self.shipment, "weight": weight} for weight in weights]})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        singles = [self.client.get(self.url, {**self.shipment, "weight": weight}).json() for weight in weights]
+        self.assertEqual([quote["rate"] for quote in body["quotes"]], [quote["rate"] for quote in singles])
+        self.assertEqual(body["currency"], singles[0]["currency"])
+
+    def test_validation(self):
+        cases = [
+            ({**self.shipment, "weight": "heavy"}, "weight (kg) must be a number"),
+            ({**self.shipment, "weight": "0"}, "weight must be between 0 and 10000 kg"),
+            ({**self.shipment}, "weight (kg) must be a number"),
+            ({"to_country": "GB", "weight": "1"}, "from_country and to_country are required"),
+        ]
+        for params, error in cases:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual((response.status_code, response.json()["error"]), (400, error))
+                response = self.post({"shipments": [params]})
+                self.assertEqual((response.status_code, response.json()["error"]), (400, error))
+
+    def test_bad_batches(self):
+        self.assertEqual(self.post("not json").status_code, 400)
+        self.assertEqual(self.post({"quotes": []}).status_code, 400)
+        self.assertEqual(self.post({"shipments": ["NG"]}).status_code, 400)
+        response = self.post({"shipments": [{**self.shipment, "weight": 1}] * 3}, QUOTE_MAX_SHIPMENTS=2)
+        self.assertEqual(response.json()["error"], "at most 2 shipments per request")
+
+
+# ----------------------
+# PUBLIC FAST PATH
+# ----------------------
+class PublicFastPathTests(TestCase):
+    def setUp(self):
+        self.url = reverse("tracking")
+        self.params = {"tracking_number": "CTR-ZZZZZZ"}
+
+    def assertPublic(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.cookies, {})
+        self.assertNotIn("Cookie", response.get("Vary", ""))
+        self.assertEqual(response["Cache-Control"], f"public, max-age={settings.PUBLIC_CACHE_MAX_AGE}")
+
+    def test_anonymous_get(self):
+        self.assertPublic(self.client.get(self.url, self.params))
+        self.assertPublic(self.client.head(self.url, self.params))
+        self.assertFalse(self.client.cookies)
+
+    def test_stateful_cookie_skips_fast_path(self):
+        self.client.force_login(Account.objects.create_user("owner@example.com", "pw"))
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("public", response.get("Cache-Control", ""))
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+
+    def test_stateful_prefix(self):
+        response = self.client.get(reverse("admin:login"))
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        self.assertNotIn("public", response.get("Cache-Control", ""))
+
+
+# ----------------------
+# SYNTHETIC DATA
+# ----------------------
+class GenerateCouriersTests(TestCase):
+    def test_copy_records_fill_every_column(self):
+        command = generate_couriers.Command()
+        command.now, command.days = timezone.now(), 30
+        rng = random.Random(1)
+        courier = command.make_courier(rng, 1, "CTR-AAAAAA")
+        history = [{**event, "id": i} for i, event in enumerate(command.make_history(rng, courier), 1)]
+
+        for model, rows in (
+            (Courier, [courier]),
+            (CourierTrackingHistory, history),
+            (TrackingSummary, [generate_couriers.summary_row(courier)]),
+        ):
+            with self.subTest(model=model.__name__):
+                columns, records = generate_couriers.copy_records(model, rows)
+                self.assertEqual(columns, [field.column for field in model._meta.concrete_fields])
+                for record in records:
+                    self.assertEqual(len(record), len(columns))
+
+        columns, records = generate_couriers.copy_records(CourierTrackingHistory, history)
+        self.assertIsNone(next(records)[columns.index("idempotency_key")])
+
+    def test_generates_couriers_history_and_summaries(self):
+        call_command("generate_couriers", couriers=25, days=10, seed=1, stdout=StringIO())
+        self.assertEqual(Courier.objects.count(), 25)
+        self.assertEqual(TrackingSummary.objects.count(), 25)
+        self.assertEqual(CourierTrackingHistory.objects.values("courier").distinct().count(), 25)
+
+
+# ----------------------
+# METRICS
+# ----------------------
+@override_settings(METRICS_TOKEN="s3cret", METRICS_ALLOWED_IPS=[])
+class MetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.url = reverse("metrics")
+
+    def test_server_timing(self):
+        response = self.client.get(reverse("tracking"), {"tracking_number": "CTR-ZZZZZZ"})
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertRegex(self.client.get(reverse("home"))["Server-Timing"], r'cache;desc="(hit|miss)"')
+
+    def test_anonymous_forbidden(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(Account.objects.create_user("owner@example.com", "pw"))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_staff_session(self):
+        self.client.get(reverse("tracking"), {"tracking_number": "CTR-ZZZZZZ"})
+        self.client.force_login(Account.objects.create_superuser("admin@example.com", "pw"))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('view="tracking"', response.content.decode())
+
+    def test_bearer_token(self):
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION="Bearer s3cret").status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION="s3cret").status_code, 403)
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get(self.url, HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"])
+    def test_ip_allowlist(self):
+        auth = {"HTTP_AUTHORIZATION": "Bearer s3cret"}
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="10.0.0.5", **auth).status_code, 200)
+        self.assertEqual(self.client.get(self.url, REMOTE_ADDR="10.0.0.6", **auth).status_code, 403)
+
+    def test_public_urlconf(self):
+        match = resolve("/internal/metrics/", urlconf="net_courier.urls_public")
+        self.assertIs(match.func, metrics_view)
+        # the public profile has no sessions: anonymous requests carry no user at all
+        request = RequestFactory().get("/internal/metrics/")
+        self.assertEqual(metrics_view(request).status_code, 403)
+        request = RequestFactory().get("/internal/metrics/", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(metrics_view(request).status_code, 200)
+
+
+# ----------------------
+# WEBHOOKS
+# ----------------------
+@override_settings(WEBHOOK_MAX_ATTEMPTS=2, WEBHOOK_FAILURE_THRESHOLD=3, WEBHOOK_BATCH_SIZE=10)
+class WebhookDeliveryTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user("partner@example.com", "pw")
+        self.endpoint = WebhookEndpoint.objects.create(account=self.user, url="https://partner.example.com/hook")
+        self.courier = make_courier(user=self.user)  # its "Courier created" row is queued
+        self.courier.tracking_history.create(status="Out for Delivery")
+        self.requests = []
+
+    def client_returning(self, status):
+        def handler(request):
+            self.requests.append(request)
+            return httpx.Response(status)
+        return httpx.Client(transport=httpx.MockTransport(handler))
+
+    def make_due(self):
+        WebhookEvent.objects.filter(state=WebhookEvent.PENDING).update(next_attempt_at=timezone.now())
+
+    def test_history_rows_are_queued_and_delivered_in_one_signed_batch(self):
+        self.assertEqual(WebhookEvent.objects.filter(endpoint=self.endpoint).count(), 2)
+        self.assertEqual(webhooks.deliver_due(self.client_returning(200)), (2, 0))
+
+        request, = self.requests
+        signature = request.headers[webhooks.SIGNATURE_HEADER]
+        self.assertTrue(webhooks.verify(self.endpoint.secret, request.content, signature))
+        body = json.loads(request.content)
+        self.assertEqual([event["status"] for event in body["events"]], ["In Transit", "Out for Delivery"])
+        self.assertEqual(WebhookEvent.objects.filter(state=WebhookEvent.DELIVERED).count(), 2)
+        self.assertEqual(webhooks.deliver_due(self.client_returning(200)), (0, 0))  # nothing left
+
+    def test_failures_back_off_then_give_up(self):
+        self.assertEqual(webhooks.deliver_due(self.client_returning(503)), (0, 2))
+        event = WebhookEvent.objects.first()
+        self.assertEqual((event.state, event.attempts), (WebhookEvent.PENDING, 1))
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        self.assertIn("HTTP 503", event.last_error)
+        self.assertEqual(webhooks.deliver_due(self.client_returning(200)), (0, 0))  # not due yet
+
+        self.make_due()
+        webhooks.deliver_due(self.client_returning(503))
+        self.assertEqual(WebhookEvent.objects.filter(state=WebhookEvent.FAILED).count(), 2)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        for _ in range(3):
+            WebhookEvent.objects.update(state=WebhookEvent.PENDING, attempts=0)
+            self.make_due()
+            webhooks.deliver_due(self.client_returning(500))
+        self.endpoint.refresh_from_db()
+        self.assertEqual(self.endpoint.consecutive_failures, 3)
+        self.assertGreater(self.endpoint.disabled_until, timezone.now())
+
+        WebhookEvent.objects.update(state=WebhookEvent.PENDING, attempts=0)
+        self.make_due()
+        self.requests.clear()
+        self.assertEqual(webhooks.deliver_due(self.client_returning(200)), (0, 0))
+        self.assertEqual(self.requests, [])
+
+        WebhookEndpoint.objects.filter(pk=self.endpoint.pk).update(disabled_until=timezone.now())
+        self.assertEqual(webhooks.deliver_due(self.client_returning(200)), (2, 0))  # half-open: a success closes it
+        self.endpoint.refresh_from_db()
+        self.assertEqual((self.endpoint.consecutive_failures, self.endpoint.disabled_until), (0, None))
+
+
+# ----------------------
+# ARCHIVE
+# ----------------------
+class ArchiveTests(TestCase):
+    def setUp(self):
+        storage_dir, cache_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, storage_dir)
+        self.addCleanup(shutil.rmtree, cache_dir)
+        overrides = override_settings(
+            STORAGES={
+                **settings.STORAGES,
+                "archive": {
+                    "BACKEND": "django.core.files.storage.FileSystemStorage",
+                    "OPTIONS": {"location": storage_dir},
+                },
+            },
+            ARCHIVE_CACHE_DIR=cache_dir,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch.object(archive, "_index", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache_dir = cache_dir
+
+        old = timezone.now() - timedelta(days=200)
+        self.finished = [make_courier(status=status) for status in ("Delivered", "Returned")]
+        self.recent = make_courier(status="Delivered")
+        self.open = make_courier(status="In Transit")
+        Courier.objects.exclude(pk=self.recent.pk).update(updated_at=old)
+
+    def test_archives_finished_shipments_and_finds_them_again(self):
+        call_command("archive_shipments", days=180, segment_size=1, stdout=StringIO())
+
+        remaining = set(Courier.objects.values_list("pk", flat=True))
+        self.assertEqual(remaining, {self.recent.pk, self.open.pk})
+        self.assertFalse(CourierTrackingHistory.objects.filter(courier_id__in=[c.pk for c in self.finished]).exists())
+
+        shutil.rmtree(self.cache_dir)  # another dyno: segments come back from the storage
+        for courier in self.finished:
+            found = archive.find_archived(courier.tracking_number)
+            self.assertEqual((found.courier.pk, found.courier.status), (courier.pk, courier.status))
+            self.assertEqual([entry.description for entry in found.history], ["Courier created"])
+        self.assertIsNone(archive.find_archived(self.open.tracking_number))
+
+        response = self.client.get(reverse("tracking"), {"tracking_number": self.finished[0].tracking_number})
+        self.assertContains(response, self.finished[0].tracking_number)
+        self.assertNotContains(response, "No Package Available")
+
+    def test_refuses_to_archive_without_durable_storage(self):
+        with override_settings(STORAGES={k: v for k, v in settings.STORAGES.items() if k != "archive"}):
+            with self.assertRaises(CommandError):
+                call_command("archive_shipments", days=180, stdout=StringIO())
+        self.assertEqual(Courier.objects.count(), 4)
+
+
+# ----------------------
+# SCAN INGESTION
+# ----------------------
+class ScanIngestTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user("partner@example.com", "pw")
+        WebhookEndpoint.objects.create(account=self.user, url="https://partner.example.com/hook")
+        self.courier = make_courier(user=self.user, status="Order Placed")
+        self.scanner = ScannerKey.objects.create(name="Dock 4")
+
+    def batch(self, *scans):
+        return [json.dumps(scan) for scan in scans]
+
+    def rollup_events(self):
+        return sum(DailyRollup.objects.values_list("events", flat=True))
+
+    def test_redelivered_batch_is_applied_once(self):
+        now = timezone.now()
+        lines = self.batch(
+            {"event_id": "dock4-1", "tracking_number": self.courier.tracking_number, "status": "In Transit",
+             "country": "US", "city": "Miami", "timestamp": (now + timedelta(hours=1)).isoformat()},
+            {"tracking_number": self.courier.tracking_number, "status": "Out for Delivery",
+             "country": "GB", "city": "London", "timestamp": (now + timedelta(hours=2)).isoformat()},
+        )
+        events, rollups = WebhookEvent.objects.count(), self.rollup_events()
+
+        first = ingest(lines, self.scanner)
+        self.assertEqual((first["accepted"], first["duplicates"]), (2, 0))
+        self.assertEqual(WebhookEvent.objects.count(), events + 2)
+        self.assertEqual(self.rollup_events(), rollups + 2)
+
+        again = ingest(lines, self.scanner)
+        self.assertEqual((again["accepted"], again["duplicates"], again["couriers_updated"]), (0, 2, 0))
+        self.assertEqual(WebhookEvent.objects.count(), events + 2)
+        self.assertEqual(self.rollup_events(), rollups + 2)
+        self.courier.refresh_from_db()
+        self.assertEqual(self.courier.status, "Out for Delivery")
+
+    def test_tracking_numbers_match_like_the_tracking_page(self):
+        typed = " " + self.courier.tracking_number.lower().replace("-", " ") + " "
+        result = ingest(self.batch({"event_id": "drv-7", "tracking_number": typed, "status": "In Transit"}), self.scanner)
+        self.assertEqual(result["accepted"], 1)
+        self.assertEqual(result["rejected"], [])
+        self.assertTrue(self.courier.tracking_history.filter(idempotency_key=f"{self.scanner.pk}:drv-7").exists())
+
+    def test_unknown_tracking_number_is_rejected(self):
+        result = ingest(self.batch({"tracking_number": "CTR-ZZZZZZ", "status": "In Transit"}), self.scanner)
+        self.assertEqual(result["accepted"], 0)
+        self.assertIn("unknown tracking number", result["rejected"][0]["error"])
+
+    def test_event_ids_are_scoped_to_the_scanner(self):
+        other = ScannerKey.objects.create(name="Van 12")
+        scan = {"event_id": "1", "tracking_number": self.courier.tracking_number, "status": "In Transit"}
+        self.assertEqual(ingest(self.batch(scan), self.scanner)["accepted"], 1)
+        self.assertEqual(ingest(self.batch(scan), other)["accepted"], 1)
+        self.assertEqual(ingest(self.batch(scan), other)["duplicates"], 1)
+        self.assertEqual(
+            set(self.courier.tracking_history.exclude(idempotency_key=None).values_list("idempotency_key", flat=True)),
+            {f"{self.scanner.pk}:1", f"{other.pk}:1"},
+        )
+
+    @override_settings(SCAN_INGEST_MAX_LINE_BYTES=200)
+    def test_view_rejects_long_lines_and_skips_blank_ones(self):
+        scan = json.dumps({"tracking_number": self.courier.tracking_number, "status": "In Transit"})
+        body = "\n".join(["", scan, "", json.dumps({"description": "x" * 1000}), "   ", "{}", ""])
+        response = self.client.post(
+            reverse("scan_ingest"), body, content_type="application/x-ndjson",
+            HTTP_AUTHORIZATION=f"Bearer {self.scanner.key}",
+        )
+        result = response.json()
+        self.assertEqual(result["accepted"], 1)
+        self.assertEqual(
+            [(r["line"], r["error"]) for r in result["rejected"]],
+            [(2, "line longer than 200 bytes"), (3, "tracking_number is required")],
+        )
+        self.scanner.refresh_from_db()
+        self.assertIsNotNone(self.scanner.last_used_at)
+
+    def test_view_requires_a_scanner_key(self):
+        response = self.client.post(reverse("scan_ingest"), "{}", content_type="application/x-ndjson")
+        self.assertEqual(response.status_code, 401)
+
+
+# ----------------------
+# TRACKING NUMBERS
+# ----------------------
+class TrackingKeyTests(SimpleTestCase):
+    def test_canonical_folds_what_customers_get_wrong(self):
+        for typed in ("CTR-1TAP20", "ctr 1tap2o", " ctr-ltap2O ", "1TAP20", "CTRITAP20"):
+            with self.subTest(typed=typed):
+                self.assertEqual(canonical(typed), "CTR1TAP20")
+
+    def test_other_input_is_left_alone(self):
+        self.assertEqual(canonical("ABC-12"), "ABC12")
+        self.assertEqual(normalize(" ctr 1tap2t"), "CTR-1TAP2T")
+        self.assertEqual(normalize("abc-12"), "ABC-12")
+
+    def test_suggestions_are_one_edit_away(self):
+        edits = one_edit_away("CTR1TAP20")
+        self.assertIn("CTRT1AP20", edits)  # swapped
+        self.assertIn("CTR1TAP2X", edits)  # wrong character
+        self.assertNotIn("CTR1TAP20", edits)
+        self.assertTrue(all(len(edit) == len("CTR1TAP20") for edit in edits))
+
+
+# ----------------------
+# ROLLUPS
+# ----------------------
+class RollupTests(TestCase):
+    def totals(self):
+        rows = DailyRollup.objects.filter(status="Delivered")
+        return {measure: sum(row[measure] for row in rows.values(*rollups.MEASURES)) for measure in rollups.MEASURES}
+
+    def test_repeat_deliveries_count_once(self):
+        courier = make_courier(status="Out for Delivery", estimated_delivery_date=date(2099, 1, 1))
+        now = timezone.now()
+        courier.tracking_history.create(status="Delivered", timestamp=now)
+        courier.tracking_history.create(status="Delivered", timestamp=now + timedelta(minutes=5))
+        ingest([json.dumps({
+            "tracking_number": courier.tracking_number, "status": "Delivered",
+            "timestamp": (now + timedelta(minutes=10)).isoformat(),
+        })], ScannerKey.objects.create(name="Dock 4"))
+        expected = {"events": 3, "delivered_on_time": 1, "delivered_late": 0}
+        self.assertEqual(self.totals(), expected)
+
+        today = timezone.localdate(now)
+        rollups.rebuild(today - timedelta(days=1), today + timedelta(days=1))
+        self.assertEqual(self.totals(), expected)
+
+
+# ----------------------
+# PORTAL PAGINATION
+# ----------------------
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create_user("owner@example.com", "pw")
+        base = timezone.now()
+        # pairs share a created_at, so pages have to break ties on id
+        self.couriers = [
+            make_courier(user=self.user, created_at=base - timedelta(hours=i // 2)) for i in range(7)
+        ]
+        self.newest_first = sorted(self.couriers, key=lambda courier: (courier.created_at, courier.id), reverse=True)
+
+    def ids(self, rows):
+        return [courier.id for courier in rows]
+
+    def test_walks_older_and_back_without_gaps_or_repeats(self):
+        pages, after = [], None
+        while True:
+            rows, newer, older = portal.shipments_page(self.user.id, after=after, size=3)
+            self.assertEqual(newer is None, after is None)
+            pages.append(self.ids(rows))
+            if older is None:
+                break
+            after = portal.decode_cursor(older)
+        self.assertEqual([id for page in pages for id in page], self.ids(self.newest_first))
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+
+        rows, newer, older = portal.shipments_page(self.user.id, before=portal.decode_cursor(
+            portal.encode_cursor(self.newest_first[6])
+        ), size=3)
+        self.assertEqual(self.ids(rows), pages[1])
+        rows, newer, _older = portal.shipments_page(self.user.id, before=portal.decode_cursor(newer), size=3)
+        self.assertEqual(self.ids(rows), pages[0])
+        self.assertIsNone(newer)
+
+    def test_exact_page_size_has_no_older_page(self):
+        rows, _newer, older = portal.shipments_page(self.user.id, size=7)
+        self.assertEqual(len(rows), 7)
+        self.assertIsNone(older)
+
+    def test_bad_cursors_are_ignored(self):
+        for token in ("", "not-base64!", "bm9waXBl"):
+            self.assertIsNone(portal.decode_cursor(token))
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "test_portal_cache"},
+})
+class SharedStatusCountsTests(TestCase):
+    def setUp(self):
+        call_command("createcachetable", verbosity=0)
+        self.user = Account.objects.create_user("owner@example.com", "pw")
+        make_courier(user=self.user)
+        # a separate backend instance stands in for another worker process
+        self.other_worker = caches.create_connection("default")
+
+    def test_invalidation_reaches_other_workers(self):
+        key = portal.counts_key(self.user.id)
+        self.assertEqual(portal.status_counts(self.user.id)["all"], 1)
+        self.assertEqual(self.other_worker.get(key)["all"], 1)
+
+        make_courier(user=self.user)  # the save signal drops the counts for every worker
+        self.assertIsNone(self.other_worker.get(key))
+        self.assertEqual(portal.status_counts(self.user.id)["all"], 2)
+
+
+# ----------------------
+# ROUTE MAPS
+# ----------------------
+class OutlinesTestCase(TestCase):
+    """Points route_map at a temporary outlines file (absent until ``build_outlines``)."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, "country_outlines.json")
+        for patcher in (
+            mock.patch.multiple(route_map, OUTLINES_PATH=self.path, _outlines=None),
+            mock.patch.dict(route_map._rendered, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def build_outlines(self, *squares):
+        """Outlines file with one square ``(code, min lon, min lat, size)`` country each."""
+        features = []
+        for code, lon, lat, size in squares:
+            ring = [[lon, lat], [lon + size, lat], [lon + size, lat + size], [lon, lat + size], [lon, lat]]
+            features.append({
+                "properties": {"ISO_A2": "-99", "ISO_A2_EH": code},
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+            })
+        source = os.path.join(self.tmp, "countries.geojson")
+        with open(source, "w") as fh:
+            json.dump({"features": features}, fh)
+        call_command("build_country_outlines", source, output=self.path, stdout=StringIO())
+
+
+class CountryOutlinesTests(OutlinesTestCase):
+    def test_missing_outlines_fail_loudly(self):
+        self.assertEqual([issue.id for issue in route_map.check_outlines(None)], ["accounts.W001"])
+        with self.assertRaises(ImproperlyConfigured):
+            route_map.get_outlines()
+
+    def test_built_outlines_load(self):
+        self.build_outlines(("NG", 0, 0, 10))
+        self.assertEqual(route_map.check_outlines(None), [])
+        (lons, lats, bounds), = route_map.get_outlines()
+        self.assertEqual(bounds, (0, 0, 10, 10))
+
+
+@mock.patch("accounts.geocoder._geocoder", None)
+class RouteMapViewTests(OutlinesTestCase):
+    def setUp(self):
+        super().setUp()
+        for code, city, lat, lon in (("US", "Miami", 25.77, -80.19), ("NG", "Lagos", 6.45, 3.39),
+                                     ("GB", "London", 51.51, -0.13)):
+            country = Country.objects.create(name=code, code2=code)
+            City.objects.create(country=country, name=city, latitude=lat, longitude=lon, population=1_000_000)
+        self.courier = make_courier(current_location_country="NG", current_location_city="Lagos")
+        self.params = {
+            "from_country": "US", "from_city": "Miami", "at_country": "NG", "at_city": "Lagos",
+            "to_country": "GB", "to_city": "London",
+        }
+
+    def test_renders_svg(self):
+        self.build_outlines(("NG", 2.7, 4.3, 10), ("GB", -8, 50, 9))
+        response = self.client.get(reverse("route_map"), self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/svg+xml")
+        svg = response.content.decode()
+        self.assertTrue(svg.startswith('<svg xmlns="http://www.w3.org/2000/svg"') and svg.endswith("</svg>"))
+        self.assertEqual(svg.count("<circle"), 3)
+        self.assertIn('fill="#f7f5ef"', svg)  # land drawn from the outlines
+        self.assertIn(">Lagos</text>", svg)
+        self.assertIn("public", response["Cache-Control"])
+
+        with mock.patch.object(route_map, "render_route") as render_route:
+            again = self.client.get(reverse("route_map"), self.params, HTTP_IF_NONE_MATCH=response["ETag"])
+        render_route.assert_not_called()
+        self.assertEqual(again.status_code, 304)
+
+    def test_tracking_page_links_the_map(self):
+        self.build_outlines(("NG", 2.7, 4.3, 10))
+        response = self.client.get(reverse("tracking"), {"tracking_number": self.courier.tracking_number})
+        self.assertContains(response, reverse("route_map") + "?from_country=US")
+        self.assertNotContains(response, "google.com/maps")
+
+    def test_embed_fallback_without_outlines(self):
+        response = self.client.get(reverse("tracking"), {"tracking_number": self.courier.tracking_number})
+        self.assertContains(response, "https://www.google.com/maps?q=Lagos,NG&output=embed")
+        self.assertNotContains(response, reverse("route_map"))
+        self.assertEqual(self.client.get(reverse("route_map"), self.params).status_code, 404)
+
+
+# ----------------------
+# ETA
+# ----------------------
+class EtaTests(TestCase):
+    def table(self, status, p10, p50, p90):
+        return EtaTable([("US", "", "GB", "", status, 100, p10, p50, p90)])
+
+    def test_window_is_measured_from_the_first_in_transit_scan(self):
+        courier = make_courier(status="Order Placed")
+        in_transit = courier.created_at + timedelta(days=2)
+        courier.tracking_history.create(status="In Transit", timestamp=in_transit)
+        courier.status = "Out for Delivery"
+        courier.save()
+        courier.save()  # later edits move updated_at, not the anchor
+
+        summary = TrackingSummary.objects.get(pk=courier.pk)
+        self.assertEqual(summary.in_transit_at, in_transit)
+        eta = self.table("In Transit", 24, 72, 120).predict(summary, now=in_transit)
+        self.assertEqual(eta["likely"], timezone.localdate(in_transit + timedelta(hours=72)))
+        self.assertEqual(eta["level"], "country")
+
+    def test_falls_back_to_created_at_before_transit(self):
+        courier = make_courier(status="Order Placed")
+        summary = TrackingSummary.objects.get(pk=courier.pk)
+        self.assertIsNone(summary.in_transit_at)
+        eta = self.table("Order Placed", 24, 96, 200).predict(summary, now=courier.created_at)
+        self.assertEqual(eta["latest"], timezone.localdate(courier.created_at + timedelta(hours=200)))
+        # never a day that has already passed
+        later = courier.created_at + timedelta(days=30)
+        eta = self.table("Order Placed", 24, 96, 200).predict(summary, now=later)
+        self.assertEqual(eta["earliest"], timezone.localdate(later))
+
+
+# ----------------------
+# ETA PERCENTILES
+# ----------------------
+class PercentileTests(SimpleTestCase):
+    def test_percentiles_of_a_histogram(self):
+        histogram = add_samples([], [24.0] * 10 + [48.0] * 80 + [200.0] * 10)
+        p10, p50, p90 = percentiles(histogram)
+        self.assertLess(p10, 48.0)
+        self.assertAlmostEqual(p50, 48.0, delta=48.0 * 0.15)  # within one log-spaced bucket
+        self.assertAlmostEqual(p90, 48.0, delta=48.0 * 0.15)
+        self.assertEqual(sum(histogram), 100)
+
+    def test_histograms_add_up(self):
+        once = add_samples([], [1.5, 30.0, 700.0, 5000.0])
+        self.assertEqual(add_samples(once, [1.5, 30.0, 700.0, 5000.0]), [count * 2 for count in once])
+        self.assertEqual(once[-1], 1)  # past the last edge
+
+    def test_transit_samples_count_from_first_entering_each_status(self):
+        start = timezone.now()
+        events = [
+            ("Order Placed", start),
+            ("In Transit", start + timedelta(hours=10)),
+            ("In Transit", start + timedelta(hours=20)),
+            ("Delivered", start + timedelta(hours=50)),
+            ("Delivered", start + timedelta(hours=60)),
+        ]
+        self.assertEqual(transit_samples(events), [("Order Placed", 50.0), ("In Transit", 40.0)])
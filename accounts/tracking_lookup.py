@@ -0,0 +1,86 @@
+"""
+Forgiving tracking-number lookup.
+
+``canonical`` folds what customers get wrong -- case, spaces and dashes, a
+missing ``CTR`` prefix, O/0 and I/L/1 -- into the key stored (and indexed)
+as ``TrackingSummary.tracking_key``, so ``ctr 1tap2t`` and ``CTR1TAP2T``
+are the same exact lookup.
+
+When even the key misses, ``suggest`` offers numbers one edit away
+(a wrong, missing, extra or swapped character): the candidate keys for a
+6-character number are generated (a couple of hundred) and looked up in one
+query on the ``tracking_key`` index, so the cost doesn't grow with the
+number of shipments and a new shipment is suggested as soon as it exists.
+"""
+import re
+import string
+
+PREFIX = "CTR"
+BODY_LENGTH = 6
+AMBIGUOUS = str.maketrans({"O": "0", "I": "1", "L": "1"})
+SEPARATORS = re.compile(r"[^0-9A-Z]")
+
+# what can appear in a canonical body once O/I/L are folded away
+KEY_ALPHABET = "".join(sorted(set(string.ascii_uppercase + string.digits) - set("OIL")))
+
+
+def canonical(raw):
+    """Lookup key for user input or a stored number: ``" ctr-1tap2o"`` -> ``"CTR1TAP20"``."""
+    text = SEPARATORS.sub("", raw.upper())
+    if text.startswith(PREFIX):
+        body = text[len(PREFIX):]
+    elif len(text) == BODY_LENGTH:
+        body = text  # typed without the prefix
+    else:
+        return text.translate(AMBIGUOUS)
+    return PREFIX + body.translate(AMBIGUOUS)
+
+
+def normalize(raw):
+    """Display form without folding: ``" ctr 1tap2t"`` -> ``"CTR-1TAP2T"``."""
+    text = SEPARATORS.sub("", raw.upper())
+    if len(text) == BODY_LENGTH:
+        text = PREFIX + text
+    if text.startswith(PREFIX) and len(text) == len(PREFIX) + BODY_LENGTH:
+        return f"{PREFIX}-{text[len(PREFIX):]}"
+    return raw.strip().upper()
+
+
+def one_edit_away(key):
+    """Keys one substitution, insertion, deletion or transposition from ``key``'s body."""
+    if key.startswith(PREFIX):
+        body = key[len(PREFIX):]
+    elif abs(len(key) - BODY_LENGTH) == 1:
+        body = key  # no prefix and a character short or over
+    else:
+        return set()
+    splits = [(body[:i], body[i:]) for i in range(len(body) + 1)]
+    edits = set()
+    for left, right in splits:
+        if right:
+            edits.add(left + right[1:])
+            for char in KEY_ALPHABET:
+                edits.add(left + char + right[1:])
+        if len(right) > 1:
+            edits.add(left + right[1] + right[0] + right[2:])
+        for char in KEY_ALPHABET:
+            edits.add(left + char + right)
+    edits.discard(body)
+    return {PREFIX + edit for edit in edits if len(edit) == BODY_LENGTH}
+
+
+def suggestions(raw):
+    """``TrackingSummary`` rows one edit away from ``raw``: an IN over the indexed ``tracking_key``."""
+    from .models import TrackingSummary
+
+    candidates = one_edit_away(canonical(raw))
+    return TrackingSummary.objects.filter(tracking_key__in=sorted(candidates)).order_by("tracking_key")
+
+
+def suggest(raw, limit=5):
+    """Up to ``limit`` tracking numbers one edit away from ``raw`` (no query when there are no candidates)."""
+    return list(suggestions(raw).values_list("tracking_number", flat=True)[:limit])
+
+
+async def asuggest(raw, limit=5):
+    return [number async for number in suggestions(raw).values_list("tracking_number", flat=True)[:limit]]
@@ -15,6 +15,7 @@ urlpatterns = [
     path('about_us/',views.about_us,name='about_us'),
     path('services/',views.services,name='services'),
     path('tracking/',views.tracking,name='tracking'),
+    path('tracking/map.svg',views.route_map,name='route_map'),
     path('contact/',views.contact,name='contact'),
     re_path(r'^media/(?P<path>.*)$', serve,{'document_root': settings.MEDIA_ROOT}),
     re_path(r'^static/(?P<path>.*)$', serve,{'document_root': settings.STATIC_ROOT}),
@@ -1,40 +1,96 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
 # from accounts.models import
-from .models import Courier
+from .models import TrackingSummary
+from .archive import afind_archived
+from .eta import apredict
+from .geocoder import aget_geocoder
+from .route_map import LEGS, NOT_CACHED, cached_route_map, get_route_map, has_outlines, map_query
+from .query_inspector import declare_query_budget
+from .tracking_lookup import asuggest, canonical, normalize
 
 
 # home pages
+# (async so they run on the event loop when served through net_courier.asgi)
 
-def home_view(request):
+async def home_view(request):
     return render(request,'index.html')
 
-def about_us(request):
+async def about_us(request):
     return render(request,'about-us-2.html')
 
-def services(request):
+async def services(request):
     return render(request,'services-2.html')
 
-def contact(request):
+async def contact(request):
     return render(request,'contact-us.html')
 
 
 
 
-def tracking(request):
+@declare_query_budget(2)  # summary lookup + did-you-mean query on a miss; table loads are unbudgeted
+async def tracking(request):
     tracking_number = request.GET.get("tracking_number", '').strip()
 
     if tracking_number:
-        try:
-            courier = Courier.objects.get(tracking_number=tracking_number)
-            return render(request, "tracking_page.html", {"courier": courier})
-        except Courier.DoesNotExist:
+        number = normalize(tracking_number)
+        # matched on the canonical key, so case, dashes, a missing prefix and O/0, I/1 mix-ups
+        # still hit; folding can (rarely) make two numbers share a key
+        matches = [
+            summary async for summary in TrackingSummary.objects.filter(tracking_key=canonical(tracking_number))[:5]
+        ]
+        courier = next((summary for summary in matches if summary.tracking_number == number), None)
+        if courier is None and len(matches) == 1:
+            courier = matches[0]
+        if courier is None:
+            archived = await afind_archived(number)
+            courier = archived.courier if archived is not None else None
+
+        if courier is not None:
+            geocoder = await aget_geocoder()
             return render(request, "tracking_page.html", {
-                "error": f"Tracking number '{tracking_number}' was not found."
+                "courier": courier,
+                "route": geocoder.route(courier),
+                # without the outlines file the page keeps the Google Maps embed
+                "route_map": map_query(courier, geocoder) if has_outlines() else "",
+                "map_embed_fallback": not has_outlines(),
+                "eta": await apredict(courier),
             })
+        return render(request, "tracking_page.html", {
+            "error": f"Tracking number '{tracking_number}' was not found.",
+            "suggestions": [summary.tracking_number for summary in matches] or await asuggest(tracking_number),
+        })
 
     return render(request, "tracking_page.html")
 
 
-
-
-
+async def route_map(request):
+    """SVG map for ``?from_city=&from_country=&at_city=&at_country=&to_city=&to_country=``."""
+    locations = {}
+    for leg in LEGS:
+        country = request.GET.get(f"{leg}_country", "").strip()
+        city = request.GET.get(f"{leg}_city", "").strip()
+        if len(country) == 2 and len(city) <= 100:
+            locations[leg] = (city, country)
+
+    if not locations or not has_outlines():
+        return HttpResponse(status=404)
+    await aget_geocoder()
+    rendered = cached_route_map(locations)
+    if rendered is NOT_CACHED:
+        # drawing is CPU work off the event loop; the geocoder is loaded, so no DB access
+        rendered = await sync_to_async(get_route_map, thread_sensitive=False)(locations)
+    if rendered is None:
+        return HttpResponse(status=404)
+    svg, etag = rendered
+
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(svg, content_type="image/svg+xml")
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=settings.ROUTE_MAP_MAX_AGE)
+    return response
@@ -0,0 +1,199 @@
+"""
+Partner webhooks.
+
+Writing a CourierTrackingHistory row for a courier owned by an account with
+webhook endpoints only inserts ``WebhookEvent`` outbox rows (see signals.py);
+nothing outbound happens in the request. ``manage.py deliver_webhooks``
+drains the outbox: due events are claimed, grouped per endpoint and POSTed
+as one JSON batch over a shared keep-alive ``httpx.Client``.
+
+Every request carries ``X-Netexpress-Signature: t=<unix time>,v1=<hex>``,
+the HMAC-SHA256 of ``"<t>.<body>"`` under the endpoint secret.
+
+A failed batch is retried with exponential backoff (WEBHOOK_BACKOFF_BASE
+doubling up to WEBHOOK_BACKOFF_MAX) until WEBHOOK_MAX_ATTEMPTS. After
+WEBHOOK_FAILURE_THRESHOLD failures in a row the endpoint's circuit opens for
+WEBHOOK_COOLDOWN seconds; once it elapses one batch is tried, and a success
+closes the circuit again.
+"""
+import hashlib
+import hmac
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import httpx
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import WebhookEndpoint, WebhookEvent
+
+SIGNATURE_HEADER = "X-Netexpress-Signature"
+
+# how long a claimed batch is hidden from other workers
+CLAIM_SECONDS = 120
+
+
+def event_payload(history):
+    return {
+        "type": "tracking.updated",
+        "tracking_number": history.courier.tracking_number,
+        "status": history.status,
+        "location_country": str(history.location_country or ""),
+        "location_city": history.location_city or "",
+        "description": history.description,
+        "timestamp": history.timestamp.isoformat(),
+    }
+
+
+def enqueue(history):
+    """Queue ``history`` for every active endpoint of the courier's account."""
+    return enqueue_many([history])
+
+
+def enqueue_many(histories):
+    """``enqueue`` for a batch of history rows (courier loaded), in two queries."""
+    account_ids = {history.courier.user_id for history in histories} - {None}
+    if not account_ids:
+        return 0
+    endpoints = defaultdict(list)
+    for endpoint_id, account_id in WebhookEndpoint.objects.filter(
+        account_id__in=account_ids, is_active=True
+    ).values_list("id", "account_id"):
+        endpoints[account_id].append(endpoint_id)
+    events = [
+        WebhookEvent(endpoint_id=endpoint_id, payload=event_payload(history))
+        for history in histories
+        for endpoint_id in endpoints.get(history.courier.user_id, ())
+    ]
+    return len(WebhookEvent.objects.bulk_create(events, batch_size=1000))
+
+
+def sign(secret, body, timestamp=None):
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    digest = hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+def verify(secret, body, header, tolerance=300):
+    """Check a signature header the way a partner should (used by ``webhook_stub``)."""
+    try:
+        parts = dict(part.split("=", 1) for part in header.split(","))
+        timestamp = int(parts["t"])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, body, timestamp), header)
+
+
+def backoff(attempts):
+    """Seconds before retry number ``attempts`` (1-based), with +-20% jitter."""
+    delay = min(settings.WEBHOOK_BACKOFF_BASE * 2 ** (attempts - 1), settings.WEBHOOK_BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def make_client():
+    return httpx.Client(
+        timeout=settings.WEBHOOK_TIMEOUT,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60),
+        headers={"User-Agent": "NetExpress-Webhooks/1.0"},
+    )
+
+
+# ----------------------
+# WORKER
+# ----------------------
+def claim_due(now, limit):
+    """
+    Claim up to ``limit`` due events on endpoints whose circuit is closed
+    (or whose cooldown has elapsed) by pushing their next_attempt_at out.
+    """
+    with transaction.atomic():
+        due = (
+            WebhookEvent.objects
+            .filter(state=WebhookEvent.PENDING, next_attempt_at__lte=now, endpoint__is_active=True)
+            .filter(Q(endpoint__disabled_until__isnull=True) | Q(endpoint__disabled_until__lte=now))
+            .order_by("next_attempt_at", "id")
+        )
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True, of=("self",))
+        events = list(due.select_related("endpoint")[:limit])
+        WebhookEvent.objects.filter(id__in=[event.id for event in events]).update(
+            next_attempt_at=now + timedelta(seconds=CLAIM_SECONDS)
+        )
+    batches = defaultdict(list)
+    for event in events:
+        batches[event.endpoint].append(event)
+    return batches
+
+
+def post_batch(client, endpoint, events):
+    """POST one batch; returns ``None`` on a 2xx, else an error message."""
+    body = json.dumps(
+        {"events": [{"id": event.id, **event.payload} for event in events]},
+        cls=DjangoJSONEncoder,
+    ).encode()
+    try:
+        response = client.post(
+            endpoint.url,
+            content=body,
+            headers={"Content-Type": "application/json", SIGNATURE_HEADER: sign(endpoint.secret, body)},
+        )
+    except httpx.HTTPError as exc:
+        return f"{type(exc).__name__}: {exc}"
+    if response.is_success:
+        return None
+    return f"HTTP {response.status_code}: {response.text[:200]}"
+
+
+def record_success(endpoint, events, now):
+    WebhookEvent.objects.filter(id__in=[event.id for event in events]).update(
+        state=WebhookEvent.DELIVERED, delivered_at=now, attempts=F("attempts") + 1, last_error="",
+    )
+    if endpoint.consecutive_failures or endpoint.disabled_until:
+        WebhookEndpoint.objects.filter(pk=endpoint.pk).update(consecutive_failures=0, disabled_until=None)
+
+
+def record_failure(endpoint, events, now, error):
+    for event in events:
+        event.attempts += 1
+        event.last_error = error
+        if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            event.state = WebhookEvent.FAILED
+        else:
+            event.next_attempt_at = now + timedelta(seconds=backoff(event.attempts))
+    WebhookEvent.objects.bulk_update(events, ["attempts", "last_error", "state", "next_attempt_at"])
+
+    failures = endpoint.consecutive_failures + 1
+    disabled_until = endpoint.disabled_until
+    if failures >= settings.WEBHOOK_FAILURE_THRESHOLD:
+        disabled_until = now + timedelta(seconds=settings.WEBHOOK_COOLDOWN)
+    WebhookEndpoint.objects.filter(pk=endpoint.pk).update(
+        consecutive_failures=failures, disabled_until=disabled_until
+    )
+
+
+def deliver_due(client, limit=None):
+    """One pass over the outbox; returns ``(delivered, failed)`` event counts."""
+    now = timezone.now()
+    limit = limit or settings.WEBHOOK_BATCH_SIZE * 10
+    delivered = failed = 0
+    for endpoint, events in claim_due(now, limit).items():
+        for start in range(0, len(events), settings.WEBHOOK_BATCH_SIZE):
+            batch = events[start:start + settings.WEBHOOK_BATCH_SIZE]
+            error = post_batch(client, endpoint, batch)
+            if error is None:
+                record_success(endpoint, batch, timezone.now())
+                delivered += len(batch)
+                endpoint.consecutive_failures, endpoint.disabled_until = 0, None
+            else:
+                record_failure(endpoint, events[start:], timezone.now(), error)
+                failed += len(events) - start
+                break  # the rest of this endpoint's events wait for the retry too
+    return delivered, failed
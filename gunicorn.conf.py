@@ -0,0 +1,27 @@
+# Picked up automatically by `gunicorn` from the project root.
+import gc
+
+# Import Django and the whole app once in the master so forked workers share
+# those pages copy-on-write instead of each importing everything again.
+preload_app = True
+
+
+def when_ready(server):
+    from accounts.page_cache import warm_page_cache
+
+    # warm before forking so every worker inherits the rendered pages
+    warm_page_cache()
+    # Move everything loaded so far into the permanent generation; otherwise
+    # the first collection in each worker writes to (and so copies) the
+    # shared pages.
+    gc.collect()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Render the static marketing pages once per worker so the first
+    # visitors get cache hits instead of a full template render (a no-op
+    # when the pages were inherited from the master).
+    from accounts.page_cache import warm_page_cache
+
+    warm_page_cache()
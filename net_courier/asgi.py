@@ -3,6 +3,11 @@ ASGI config for net_courier project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+This is the production entry point (see Procfile), served by gunicorn with
+uvicorn workers:
+
+    gunicorn net_courier.asgi:application -k uvicorn_worker.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
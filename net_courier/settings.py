@@ -11,11 +11,15 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import copy
 import os
+import sys
 import environ
 
 
 
+from django.conf import global_settings
+from django.core.exceptions import ImproperlyConfigured
 from django.templatetags.static import static
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
@@ -33,7 +37,7 @@ environ.Env.read_env(os.path.join(BASE_DIR,'file.env'))
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-pt*973+w2)4(l&j@z09dqlf#)z4-4%q(@r!uk$)+tqm7qvp&&9'
+SECRET_KEY = env('SECRET_KEY', default='django-insecure-pt*973+w2)4(l&j@z09dqlf#)z4-4%q(@r!uk$)+tqm7qvp&&9')
 
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = False
@@ -45,7 +49,9 @@ ALLOWED_HOSTS = ["netexpressc.com"]
 
 # # Application definition
 AUTH_USER_MODEL = 'accounts.Account'
-# LOGIN_URL = '/Accounts/login/'
+LOGIN_URL = 'login'
+LOGIN_REDIRECT_URL = 'my_shipments'
+LOGOUT_REDIRECT_URL = 'home'
 
 
 # Application definition
@@ -81,20 +87,111 @@ SITE_ID = 1
 
 
 MIDDLEWARE = [
+    'accounts.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'accounts.page_cache.PageCacheMiddleware',
+    'accounts.public_fastpath.AnonymousFastPathMiddleware',
+    'accounts.public_fastpath.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'accounts.public_fastpath.AuthenticationMiddleware',
+    'accounts.public_fastpath.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Archive segments written by `manage.py archive_shipments` (accounts.archive);
+# /tracking/ falls back to them for numbers no longer in the database. They
+# replace the deleted rows, so they need durable storage (a dyno's disk is
+# wiped on restart): ARCHIVE_STORAGE_BACKEND names a Django storage backend,
+# e.g. storages.backends.s3.S3Storage, with ARCHIVE_STORAGE_OPTIONS as JSON.
+# Unset, the command refuses to archive. ARCHIVE_CACHE_DIR is a local,
+# disposable copy of the segments lookups have read.
+ARCHIVE_STORAGE_BACKEND = env('ARCHIVE_STORAGE_BACKEND', default='')
+ARCHIVE_STORAGE_OPTIONS = env.json('ARCHIVE_STORAGE_OPTIONS', default={})
+ARCHIVE_CACHE_DIR = env('ARCHIVE_CACHE_DIR', default=os.path.join(BASE_DIR, 'archive_cache'))
+ARCHIVE_INDEX_TTL = env.int('ARCHIVE_INDEX_TTL', default=300)
+
+STORAGES = copy.deepcopy(global_settings.STORAGES)
+if ARCHIVE_STORAGE_BACKEND:
+    STORAGES['archive'] = {'BACKEND': ARCHIVE_STORAGE_BACKEND, 'OPTIONS': ARCHIVE_STORAGE_OPTIONS}
+
+# Partner webhooks (accounts.webhooks), drained by `manage.py deliver_webhooks`.
+WEBHOOK_BATCH_SIZE = env.int('WEBHOOK_BATCH_SIZE', default=100)          # events per POST
+WEBHOOK_TIMEOUT = env.float('WEBHOOK_TIMEOUT', default=10.0)
+WEBHOOK_MAX_ATTEMPTS = env.int('WEBHOOK_MAX_ATTEMPTS', default=12)
+WEBHOOK_BACKOFF_BASE = env.int('WEBHOOK_BACKOFF_BASE', default=30)       # seconds, doubles per attempt
+WEBHOOK_BACKOFF_MAX = env.int('WEBHOOK_BACKOFF_MAX', default=6 * 3600)
+WEBHOOK_FAILURE_THRESHOLD = env.int('WEBHOOK_FAILURE_THRESHOLD', default=5)  # failures that open the circuit
+WEBHOOK_COOLDOWN = env.int('WEBHOOK_COOLDOWN', default=600)
+
+# Most lines accepted in one POST to /api/scans/ (accounts.scan_ingest), and
+# the longest line in bytes; longer lines are rejected without being buffered.
+SCAN_INGEST_MAX_EVENTS = env.int('SCAN_INGEST_MAX_EVENTS', default=20000)
+SCAN_INGEST_MAX_LINE_BYTES = env.int('SCAN_INGEST_MAX_LINE_BYTES', default=4096)
+
+# Pricing (accounts.rates): set RATE_CARD to replace DEFAULT_RATE_CARD.
+QUOTE_MAX_SHIPMENTS = env.int('QUOTE_MAX_SHIPMENTS', default=1000)
+
+# Tracking route maps (accounts.route_map): rendered SVGs kept per process,
+# and how long browsers/CDN may reuse one.
+ROUTE_MAP_CACHE_SIZE = env.int('ROUTE_MAP_CACHE_SIZE', default=2048)
+ROUTE_MAP_MAX_AGE = env.int('ROUTE_MAP_MAX_AGE', default=7 * 24 * 3600)
+
+# Customer portal (accounts.portal): page size and how long per-status counts
+# may be served from cache if no save signal clears them.
+PORTAL_PAGE_SIZE = env.int('PORTAL_PAGE_SIZE', default=25)
+PORTAL_COUNTS_TIMEOUT = env.int('PORTAL_COUNTS_TIMEOUT', default=300)
+
+# Predicted delivery windows (accounts.eta): seconds before the lane table is
+# reloaded, and the deliveries a lane needs before it is trusted.
+ETA_TABLE_TTL = env.int('ETA_TABLE_TTL', default=300)
+ETA_MIN_SAMPLES = env.int('ETA_MIN_SAMPLES', default=20)
+
+# Anonymous GET/HEADs outside these prefixes skip sessions, auth and messages
+# entirely (accounts.public_fastpath) and are marked CDN-cacheable.
+STATEFUL_PATH_PREFIXES = ['/admin/', '/chaining/', '/internal/', '/__debug__/', '/accounts/', '/shipments/']
+PUBLIC_CACHE_MAX_AGE = env.int('PUBLIC_CACHE_MAX_AGE', default=60)
+
+# Staff sessions are kept server-side (revocable) and read through the cache
+# (CACHES below), so a warm session costs no session-table query.
+# SESSION_ENGINE=django.contrib.sessions.backends.signed_cookies drops the
+# table entirely, but then anyone with SECRET_KEY can mint a staff session,
+# so it is refused while SECRET_KEY is still the checked-in development key.
+SESSION_ENGINE = env('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+SESSION_COOKIE_HTTPONLY = True
+
+if SESSION_ENGINE.endswith('.signed_cookies') and SECRET_KEY.startswith('django-insecure-'):
+    raise ImproperlyConfigured('Signed-cookie sessions need SECRET_KEY set in the environment.')
+
+# N+1 / query-budget detector (accounts.query_inspector); logs by default,
+# QUERY_INSPECTOR_RAISE turns findings into errors. Both are on under
+# `manage.py test`, so a view that blows its declared budget fails the suite.
+TESTING = sys.argv[1:2] == ['test']
+QUERY_INSPECTOR = env.bool('QUERY_INSPECTOR', default=DEBUG or TESTING)
+QUERY_INSPECTOR_RAISE = env.bool('QUERY_INSPECTOR_RAISE', default=TESTING)
+if QUERY_INSPECTOR:
+    MIDDLEWARE.insert(1, 'accounts.query_inspector.QueryInspectorMiddleware')
+
+# One cache shared by every worker process: portal status counts (and their
+# invalidation on save), the marketing page cache and cached_db sessions.
+# Point CACHE_URL at Redis in production (redis://host:6379/0). The default
+# keeps entries in the database table that migration 0015 creates, which
+# needs no extra service but costs a query per cache read. Tests use a
+# per-process cache so query budgets count only the views' own queries.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://' if TESTING else 'dbcache://django_cache'),
+}
+
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+    INTERNAL_IPS = ['127.0.0.1', '::1']
+
 ROOT_URLCONF = 'net_courier.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'accounts.metrics.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR,'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -109,6 +206,16 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'net_courier.wsgi.application'
 
+# Bearer token for scraping /internal/metrics/ without a staff login (unset:
+# staff only). METRICS_ALLOWED_IPS optionally narrows where it is accepted
+# from; behind the Heroku router REMOTE_ADDR is the router, not the scraper.
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', default=[])
+
+# Build/deploy identifier; keys the full-page cache so a deploy invalidates it.
+# Falls back to a hash of the cached templates when unset.
+DEPLOY_ID = env("DEPLOY_ID", default=env("HEROKU_SLUG_COMMIT", default=""))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -120,6 +227,13 @@ WSGI_APPLICATION = 'net_courier.wsgi.application'
 #     }
 # }
 
+# Connection pooling uses psycopg_pool (DB_POOL, on by default). With the pool
+# off, connections persist per worker for DB_CONN_MAX_AGE seconds instead.
+# DB_PGBOUNCER=True is for running behind PgBouncer in transaction mode:
+# server-side cursors are disabled since they don't survive across transactions.
+DB_POOL = env.bool('DB_POOL', default=True)
+DB_PGBOUNCER = env.bool('DB_PGBOUNCER', default=False)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -128,9 +242,48 @@ DATABASES = {
         'PASSWORD': env('DB_PASSWORD'),
         'HOST': env('DB_HOST'),
         'PORT': env('DB_PORT'),
+        'CONN_MAX_AGE': 0 if DB_POOL else env.int('DB_CONN_MAX_AGE', default=60),
+        'CONN_HEALTH_CHECKS': True,  # with the pool: check_connection on checkout
+        'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        'OPTIONS': {},
     }
 }
 
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+        'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+        'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),  # max wait for a free connection
+        'max_lifetime': env.float('DB_POOL_MAX_LIFETIME', default=1800.0),  # recycle after 30 min
+        'max_idle': env.float('DB_POOL_MAX_IDLE', default=300.0),
+    }
+
+# Read replicas as host or host:port, same credentials as default. Public read
+# paths go to them (accounts.db_router); a session that writes reads from
+# default for REPLICA_PIN_SECONDS, an unreachable replica is skipped for
+# REPLICA_RETRY_SECONDS.
+DB_REPLICA_HOSTS = env.list('DB_REPLICA_HOSTS', default=[])
+REPLICA_READ_PATHS = env.list('REPLICA_READ_PATHS', default=['/tracking/'])
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=15)
+REPLICA_RETRY_SECONDS = env.int('REPLICA_RETRY_SECONDS', default=30)
+
+for number, replica_host in enumerate(DB_REPLICA_HOSTS, 1):
+    host, port = replica_host.partition(':')[::2]
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': copy.deepcopy(DATABASES['default']['OPTIONS']),  # own pool per replica
+        'TEST': {'MIRROR': 'default'},
+    }
+
+if DB_REPLICA_HOSTS:
+    DATABASE_ROUTERS = ['accounts.db_router.ReplicaRouter']
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('accounts.public_fastpath.AuthenticationMiddleware') + 1,
+        'accounts.db_router.ReplicaRoutingMiddleware',
+    )
+
 
 
 # Password validation
@@ -225,6 +378,8 @@ UNFOLD = {
         "light": lambda request: static("assets/img/logo_dark.png"),
         "dark": lambda request: static("assets/img/logo_light.png"),
     },
+    # KPI widgets on the admin index, read from accounts.DailyRollup
+    "DASHBOARD_CALLBACK": "accounts.dashboard.dashboard_callback",
     "DASHBOARD": {
         "show_search": True,
         "show_all_applications": True,
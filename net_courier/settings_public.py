@@ -0,0 +1,61 @@
+"""
+Lean settings profile for public traffic (marketing pages, /tracking/,
+sitemap, robots.txt).
+
+Workers started with DJANGO_SETTINGS_MODULE=net_courier.settings_public skip
+the admin stack (unfold and its contrib apps, import_export, smart_selects,
+django_extensions, anymail, sessions, messages) so they boot faster and use
+less memory. Route /admin/, /chaining/ and /internal/ to workers running the
+full net_courier.settings profile.
+
+The Procfile's web process picks its profile from WEB_SETTINGS_MODULE: run
+the public traffic from a second app (or dyno formation) with
+WEB_SETTINGS_MODULE=net_courier.settings_public, and leave it unset on the
+app that serves the admin.
+
+Compare the two with `python manage.py startup_report`.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    'django.contrib.auth',          # Courier.user -> AUTH_USER_MODEL
+    'django.contrib.contenttypes',
+    'django.contrib.sitemaps',
+    'accounts',
+    'django_countries',
+    'cities_light',                 # city index / geocoder
+]
+
+MIDDLEWARE = [
+    'accounts.metrics.MetricsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'accounts.page_cache.PageCacheMiddleware',
+    'accounts.public_fastpath.AnonymousFastPathMiddleware',  # no sessions here; adds Cache-Control
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+if QUERY_INSPECTOR:  # noqa: F405
+    MIDDLEWARE.insert(1, 'accounts.query_inspector.QueryInspectorMiddleware')
+
+if DB_REPLICA_HOSTS:  # noqa: F405
+    MIDDLEWARE.append('accounts.db_router.ReplicaRoutingMiddleware')
+
+ROOT_URLCONF = 'net_courier.urls_public'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'accounts.metrics.TimedDjangoTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],  # noqa: F405
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+            ],
+        },
+    },
+]
+
+# UNFOLD references admin URLs lazily; nothing here resolves them.
+UNFOLD = {}
@@ -15,46 +15,24 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
-from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
-from django.views.static import serve
-from django.http import HttpResponse
-from django.contrib.sitemaps.views import sitemap
-
-# Import your sitemap
-from accounts.sitemaps import StaticViewSitemap   # adjust app name if different
-
-sitemaps_dict = {
-    "static": StaticViewSitemap,
-}
+from django.contrib import admin
+from django.contrib.auth import views as auth_views
+from django.urls import path, include
 
-# Simple robots.txt view
-def robots_txt(request):
-    content = (
-        "User-Agent: *\n"
-        "Disallow:\n"
-        f"Sitemap: https://netexpressc.com/sitemap.xml\n"
-    )
-    return HttpResponse(content, content_type="text/plain")
+from accounts import internal_views, portal
+from .urls_public import urlpatterns as public_urlpatterns
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('', include('accounts.urls')),
     path("chaining/", include("smart_selects.urls")),
-
-    # Sitemap
-    path("sitemap.xml", sitemap, {"sitemaps": sitemaps_dict}, name="sitemap"),
-
-    # Robots.txt
-    path("robots.txt", robots_txt, name="robots_txt"),
-
-    # Static & Media
-    re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
-    re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATIC_ROOT}),
-]
+    path('internal/db-pool/', internal_views.db_pool_metrics, name='db_pool_metrics'),
+    # customer portal (sessions, so not in the public profile)
+    path('accounts/login/', auth_views.LoginView.as_view(template_name='login.html', redirect_authenticated_user=True), name='login'),
+    path('accounts/logout/', auth_views.LogoutView.as_view(), name='logout'),
+    path('shipments/', portal.my_shipments, name='my_shipments'),
+] + public_urlpatterns
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns = [path('__debug__/', include('debug_toolbar.urls'))] + urlpatterns
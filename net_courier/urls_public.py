@@ -0,0 +1,60 @@
+"""
+Public URL configuration: the marketing pages, tracking, scan ingestion,
+sitemap and robots.txt.
+
+Used on its own by the lean public worker profile (net_courier.settings_public)
+and included by the full URLconf in net_courier.urls.
+"""
+
+from django.urls import path, include, re_path
+from django.conf import settings
+from django.conf.urls.static import static
+from django.views.static import serve
+from django.http import HttpResponse
+from django.contrib.sitemaps.views import sitemap
+
+# Import your sitemap
+from accounts.sitemaps import StaticViewSitemap   # adjust app name if different
+from accounts.metrics import metrics_view
+from accounts.rates import quote_view
+from accounts.scan_ingest import ingest_view
+
+sitemaps_dict = {
+    "static": StaticViewSitemap,
+}
+
+# Simple robots.txt view
+def robots_txt(request):
+    content = (
+        "User-Agent: *\n"
+        "Disallow:\n"
+        f"Sitemap: https://netexpressc.com/sitemap.xml\n"
+    )
+    return HttpResponse(content, content_type="text/plain")
+
+
+urlpatterns = [
+    path('', include('accounts.urls')),
+
+    # Sitemap
+    path("sitemap.xml", sitemap, {"sitemaps": sitemaps_dict}, name="sitemap"),
+
+    # Robots.txt
+    path("robots.txt", robots_txt, name="robots_txt"),
+
+    # NDJSON scan events from depot scanners / driver apps (ScannerKey auth)
+    path("api/scans/", ingest_view, name="scan_ingest"),
+
+    # Shipping quotes (single via GET, batches via POST)
+    path("api/quote/", quote_view, name="quote"),
+
+    # Prometheus scrape endpoint (staff / METRICS_TOKEN bearer)
+    path("internal/metrics/", metrics_view, name="metrics"),
+
+    # Static & Media
+    re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+    re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATIC_ROOT}),
+]
+
+if settings.DEBUG:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
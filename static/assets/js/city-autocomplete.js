@@ -0,0 +1,40 @@
+/* City suggestions for the free-text city fields in the Courier admin. */
+(function () {
+    "use strict";
+
+    function attach(input) {
+        var list = document.createElement("datalist");
+        list.id = input.id + "-cities";
+        input.parentNode.appendChild(list);
+        input.setAttribute("list", list.id);
+
+        var cityField = input.dataset.cityField;
+        var prefix = input.name.slice(0, input.name.length - cityField.length);
+        var timer = null;
+
+        input.addEventListener("input", function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () {
+                var country = document.querySelector('[name="' + prefix + input.dataset.countryField + '"]');
+                var params = new URLSearchParams({
+                    q: input.value,
+                    country: country ? country.value : ""
+                });
+                fetch(input.dataset.cityAutocomplete + "?" + params, {credentials: "same-origin"})
+                    .then(function (response) { return response.json(); })
+                    .then(function (data) {
+                        list.innerHTML = "";
+                        data.results.forEach(function (name) {
+                            var option = document.createElement("option");
+                            option.value = name;
+                            list.appendChild(option);
+                        });
+                    });
+            }, 120);
+        });
+    }
+
+    document.addEventListener("DOMContentLoaded", function () {
+        document.querySelectorAll("input[data-city-autocomplete]").forEach(attach);
+    });
+})();